@@ -358,7 +358,7 @@ export default function WorkerTasksPage() {
     : null;
 
   // SSE-driven revalidation: revalidate when relevant tasks change.
-  // Server debounces per parent_id at 1s, so at most one event per parent per second.
+  // Server merges changes per parent_id over 1s windows, so at most one event per parent per second.
   const swrKeyRef = useRef(swrKey);
   swrKeyRef.current = swrKey;
   const parentIdRef = useRef(parentId);
@@ -372,14 +372,21 @@ export default function WorkerTasksPage() {
         const payload = JSON.parse(event.data);
         const viewingParent = parentIdRef.current;
         const eventParent: number | null = payload.parent_id;
-        const eventId: number = payload.id;
+        const eventIds: number[] = payload.ids ?? [];
+
+        // ids is capped server-side; when truncated the check below can miss
+        // changes, so refetch everything on the page (list and breadcrumb).
+        if (payload.truncated) {
+          mutate((key) => typeof key === "string" && key.startsWith(SWR_KEY));
+          return;
+        }
 
         // Only revalidate if the event is relevant to our current view:
-        // - Top-level view (viewingParent=null): task itself is top-level (parent_id=null)
-        // - Drilled-in view: child of viewed parent changed, or the parent itself changed
+        // - Top-level view (viewingParent=null): changed tasks are top-level (parent_id=null)
+        // - Drilled-in view: children of viewed parent changed, or the parent itself changed
         const isRelevant = viewingParent === null
           ? eventParent === null
-          : eventParent === viewingParent || eventId === viewingParent;
+          : eventParent === viewingParent || eventIds.includes(viewingParent);
 
         if (isRelevant) {
           mutate(swrKeyRef.current);
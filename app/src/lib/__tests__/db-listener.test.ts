@@ -0,0 +1,44 @@
+import { mergeWorkerTaskChanged, type WorkerTaskChangedPayload } from "@/lib/db-listener";
+
+const payload = (ids: number[], overrides: Partial<WorkerTaskChangedPayload> = {}): WorkerTaskChangedPayload => ({
+  parent_id: 17,
+  count: ids.length,
+  states: { processing: ids.length },
+  ids,
+  truncated: false,
+  ...overrides,
+});
+
+const range = (from: number, length: number) => Array.from({ length }, (_, i) => from + i);
+
+describe("mergeWorkerTaskChanged", () => {
+  it("sums counts and states and de-duplicates ids without marking the batch truncated", () => {
+    const batch = payload([18, 19]);
+    mergeWorkerTaskChanged(batch, payload([18, 19], { states: { completed: 2 } }));
+
+    expect(batch.count).toBe(4);
+    expect(batch.states).toEqual({ processing: 2, completed: 2 });
+    expect(batch.ids).toEqual([18, 19]);
+    expect(batch.truncated).toBe(false);
+  });
+
+  it("keeps a truncated flag from either side", () => {
+    const batch = payload([18]);
+    mergeWorkerTaskChanged(batch, payload(range(19, 100), { count: 250, truncated: true }));
+    expect(batch.truncated).toBe(true);
+
+    mergeWorkerTaskChanged(batch, payload([18]));
+    expect(batch.truncated).toBe(true);
+  });
+
+  it("marks the batch truncated when a new id does not fit", () => {
+    const batch = payload(range(1, 100));
+    mergeWorkerTaskChanged(batch, payload(range(1, 100)));
+    expect(batch.ids).toHaveLength(100);
+    expect(batch.truncated).toBe(false);
+
+    mergeWorkerTaskChanged(batch, payload([101]));
+    expect(batch.ids).toHaveLength(100);
+    expect(batch.truncated).toBe(true);
+  });
+});
@@ -25,6 +25,8 @@ declare global {
   var __dbListenerDebounceTimers: { [key: string]: NodeJS.Timeout } | undefined;
   // eslint-disable-next-line no-var
   var __dbListenerReconnectDelay: number | undefined;
+  // eslint-disable-next-line no-var
+  var __dbListenerWorkerTaskBatches: Map<string, WorkerTaskChangedPayload> | undefined;
 }
 
 /**
@@ -124,10 +126,15 @@ export type EnrichedImportJobNotificationPayload =
       import_job: { id: number };
     };
 
-// Lightweight signal with enough context for client-side filtering
+// Aggregated state changes of the children of one parent (parent_id=null for top-level tasks).
+// count is the number of state changes, so a task that changed twice counts twice.
+// ids holds at most WORKER_TASK_MAX_IDS distinct ids; truncated is set when some were left out.
 export type WorkerTaskChangedPayload = {
-  id: number;
   parent_id: number | null;
+  count: number;
+  states: { [state: string]: number };
+  ids: number[];
+  truncated: boolean;
 };
 
 // Create a discriminated union based on the channel
@@ -165,6 +172,13 @@ if (typeof globalThis !== 'undefined') {
 }
 const DEBOUNCE_DELAY_MS = 500;
 const WORKER_TASK_DEBOUNCE_MS = 1000;
+const WORKER_TASK_MAX_IDS = 100;
+
+// worker_task_changed payloads merged per parent_id while their window is open
+const workerTaskBatches: Map<string, WorkerTaskChangedPayload> = globalThis.__dbListenerWorkerTaskBatches || new Map();
+if (typeof globalThis !== 'undefined') {
+  globalThis.__dbListenerWorkerTaskBatches = workerTaskBatches;
+}
 
 function handleWorkerStatusNotification(payload: WorkerStatusPayload) {
   // Clear any pending timer for this status type
@@ -214,24 +228,63 @@ function handleImportJobProgressNotification(rawPayload: Record<string, unknown>
   }, DEBOUNCE_DELAY_MS);
 }
 
+/**
+ * Merges one worker_task_changed notification into the batch of its parent_id.
+ * Counts are summed, ids are de-duplicated up to WORKER_TASK_MAX_IDS, and truncated
+ * is set if either side was truncated or an id did not fit.
+ */
+export function mergeWorkerTaskChanged(
+  batch: WorkerTaskChangedPayload,
+  parsed: WorkerTaskChangedPayload
+): WorkerTaskChangedPayload {
+  batch.count += parsed.count;
+  for (const [state, count] of Object.entries(parsed.states ?? {})) {
+    batch.states[state] = (batch.states[state] ?? 0) + count;
+  }
+  batch.truncated = batch.truncated || (parsed.truncated ?? false);
+  for (const id of parsed.ids ?? []) {
+    if (batch.ids.includes(id)) continue;
+    if (batch.ids.length >= WORKER_TASK_MAX_IDS) {
+      batch.truncated = true;
+      break;
+    }
+    batch.ids.push(id);
+  }
+  return batch;
+}
+
 function handleWorkerTaskChangedNotification(rawPayload: string) {
   try {
     const parsed = JSON.parse(rawPayload) as WorkerTaskChangedPayload;
-    // Debounce per parent_id — during bulk operations, many children of the same
-    // parent change rapidly. Each distinct parent gets its own 1s debounce window.
-    // Top-level tasks (parent_id=null) debounce under key 'null'.
-    const debounceKey = `worker_task_changed_${parsed.parent_id ?? 'null'}`;
-    if (debounceTimers[debounceKey]) {
-      clearTimeout(debounceTimers[debounceKey]);
+    // Each notification already covers one UPDATE statement. During bulk operations
+    // many statements touch the children of the same parent, so merge them per parent_id
+    // over a fixed 1s window (not a trailing debounce, which would never fire under a
+    // steady stream) and send one payload per parent per window.
+    // Top-level tasks (parent_id=null) are merged under key 'null'.
+    const batchKey = `worker_task_changed_${parsed.parent_id ?? 'null'}`;
+    const batch = workerTaskBatches.get(batchKey);
+    if (batch) {
+      mergeWorkerTaskChanged(batch, parsed);
+      return;
     }
 
-    debounceTimers[debounceKey] = setTimeout(() => {
+    workerTaskBatches.set(batchKey, mergeWorkerTaskChanged({
+      parent_id: parsed.parent_id,
+      count: 0,
+      states: {},
+      ids: [],
+      truncated: false,
+    }, parsed));
+    debounceTimers[batchKey] = setTimeout(() => {
+      const payload = workerTaskBatches.get(batchKey);
+      workerTaskBatches.delete(batchKey);
+      delete debounceTimers[batchKey];
+      if (!payload) return;
       const data: NotificationData = {
         channel: 'worker_task_changed',
-        payload: parsed,
+        payload,
       };
       channelCallbacks.get('worker_task_changed')?.forEach(callback => callback(data));
-      delete debounceTimers[debounceKey];
     }, WORKER_TASK_DEBOUNCE_MS);
   } catch (e) {
     console.error('DB Listener: Error parsing worker_task_changed notification:', e);
@@ -5,7 +5,7 @@ StatBus REST API Example - Establishment Statistics Visualization
 This script demonstrates how to:
 1. Load credentials from .env file
 2. Connect to the StatBus REST API
-3. Fetch statistical history data
+3. Fetch statistical history data (paged, via the statbus_client package)
 4. Visualize the data with a bar chart
 """
 
@@ -17,6 +17,8 @@ import seaborn as sns
 import matplotlib.pyplot as plt
 from dotenv import load_dotenv
 
+from statbus_client import StatbusClient, StatbusError
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -36,28 +38,21 @@ params = {
     "unit_type": "eq.establishment",
     "resolution": "eq.year"
 }
-headers = {"Authorization": f"Bearer {API_KEY}"}
 
 print("Fetching data from StatBus API...")
 print(f"URL: {url}")
 print("")
 
 try:
-    # Fetch the data
-    response = requests.get(url, params=params, headers=headers, timeout=30)
-    response.raise_for_status()  # Raises error if something went wrong
-    
-    # Parse JSON response
-    data = response.json()
+    # Fetch the data page by page into a pandas DataFrame
+    with StatbusClient(API_URL, API_KEY) as client:
+        df = client.to_pandas("statistical_history", params)
     
-    if not data:
+    if df.empty:
         print("Warning: No data returned from API")
         sys.exit(1)
     
-    print(f"✓ Fetched {len(data)} records")
-    
-    # Convert to pandas DataFrame
-    df = pd.DataFrame(data)
+    print(f"✓ Fetched {len(df)} records")
     
     # Ensure correct types
     df['year'] = df['year'].astype(int)
@@ -112,9 +107,8 @@ except requests.exceptions.ConnectionError:
     print(f"Error: Could not connect to {API_URL}")
     print("Check that the URL is correct and the server is running.")
     sys.exit(1)
-except requests.exceptions.HTTPError as e:
-    print(f"Error: HTTP {response.status_code}")
-    print(f"Response: {response.text[:500]}")
+except StatbusError as e:
+    print(f"Error: {e}")
     sys.exit(1)
 except Exception as e:
     print(f"Error: {str(e)}")
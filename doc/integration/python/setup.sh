@@ -91,8 +91,8 @@ pip install --upgrade pip --quiet
 
 # Install required packages
 echo "Installing required packages..."
-pip install requests pandas seaborn matplotlib python-dotenv --quiet
-echo "✓ Installed: requests, pandas, seaborn, matplotlib, python-dotenv"
+pip install requests pandas pyarrow seaborn matplotlib python-dotenv --quiet
+echo "✓ Installed: requests, pandas, pyarrow, seaborn, matplotlib, python-dotenv"
 echo ""
 
 # Test API connection
@@ -0,0 +1,5 @@
+"""Client for extracting data from the StatBus REST API; see client.py."""
+
+from .client import StatbusClient, StatbusError
+
+__all__ = ["StatbusClient", "StatbusError"]
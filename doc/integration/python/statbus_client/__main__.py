@@ -0,0 +1,39 @@
+"""
+Extract a StatBus endpoint to a Parquet file.
+
+    python -m statbus_client statistical_unit units.parquet -p unit_type=eq.enterprise
+    python -m statbus_client statistical_history history.parquet -p resolution=eq.year
+"""
+
+import argparse
+import sys
+import time
+
+from .client import StatbusClient, StatbusError
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="statbus_client", description="Extract a StatBus endpoint to Parquet")
+    parser.add_argument("endpoint", help="REST endpoint, e.g. statistical_unit")
+    parser.add_argument("output", help="Parquet file to write")
+    parser.add_argument("-p", "--param", action="append", default=[], metavar="NAME=VALUE",
+                        help="PostgREST query parameter, e.g. select=unit_id,name or unit_type=eq.enterprise")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel requests (default: 4)")
+    parser.add_argument("--page-size", type=int, default=10000, help="Rows per request (default: 10000)")
+    args = parser.parse_args()
+
+    params = [tuple(p.split("=", 1)) for p in args.param]
+    if any(len(p) != 2 for p in params):
+        parser.error("--param must be NAME=VALUE")
+    started = time.monotonic()
+    try:
+        with StatbusClient.from_env(concurrency=args.concurrency, page_size=args.page_size) as client:
+            rows = client.to_parquet(args.endpoint, args.output, params)
+    except StatbusError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"✓ Wrote {rows} rows to {args.output} in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
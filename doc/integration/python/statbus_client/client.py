@@ -0,0 +1,239 @@
+"""
+Paged, concurrent extraction from the StatBus REST API (PostgREST).
+
+Large tables are split into keyset slices on an integer key column
+(unit_id for statistical_unit): the client looks up the key's min and max
+under your filters, then fetches slices `key >= lo AND key < hi` on a pool of
+keep-alive connections. A slice larger than one page is paged with the
+PostgREST `Range` header. Tables without such a key (statistical_history)
+are paged with `Range` alone.
+
+Pages are yielded in key order while later slices are still downloading,
+and each page becomes a pyarrow RecordBatch as soon as it arrives. Memory
+therefore stays bounded by roughly `concurrency * 2` pages, whatever the
+size of the extract.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Ordering that makes rows unique within a slice, so Range paging inside a slice is stable.
+DEFAULT_ORDER = {
+    "statistical_unit": "unit_id.asc,unit_type.asc,valid_from.asc",
+    "statistical_history": "resolution.asc,year.asc,month.asc,unit_type.asc",
+}
+DEFAULT_KEY = {
+    "statistical_unit": "unit_id",
+    "statistical_history": None,
+}
+# Query parameters the client sets itself for slicing and paging.
+RESERVED_PARAMS = ("order", "limit", "offset")
+
+
+class StatbusError(Exception):
+    """A request to the StatBus API failed."""
+
+
+class StatbusClient:
+    """Client for one StatBus instance; thread-safe, reuse it for several extracts."""
+
+    def __init__(self, api_url, api_key, concurrency=4, page_size=10000, timeout=120, retries=3):
+        self.api_url = api_url.rstrip("/")
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Bearer {api_key}", "Accept": "application/json"})
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                      allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """Create a client from API_URL and API_KEY (read from .env when python-dotenv is installed)."""
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+        except ImportError:
+            pass
+        api_url, api_key = os.getenv("API_URL"), os.getenv("API_KEY")
+        if not api_url or not api_key:
+            raise StatbusError("API_URL and API_KEY must be set (run ./setup.sh to create .env)")
+        return cls(api_url, api_key, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, endpoint, params=(), offset=None, limit=None):
+        """GET /rest/<endpoint> and return the decoded rows; offset/limit become a Range header."""
+        headers = {}
+        if offset is not None:
+            headers = {"Range-Unit": "items", "Range": f"{offset}-{offset + limit - 1}"}
+        url = f"{self.api_url}/rest/{endpoint}"
+        response = self.session.get(url, params=list(params), headers=headers, timeout=self.timeout)
+        if response.status_code not in (200, 206):
+            raise StatbusError(f"GET {url} returned HTTP {response.status_code}: {response.text[:500]}")
+        return response.json()
+
+    def _key_bounds(self, endpoint, params, key):
+        """Smallest and largest key under the filters, or None if nothing matches."""
+        filters = [(name, value) for name, value in params if name != "select"]
+        bounds = []
+        for direction in ("asc", "desc"):
+            rows = self.get(endpoint, [*filters, ("select", key), ("order", f"{key}.{direction}"), ("limit", "1")])
+            if not rows:
+                return None
+            bounds.append(rows[0][key])
+        return bounds[0], bounds[1]
+
+    def _fetch_slice(self, endpoint, params, key, lo, hi, order):
+        """All rows with lo <= key < hi, in `order`, paged with Range if it exceeds one page."""
+        slice_params = [*params, (key, f"gte.{lo}"), (key, f"lt.{hi}"), ("order", order)]
+        rows, offset = [], 0
+        while True:
+            page = self.get(endpoint, slice_params, offset, self.page_size)
+            rows.extend(page)
+            if len(page) < self.page_size:
+                return rows
+            offset += self.page_size
+
+    def _ordered(self, jobs):
+        """Run the (fn, args) jobs on the pool, yielding results in job order with a bounded look-ahead."""
+        window = self.concurrency * 2
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            pending = deque()
+            jobs = iter(jobs)
+            try:
+                for fn, *args in jobs:
+                    pending.append(pool.submit(fn, *args))
+                    if len(pending) >= window:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def iter_pages(self, endpoint, params=None, key="default", order=None, slice_size=None):
+        """Yield lists of row dicts covering the whole (filtered) endpoint.
+
+        params: PostgREST query parameters (dict or list of pairs), e.g.
+            {"select": "unit_id,name", "unit_type": "eq.enterprise"}
+            order, limit and offset are set by the client and rejected here.
+        key: integer column to slice on; None pages by Range only. Defaults per endpoint (unit_id).
+        order: unique ordering within a slice; defaults per endpoint, else `key.asc`.
+        slice_size: key values per slice. By default slices start at page_size // 4 key
+            values (a unit has several periods) and adapt to the key density: a slice that
+            comes back empty doubles the width of the next ones, a slice that needed more
+            than one page halves it.
+        """
+        params = list((params or {}).items()) if isinstance(params, dict) else list(params or [])
+        reserved = sorted({name for name, _ in params if name in RESERVED_PARAMS})
+        if reserved:
+            raise StatbusError(f"iter_pages sets {', '.join(reserved)} itself; "
+                               "use the order argument and filters instead")
+        if key == "default":
+            key = DEFAULT_KEY.get(endpoint, "unit_id")
+        order = order or DEFAULT_ORDER.get(endpoint) or (f"{key}.asc" if key else None)
+        if key is None:
+            yield from self._iter_range_pages(endpoint, params, order)
+            return
+        bounds = self._key_bounds(endpoint, params, key)
+        if bounds is None:
+            return
+        lo, hi = bounds
+        step = slice_size or max(1, self.page_size // 4)
+
+        def jobs():
+            # Reads `step` as it is submitted, so resizing applies to the slices
+            # not yet handed to the pool.
+            start = lo
+            while start <= hi:
+                end = min(start + step, hi + 1)
+                yield self._fetch_slice, endpoint, params, key, start, end, order
+                start = end
+
+        for rows in self._ordered(jobs()):
+            if slice_size is None:
+                if not rows:
+                    step *= 2
+                elif len(rows) > self.page_size:
+                    step = max(1, step // 2)
+            if rows:
+                yield rows
+
+    def _iter_range_pages(self, endpoint, params, order):
+        """Range paging without a key: pages are requested ahead concurrently until one comes back short."""
+        if order:
+            params = [*params, ("order", order)]
+        offsets = iter(range(0, 2 ** 62, self.page_size))
+        done = False
+
+        def jobs():
+            for offset in offsets:
+                if done:
+                    return
+                yield self.get, endpoint, params, offset, self.page_size
+
+        for page in self._ordered(jobs()):
+            if page:
+                yield page
+            if len(page) < self.page_size:
+                done = True
+                return
+
+    def iter_batches(self, endpoint, params=None, schema=None, **kwargs):
+        """Yield pyarrow RecordBatches, one per page (see iter_pages for the arguments)."""
+        import pyarrow as pa
+        for rows in self.iter_pages(endpoint, params, **kwargs):
+            batch = pa.RecordBatch.from_pylist(rows)
+            yield batch.cast(schema) if schema is not None else batch
+
+    def to_arrow(self, endpoint, params=None, **kwargs):
+        """The whole extract as one pyarrow Table, built page by page."""
+        import pyarrow as pa
+        tables = [pa.Table.from_batches([batch]) for batch in self.iter_batches(endpoint, params, **kwargs)]
+        if not tables:
+            return pa.table({})
+        return pa.concat_tables(tables, promote_options="permissive")
+
+    def to_pandas(self, endpoint, params=None, **kwargs):
+        """The whole extract as a pandas DataFrame (converted once, from the Arrow table)."""
+        return self.to_arrow(endpoint, params, **kwargs).to_pandas()
+
+    def to_parquet(self, endpoint, path, params=None, schema=None, **kwargs):
+        """Stream the extract into a Parquet file without holding it in memory. Returns the row count.
+
+        The file schema is taken from the first page, with all-null columns typed as
+        string; pass `schema` (a pyarrow.Schema) when later pages may not fit that.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        rows = 0
+        try:
+            for batch in self.iter_batches(endpoint, params, **kwargs):
+                if writer is None:
+                    schema = schema or pa.schema(
+                        [field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                         for field in batch.schema])
+                    writer = pq.ParquetWriter(path, schema)
+                writer.write_batch(batch.cast(schema))
+                rows += batch.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
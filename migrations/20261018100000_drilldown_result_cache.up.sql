@@ -0,0 +1,545 @@
+-- Migration 20261018100000: drilldown result cache (UP)
+--
+-- Problem: the dashboard and reports call statistical_unit_facet_drilldown and
+-- statistical_history_drilldown with the same few argument combinations many
+-- times an hour, and every call re-aggregates the facet tables.
+--
+-- Solution: cache the jsonb result per function and full argument tuple in an
+-- UNLOGGED table (no WAL; after a crash it is simply empty).
+--   * public.drilldown_cache holds (function_name, args, generation, result).
+--     args is jsonb_build_array() of every argument, so defaults such as
+--     valid_on = CURRENT_DATE are part of the key as resolved values.
+--   * public.drilldown_cache_generation holds one transactional counter per
+--     function. A statement trigger on each table the function reads bumps the
+--     counter and deletes that function's entries, in the same transaction as
+--     the write. The facet tables are only written by the reduce steps of
+--     derive_statistical_unit_facet / derive_statistical_history_facet, so the
+--     cache is invalidated exactly when those commit.
+--   * A cached row is only served while its generation is current. A miss
+--     records the generation BEFORE computing, so a result computed while a
+--     reduce commits is stored under the old generation and never served.
+--   * Read-only transactions (PostgREST GET, hot standby) compute without
+--     storing.
+--
+-- The original bodies live on as *_uncached (SECURITY DEFINER, unchanged
+-- logic); the public signatures are unchanged.
+BEGIN;
+
+----------------------------------------------------------------------
+-- 1. Cache tables
+----------------------------------------------------------------------
+
+CREATE UNLOGGED TABLE public.drilldown_cache (
+    function_name text NOT NULL,
+    args jsonb NOT NULL,
+    generation bigint NOT NULL,
+    result jsonb NOT NULL,
+    created_at timestamptz NOT NULL DEFAULT clock_timestamp(),
+    PRIMARY KEY (function_name, args)
+);
+
+CREATE TABLE public.drilldown_cache_generation (
+    function_name text PRIMARY KEY,
+    generation bigint NOT NULL DEFAULT 0
+);
+
+INSERT INTO public.drilldown_cache_generation (function_name)
+VALUES ('statistical_unit_facet_drilldown')
+     , ('statistical_history_drilldown');
+
+-- Only reachable through the SECURITY DEFINER functions below (RLS on, no policies).
+ALTER TABLE public.drilldown_cache ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.drilldown_cache_generation ENABLE ROW LEVEL SECURITY;
+
+----------------------------------------------------------------------
+-- 2. Invalidation
+----------------------------------------------------------------------
+
+CREATE FUNCTION public.drilldown_cache_invalidate()
+ RETURNS trigger
+ LANGUAGE plpgsql
+ SECURITY DEFINER
+ SET search_path TO 'public', 'pg_temp'
+AS $drilldown_cache_invalidate$
+BEGIN
+    -- TG_ARGV lists the drilldown functions that read TG_TABLE_NAME.
+    UPDATE public.drilldown_cache_generation
+       SET generation = generation + 1
+     WHERE function_name = ANY(TG_ARGV);
+    DELETE FROM public.drilldown_cache
+     WHERE function_name = ANY(TG_ARGV);
+    RETURN NULL;
+END;
+$drilldown_cache_invalidate$;
+
+CREATE TRIGGER drilldown_cache_invalidate
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.statistical_unit_facet
+FOR EACH STATEMENT EXECUTE FUNCTION public.drilldown_cache_invalidate('statistical_unit_facet_drilldown');
+
+CREATE TRIGGER drilldown_cache_invalidate
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.statistical_history_facet
+FOR EACH STATEMENT EXECUTE FUNCTION public.drilldown_cache_invalidate('statistical_history_drilldown');
+
+-- Labels, codes and the activity category standard are read live by both functions.
+DO $create_reference_triggers$
+DECLARE
+    v_table text;
+BEGIN
+    FOREACH v_table IN ARRAY ARRAY['region', 'activity_category', 'sector', 'status', 'legal_form', 'country', 'settings'] LOOP
+        EXECUTE format($$
+            CREATE TRIGGER drilldown_cache_invalidate
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.%I
+            FOR EACH STATEMENT EXECUTE FUNCTION public.drilldown_cache_invalidate(
+                'statistical_unit_facet_drilldown', 'statistical_history_drilldown')
+        $$, v_table);
+    END LOOP;
+END;
+$create_reference_triggers$;
+
+----------------------------------------------------------------------
+-- 3. statistical_unit_facet_drilldown
+----------------------------------------------------------------------
+
+-- The body has no references to its own name, so it can be renamed as is.
+ALTER FUNCTION public.statistical_unit_facet_drilldown(statistical_unit_type, ltree, ltree, ltree, integer, integer, integer, date)
+    RENAME TO statistical_unit_facet_drilldown_uncached;
+
+CREATE FUNCTION public.statistical_unit_facet_drilldown(unit_type statistical_unit_type DEFAULT 'enterprise'::statistical_unit_type, region_path ltree DEFAULT NULL::ltree, activity_category_path ltree DEFAULT NULL::ltree, sector_path ltree DEFAULT NULL::ltree, status_id integer DEFAULT NULL::integer, legal_form_id integer DEFAULT NULL::integer, country_id integer DEFAULT NULL::integer, valid_on date DEFAULT CURRENT_DATE)
+ RETURNS jsonb
+ LANGUAGE plpgsql
+ SECURITY DEFINER
+ SET search_path TO 'public', 'pg_temp'
+AS $statistical_unit_facet_drilldown$
+DECLARE
+    v_args jsonb := jsonb_build_array(unit_type, region_path, activity_category_path, sector_path,
+                                      status_id, legal_form_id, country_id, valid_on);
+    v_generation bigint;
+    v_result jsonb;
+BEGIN
+    SELECT g.generation, c.result INTO v_generation, v_result
+    FROM public.drilldown_cache_generation AS g
+    LEFT JOIN public.drilldown_cache AS c
+           ON c.function_name = g.function_name
+          AND c.args = v_args
+          AND c.generation = g.generation
+    WHERE g.function_name = 'statistical_unit_facet_drilldown';
+
+    IF v_result IS NOT NULL THEN
+        RETURN v_result;
+    END IF;
+
+    v_result := public.statistical_unit_facet_drilldown_uncached(
+        unit_type, region_path, activity_category_path, sector_path,
+        status_id, legal_form_id, country_id, valid_on);
+
+    IF NOT current_setting('transaction_read_only')::boolean THEN
+        INSERT INTO public.drilldown_cache AS c (function_name, args, generation, result)
+        VALUES ('statistical_unit_facet_drilldown', v_args, v_generation, v_result)
+        ON CONFLICT (function_name, args) DO UPDATE
+           SET generation = EXCLUDED.generation
+             , result = EXCLUDED.result
+             , created_at = EXCLUDED.created_at
+         WHERE c.generation < EXCLUDED.generation;
+    END IF;
+
+    RETURN v_result;
+END;
+$statistical_unit_facet_drilldown$;
+
+----------------------------------------------------------------------
+-- 4. statistical_history_drilldown
+----------------------------------------------------------------------
+
+-- The body qualifies year_min/year_max with the function name, so the copy
+-- uses the new name there; otherwise it is unchanged.
+CREATE FUNCTION public.statistical_history_drilldown_uncached(unit_type statistical_unit_type DEFAULT 'enterprise'::statistical_unit_type, resolution history_resolution DEFAULT 'year'::history_resolution, year integer DEFAULT NULL::integer, region_path ltree DEFAULT NULL::ltree, activity_category_path ltree DEFAULT NULL::ltree, sector_path ltree DEFAULT NULL::ltree, status_id integer DEFAULT NULL::integer, legal_form_id integer DEFAULT NULL::integer, country_id integer DEFAULT NULL::integer, year_min integer DEFAULT NULL::integer, year_max integer DEFAULT NULL::integer)
+ RETURNS jsonb
+ LANGUAGE sql
+ SECURITY DEFINER
+ SET search_path TO 'public', 'pg_temp'
+AS $statistical_history_drilldown_uncached$
+    -- Use a params intermediary to avoid conflicts
+    -- between columns and parameters, leading to tautologies. i.e. 'sh.resolution = resolution' is always true.
+    WITH params AS (
+        SELECT
+            unit_type AS param_unit_type,
+            resolution AS param_resolution,
+            year AS param_year,
+            region_path AS param_region_path,
+            activity_category_path AS param_activity_category_path,
+            sector_path AS param_sector_path,
+            legal_form_id AS param_legal_form_id,
+            status_id AS param_status_id,
+            country_id AS param_country_id
+    ), settings_activity_category_standard AS (
+        SELECT activity_category_standard_id AS id FROM public.settings
+    ),
+    available_history AS (
+        SELECT sh.*
+        FROM public.statistical_history_facet AS sh
+           , params
+        WHERE (param_unit_type IS NULL OR sh.unit_type = param_unit_type)
+          AND (param_resolution IS NULL OR sh.resolution = param_resolution)
+          AND (param_year IS NULL OR sh.year = param_year)
+          AND (
+              param_region_path IS NULL
+              OR sh.physical_region_path IS NOT NULL AND sh.physical_region_path OPERATOR(public.<@) param_region_path
+              )
+          AND (
+              param_activity_category_path IS NULL
+              OR sh.primary_activity_category_path IS NOT NULL AND sh.primary_activity_category_path OPERATOR(public.<@) param_activity_category_path
+              )
+          AND (
+              param_sector_path IS NULL
+              OR sh.sector_path IS NOT NULL AND sh.sector_path OPERATOR(public.<@) param_sector_path
+              )
+          AND (
+              param_legal_form_id IS NULL
+              OR sh.legal_form_id IS NOT NULL AND sh.legal_form_id = param_legal_form_id
+              )
+          AND (
+              param_status_id IS NULL
+              OR sh.status_id IS NOT NULL AND sh.status_id = param_status_id
+              )
+          AND (
+              param_country_id IS NULL
+              OR sh.physical_country_id IS NOT NULL AND sh.physical_country_id = param_country_id
+              )
+          AND (
+              statistical_history_drilldown_uncached.year_min IS NULL
+              OR sh.year IS NOT NULL AND sh.year >= statistical_history_drilldown_uncached.year_min
+              )
+          AND (
+              statistical_history_drilldown_uncached.year_max IS NULL
+              OR sh.year IS NOT NULL AND sh.year <= statistical_history_drilldown_uncached.year_max
+              )
+    ), available_history_stats AS (
+        SELECT
+            ah.year, ah.month
+            -- Sum up all the demographic and change counts across the filtered facets
+            , COALESCE(SUM(ah.exists_count), 0)::integer AS exists_count
+            , COALESCE(SUM(ah.exists_change), 0)::integer AS exists_change
+            , COALESCE(SUM(ah.exists_added_count), 0)::integer AS exists_added_count
+            , COALESCE(SUM(ah.exists_removed_count), 0)::integer AS exists_removed_count
+            , COALESCE(SUM(ah.countable_count), 0)::integer AS countable_count
+            , COALESCE(SUM(ah.countable_change), 0)::integer AS countable_change
+            , COALESCE(SUM(ah.countable_added_count), 0)::integer AS countable_added_count
+            , COALESCE(SUM(ah.countable_removed_count), 0)::integer AS countable_removed_count
+            , COALESCE(SUM(ah.births), 0)::integer AS births
+            , COALESCE(SUM(ah.deaths), 0)::integer AS deaths
+            , COALESCE(SUM(ah.name_change_count), 0)::integer AS name_change_count
+            , COALESCE(SUM(ah.primary_activity_category_change_count), 0)::integer AS primary_activity_category_change_count
+            , COALESCE(SUM(ah.secondary_activity_category_change_count), 0)::integer AS secondary_activity_category_change_count
+            , COALESCE(SUM(ah.sector_change_count), 0)::integer AS sector_change_count
+            , COALESCE(SUM(ah.legal_form_change_count), 0)::integer AS legal_form_change_count
+            , COALESCE(SUM(ah.physical_region_change_count), 0)::integer AS physical_region_change_count
+            , COALESCE(SUM(ah.physical_country_change_count), 0)::integer AS physical_country_change_count
+            , COALESCE(SUM(ah.physical_address_change_count), 0)::integer AS physical_address_change_count
+            , COALESCE(SUM(ah.unit_size_change_count), 0)::integer AS unit_size_change_count
+            , COALESCE(SUM(ah.status_change_count), 0)::integer AS status_change_count
+            , COALESCE(public.jsonb_stats_merge_agg(ah.stats_summary), '{}'::jsonb) AS stats_summary
+        FROM available_history AS ah
+        GROUP BY ah.year, ah.month
+        ORDER BY year ASC, month ASC NULLS FIRST
+    ),
+    breadcrumb_region AS (
+        SELECT r.path
+             , r.label
+             , r.code
+             , r.name
+        FROM public.region AS r
+        WHERE
+            (   region_path IS NOT NULL
+            AND r.path OPERATOR(public.@>) (region_path)
+            )
+        ORDER BY path
+    ),
+    available_region AS (
+        SELECT r.path
+             , r.label
+             , r.code
+             , r.name
+        FROM public.region AS r
+        WHERE
+            (
+                (region_path IS NULL AND r.path OPERATOR(public.~) '*{1}'::public.lquery)
+            OR
+                (region_path IS NOT NULL AND r.path OPERATOR(public.~) (region_path::text || '.*{1}')::public.lquery)
+            )
+        ORDER BY r.path
+    ), aggregated_region_counts AS (
+        SELECT ar.path
+             , ar.label
+             , ar.code
+             , ar.name
+             , COALESCE(SUM(sh.countable_count), 0) AS count
+             , COALESCE(bool_or(true) FILTER (WHERE sh.physical_region_path OPERATOR(public.<>) ar.path), false) AS has_children
+        FROM available_region AS ar
+        LEFT JOIN available_history AS sh ON sh.physical_region_path OPERATOR(public.<@) ar.path
+        GROUP BY ar.path
+               , ar.label
+               , ar.code
+               , ar.name
+    ),
+    breadcrumb_activity_category AS (
+        SELECT ac.path
+             , ac.label
+             , ac.code
+             , ac.name
+        FROM
+            public.activity_category AS ac
+        WHERE ac.enabled
+           AND ac.standard_id = (SELECT id FROM settings_activity_category_standard)
+           AND
+            (     activity_category_path IS NOT NULL
+              AND ac.path OPERATOR(public.@>) activity_category_path
+            )
+        ORDER BY path
+    ),
+    available_activity_category AS (
+        SELECT ac.path
+             , ac.label
+             , ac.code
+             , ac.name
+        FROM
+            public.activity_category AS ac
+        WHERE ac.enabled
+           AND ac.standard_id = (SELECT id FROM settings_activity_category_standard)
+           AND
+            (
+                (activity_category_path IS NULL AND ac.path OPERATOR(public.~) '*{1}'::public.lquery)
+            OR
+                (activity_category_path IS NOT NULL AND ac.path OPERATOR(public.~) (activity_category_path::text || '.*{1}')::public.lquery)
+            )
+        ORDER BY ac.path
+    ),
+    aggregated_activity_counts AS (
+        SELECT aac.path
+             , aac.label
+             , aac.code
+             , aac.name
+             , COALESCE(SUM(sh.countable_count), 0) AS count
+             , COALESCE(bool_or(true) FILTER (WHERE sh.primary_activity_category_path OPERATOR(public.<>) aac.path), false) AS has_children
+        FROM
+            available_activity_category AS aac
+        LEFT JOIN available_history AS sh ON sh.primary_activity_category_path OPERATOR(public.<@) aac.path
+        GROUP BY aac.path
+               , aac.label
+               , aac.code
+               , aac.name
+        ORDER BY aac.path
+    ),
+    breadcrumb_sector AS (
+        SELECT s.path
+             , s.label
+             , s.code
+             , s.name
+        FROM public.sector AS s
+        WHERE
+            (   sector_path IS NOT NULL
+            AND s.path OPERATOR(public.@>) (sector_path)
+            )
+        ORDER BY s.path
+    ),
+    available_sector AS (
+        SELECT "as".path
+             , "as".label
+             , "as".code
+             , "as".name
+        FROM public.sector AS "as"
+        WHERE
+            (
+                (sector_path IS NULL AND "as".path OPERATOR(public.~) '*{1}'::public.lquery)
+            OR
+                (sector_path IS NOT NULL AND "as".path OPERATOR(public.~) (sector_path::text || '.*{1}')::public.lquery)
+            )
+        ORDER BY "as".path
+    ), aggregated_sector_counts AS (
+        SELECT "as".path
+             , "as".label
+             , "as".code
+             , "as".name
+             , COALESCE(SUM(sh.countable_count), 0) AS count
+             , COALESCE(bool_or(true) FILTER (WHERE sh.sector_path OPERATOR(public.<>) "as".path), false) AS has_children
+        FROM available_sector AS "as"
+        LEFT JOIN available_history AS sh ON sh.sector_path OPERATOR(public.<@) "as".path
+        GROUP BY "as".path
+               , "as".label
+               , "as".code
+               , "as".name
+       ORDER BY "as".path
+    ),
+    breadcrumb_legal_form AS (
+        SELECT lf.id
+             , lf.code
+             , lf.name
+        FROM public.legal_form AS lf
+        WHERE
+            (   legal_form_id IS NOT NULL
+            AND lf.id = legal_form_id
+            )
+        ORDER BY lf.code
+    ),
+    available_legal_form AS (
+        SELECT lf.id
+             , lf.code
+             , lf.name
+        FROM public.legal_form AS lf
+        -- Every sector is available, unless one is selected.
+        WHERE legal_form_id IS NULL
+        ORDER BY lf.code
+    ), aggregated_legal_form_counts AS (
+        SELECT lf.id
+             , lf.code
+             , lf.name
+             , COALESCE(SUM(sh.countable_count), 0) AS count
+             , false AS has_children
+        FROM available_legal_form AS lf
+        LEFT JOIN available_history AS sh ON sh.legal_form_id = lf.id
+        GROUP BY lf.id
+               , lf.code
+               , lf.name
+        ORDER BY lf.code
+    ),
+    breadcrumb_status AS (
+        SELECT s.id
+             , s.code
+             , s.name
+        FROM public.status AS s
+        WHERE
+            (   status_id IS NOT NULL
+            AND s.id = status_id
+            )
+        ORDER BY s.code
+    ),
+    available_status AS (
+        SELECT s.id
+             , s.code
+             , s.name
+        FROM public.status AS s
+        -- Every status is available, unless one is selected.
+        WHERE status_id IS NULL
+        ORDER BY s.code
+    ), aggregated_status_counts AS (
+        SELECT s.id
+             , s.code
+             , s.name
+             , COALESCE(SUM(sh.countable_count), 0) AS count
+             , false AS has_children
+        FROM available_status AS s
+        LEFT JOIN available_history AS sh ON sh.status_id = s.id
+        GROUP BY s.id
+               , s.code
+               , s.name
+        ORDER BY s.code
+    ),
+    breadcrumb_physical_country AS (
+        SELECT pc.id
+             , pc.iso_2
+             , pc.name
+        FROM public.country AS pc
+        WHERE
+            (   country_id IS NOT NULL
+            AND pc.id = country_id
+            )
+        ORDER BY pc.iso_2
+    ),
+    available_physical_country AS (
+        SELECT pc.id
+             , pc.iso_2
+             , pc.name
+        FROM public.country AS pc
+        -- Every country is available, unless one is selected.
+        WHERE country_id IS NULL
+        ORDER BY pc.iso_2
+    ), aggregated_physical_country_counts AS (
+        SELECT pc.id
+             , pc.iso_2
+             , pc.name
+             , COALESCE(SUM(sh.countable_count), 0) AS count
+             , false AS has_children
+        FROM available_physical_country AS pc
+        LEFT JOIN available_history AS sh ON sh.physical_country_id = pc.id
+        GROUP BY pc.id
+               , pc.iso_2
+               , pc.name
+        ORDER BY pc.iso_2
+    )
+    SELECT
+        jsonb_build_object(
+          'unit_type', unit_type,
+          'stats', (SELECT jsonb_agg(to_jsonb(source.*)) FROM available_history_stats AS source),
+          'breadcrumb',jsonb_build_object(
+            'region', (SELECT jsonb_agg(to_jsonb(source.*)) FROM breadcrumb_region AS source),
+            'activity_category', (SELECT jsonb_agg(to_jsonb(source.*)) FROM breadcrumb_activity_category AS source),
+            'sector', (SELECT jsonb_agg(to_jsonb(source.*)) FROM breadcrumb_sector AS source),
+            'legal_form', (SELECT jsonb_agg(to_jsonb(source.*)) FROM breadcrumb_legal_form AS source),
+            'status', (SELECT jsonb_agg(to_jsonb(source.*)) FROM breadcrumb_status AS source),
+            'country', (SELECT jsonb_agg(to_jsonb(source.*)) FROM breadcrumb_physical_country AS source)
+          ),
+          'available',jsonb_build_object(
+            'region', (SELECT jsonb_agg(to_jsonb(source.*)) FROM aggregated_region_counts AS source WHERE count > 0),
+            'activity_category', (SELECT jsonb_agg(to_jsonb(source.*)) FROM aggregated_activity_counts AS source WHERE count > 0),
+            'sector', (SELECT jsonb_agg(to_jsonb(source.*)) FROM aggregated_sector_counts AS source WHERE count > 0),
+            'legal_form', (SELECT jsonb_agg(to_jsonb(source.*)) FROM aggregated_legal_form_counts AS source WHERE count > 0),
+            'status', (SELECT jsonb_agg(to_jsonb(source.*)) FROM aggregated_status_counts AS source WHERE count > 0),
+            'country', (SELECT jsonb_agg(to_jsonb(source.*)) FROM aggregated_physical_country_counts AS source WHERE count > 0)
+          ),
+          'filter',jsonb_build_object(
+            'type',param_resolution,
+            'year',param_year,
+            'unit_type',param_unit_type,
+            'region_path',param_region_path,
+            'activity_category_path',param_activity_category_path,
+            'sector_path',param_sector_path,
+            'legal_form_id',param_legal_form_id,
+            'status_id',param_status_id,
+            'country_id',param_country_id
+          )
+        )
+    FROM params;
+$statistical_history_drilldown_uncached$;
+
+CREATE OR REPLACE FUNCTION public.statistical_history_drilldown(unit_type statistical_unit_type DEFAULT 'enterprise'::statistical_unit_type, resolution history_resolution DEFAULT 'year'::history_resolution, year integer DEFAULT NULL::integer, region_path ltree DEFAULT NULL::ltree, activity_category_path ltree DEFAULT NULL::ltree, sector_path ltree DEFAULT NULL::ltree, status_id integer DEFAULT NULL::integer, legal_form_id integer DEFAULT NULL::integer, country_id integer DEFAULT NULL::integer, year_min integer DEFAULT NULL::integer, year_max integer DEFAULT NULL::integer)
+ RETURNS jsonb
+ LANGUAGE plpgsql
+ SECURITY DEFINER
+ SET search_path TO 'public', 'pg_temp'
+AS $statistical_history_drilldown$
+DECLARE
+    v_args jsonb := jsonb_build_array(unit_type, resolution, year, region_path, activity_category_path,
+                                      sector_path, status_id, legal_form_id, country_id, year_min, year_max);
+    v_generation bigint;
+    v_result jsonb;
+BEGIN
+    SELECT g.generation, c.result INTO v_generation, v_result
+    FROM public.drilldown_cache_generation AS g
+    LEFT JOIN public.drilldown_cache AS c
+           ON c.function_name = g.function_name
+          AND c.args = v_args
+          AND c.generation = g.generation
+    WHERE g.function_name = 'statistical_history_drilldown';
+
+    IF v_result IS NOT NULL THEN
+        RETURN v_result;
+    END IF;
+
+    v_result := public.statistical_history_drilldown_uncached(
+        unit_type, resolution, year, region_path, activity_category_path,
+        sector_path, status_id, legal_form_id, country_id, year_min, year_max);
+
+    IF NOT current_setting('transaction_read_only')::boolean THEN
+        INSERT INTO public.drilldown_cache AS c (function_name, args, generation, result)
+        VALUES ('statistical_history_drilldown', v_args, v_generation, v_result)
+        ON CONFLICT (function_name, args) DO UPDATE
+           SET generation = EXCLUDED.generation
+             , result = EXCLUDED.result
+             , created_at = EXCLUDED.created_at
+         WHERE c.generation < EXCLUDED.generation;
+    END IF;
+
+    RETURN v_result;
+END;
+$statistical_history_drilldown$;
+
+END;
@@ -1,4 +1,10 @@
-```sql
+-- Down Migration 20261018110000: batch task claiming in process_tasks
+--
+-- Restores process_tasks without p_claim_batch.
+BEGIN;
+
+DROP PROCEDURE worker.process_tasks(integer, integer, text, bigint, worker.process_mode, integer);
+
 CREATE OR REPLACE PROCEDURE worker.process_tasks(IN p_batch_size integer DEFAULT NULL::integer, IN p_max_runtime_ms integer DEFAULT NULL::integer, IN p_queue text DEFAULT NULL::text, IN p_max_priority bigint DEFAULT NULL::bigint, IN p_mode worker.process_mode DEFAULT NULL::worker.process_mode)
  LANGUAGE plpgsql
 AS $procedure$
@@ -346,5 +352,12 @@ BEGIN
     END IF;
   END LOOP;
 END;
-$procedure$
-```
+$procedure$;
+
+COMMENT ON PROCEDURE worker.process_tasks IS
+'Structured concurrency executor. Picks tasks depth-first with mode-aware ordering.
+Serial fiber processes top-level and serial children; concurrent fibers process
+parallel children with SKIP LOCKED. Calls complete_parent_if_ready on completion.
+Retries on deadlock/serialization failure (optimistic concurrency).';
+
+END;
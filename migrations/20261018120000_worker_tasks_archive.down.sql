@@ -0,0 +1,72 @@
+-- Down Migration 20261018120000: worker tasks archive
+--
+-- Moves archived task trees back into worker.tasks, restores
+-- command_task_cleanup and public.worker_task, and drops the archive.
+BEGIN;
+
+CREATE OR REPLACE VIEW public.worker_task
+WITH (security_invoker = on)
+AS
+SELECT t.id,
+    t.command,
+    t.priority,
+    t.state,
+    t.parent_id,
+    t.depth,
+    t.child_mode,
+    t.created_at,
+    t.process_start_at,
+    t.process_stop_at,
+    t.completed_at,
+    t.process_duration_ms,
+    t.completion_duration_ms,
+    t.error,
+    t.scheduled_at,
+    t.worker_pid,
+    t.payload,
+    t.info,
+    cr.queue,
+    cr.description AS command_description
+FROM worker.tasks AS t
+JOIN worker.command_registry AS cr ON cr.command = t.command;
+
+INSERT INTO worker.tasks (
+    id, command, priority, created_at, state, process_start_at, completed_at,
+    process_duration_ms, error, scheduled_at, worker_pid, payload, parent_id,
+    child_mode, depth, process_stop_at, completion_duration_ms, info
+)
+SELECT id, command, priority, created_at, state, process_start_at, completed_at,
+       process_duration_ms, error, scheduled_at, worker_pid, payload, parent_id,
+       child_mode, depth, process_stop_at, completion_duration_ms, info
+FROM worker.tasks_archive;
+
+CREATE OR REPLACE PROCEDURE worker.command_task_cleanup(IN payload jsonb, INOUT p_info jsonb DEFAULT NULL::jsonb)
+ LANGUAGE plpgsql
+ SET search_path TO 'public', 'worker', 'pg_temp'
+AS $command_task_cleanup$
+DECLARE
+    v_completed_retention_days INT = COALESCE((payload->>'completed_retention_days')::int, 7);
+    v_failed_retention_days INT = COALESCE((payload->>'failed_retention_days')::int, 30);
+BEGIN
+    DELETE FROM worker.tasks
+    WHERE state = 'completed'::worker.task_state
+      AND process_start_at < (now() - (v_completed_retention_days || ' days')::interval);
+
+    DELETE FROM worker.tasks
+    WHERE state = 'failed'::worker.task_state
+      AND process_start_at < (now() - (v_failed_retention_days || ' days')::interval);
+
+    PERFORM worker.enqueue_task_cleanup(
+      v_completed_retention_days,
+      v_failed_retention_days
+    );
+END;
+$command_task_cleanup$;
+
+DROP FUNCTION worker.archive_completed_task_trees(interval, integer);
+DROP FUNCTION worker.tasks_archive_drop_partitions(integer);
+DROP FUNCTION worker.tasks_archive_ensure_partition(date);
+DROP INDEX worker.idx_tasks_completed_root;
+DROP TABLE worker.tasks_archive;
+
+END;
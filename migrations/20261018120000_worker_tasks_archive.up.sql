@@ -0,0 +1,280 @@
+-- Migration 20261018120000: worker tasks archive (UP)
+--
+-- Problem: worker.tasks keeps every finished task, with its payload and info
+-- jsonb, until task_cleanup deletes it after 7 days. On busy installations
+-- (imports create thousands of tasks) the table and its partial indexes bloat,
+-- and every pickup query in process_tasks pays for it.
+--
+-- Solution: a cold table worker.tasks_archive, range-partitioned by day.
+--   * worker.archive_completed_task_trees() moves whole task trees whose root
+--     completed at least a minute ago, in one DELETE ... RETURNING into INSERT.
+--     A tree is only moved once its root is completed, so worker.tasks never
+--     loses a parent that live tasks still point to. The worker calls it after
+--     each process_tasks call that did work, so trees leave the hot table
+--     shortly after they finish; task_cleanup sweeps up the rest daily.
+--     process_tasks itself does not archive, so callers (and tests) that
+--     count worker.tasks see the same rows however long a call took. The
+--     minute of grace keeps just-finished tasks visible to the worker's own
+--     per-call logging.
+--   * Partitioning is on root_completed_at (the root's completed_at, copied to
+--     every task of the tree), so a tree always lands in one partition and
+--     retention drops whole trees.
+--   * task_cleanup drops archive partitions older than completed_retention_days
+--     instead of deleting rows. Failed trees stay in worker.tasks for
+--     inspection and are deleted after failed_retention_days as before.
+--   * public.worker_task (admin UI, timing reports) becomes the union of both
+--     tables, so history stays visible with the same columns.
+BEGIN;
+
+----------------------------------------------------------------------
+-- 1. Archive table
+----------------------------------------------------------------------
+
+CREATE TABLE worker.tasks_archive (
+    id bigint NOT NULL,
+    command text NOT NULL,
+    priority bigint,
+    created_at timestamptz,
+    state worker.task_state,
+    process_start_at timestamptz,
+    completed_at timestamptz,
+    process_duration_ms numeric,
+    error text,
+    scheduled_at timestamptz,
+    worker_pid integer,
+    payload jsonb,
+    parent_id bigint,
+    child_mode worker.child_mode,
+    depth integer NOT NULL,
+    process_stop_at timestamptz,
+    completion_duration_ms numeric,
+    info jsonb,
+    root_id bigint NOT NULL,
+    root_completed_at timestamptz NOT NULL,
+    PRIMARY KEY (id, root_completed_at)
+) PARTITION BY RANGE (root_completed_at);
+
+CREATE INDEX idx_tasks_archive_root_id ON worker.tasks_archive (root_id);
+
+COMMENT ON TABLE worker.tasks_archive IS
+'Completed task trees moved out of worker.tasks by archive_completed_task_trees. One partition per
+UTC day of the root''s completion (tasks_archive_pYYYYMMDD); task_cleanup drops
+partitions past the completed retention. Read through public.worker_task.';
+COMMENT ON COLUMN worker.tasks_archive.root_id IS
+'Top-level task of the tree this task belonged to.';
+COMMENT ON COLUMN worker.tasks_archive.root_completed_at IS
+'completed_at of the root task; the partition key, shared by the whole tree.';
+
+GRANT SELECT ON worker.tasks_archive TO authenticated;
+
+-- Finds archivable roots without scanning the rest of the hot table.
+CREATE INDEX idx_tasks_completed_root ON worker.tasks (completed_at)
+WHERE parent_id IS NULL AND state = 'completed'::worker.task_state;
+
+----------------------------------------------------------------------
+-- 2. Partition management
+----------------------------------------------------------------------
+
+CREATE FUNCTION worker.tasks_archive_ensure_partition(p_day date)
+ RETURNS regclass
+ LANGUAGE plpgsql
+ SET search_path TO 'public', 'worker', 'pg_temp'
+AS $tasks_archive_ensure_partition$
+DECLARE
+    v_name text := format('tasks_archive_p%s', to_char(p_day, 'YYYYMMDD'));
+BEGIN
+    IF to_regclass(format('worker.%I', v_name)) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE worker.%I PARTITION OF worker.tasks_archive FOR VALUES FROM (%L) TO (%L)',
+            v_name,
+            p_day::timestamp AT TIME ZONE 'UTC',
+            (p_day + 1)::timestamp AT TIME ZONE 'UTC');
+    END IF;
+    RETURN format('worker.%I', v_name)::regclass;
+END;
+$tasks_archive_ensure_partition$;
+
+CREATE FUNCTION worker.tasks_archive_drop_partitions(p_retention_days integer)
+ RETURNS integer
+ LANGUAGE plpgsql
+ SET search_path TO 'public', 'worker', 'pg_temp'
+AS $tasks_archive_drop_partitions$
+DECLARE
+    v_cutoff date := (now() AT TIME ZONE 'UTC')::date - p_retention_days;
+    v_partition record;
+    v_dropped integer := 0;
+BEGIN
+    FOR v_partition IN
+        SELECT c.relname
+        FROM pg_inherits AS i
+        JOIN pg_class AS c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'worker.tasks_archive'::regclass
+          AND c.relname ~ '^tasks_archive_p[0-9]{8}$'
+          AND to_date(substr(c.relname, 16), 'YYYYMMDD') < v_cutoff
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format('DROP TABLE worker.%I', v_partition.relname);
+        v_dropped := v_dropped + 1;
+    END LOOP;
+    RETURN v_dropped;
+END;
+$tasks_archive_drop_partitions$;
+
+----------------------------------------------------------------------
+-- 3. Moving completed trees
+----------------------------------------------------------------------
+
+CREATE FUNCTION worker.archive_completed_task_trees(
+    p_min_age interval DEFAULT '1 minute',
+    p_max_roots integer DEFAULT 1000
+)
+ RETURNS integer
+ LANGUAGE plpgsql
+ SET search_path TO 'public', 'worker', 'pg_temp'
+AS $archive_completed_task_trees$
+DECLARE
+    v_root_ids bigint[];
+    v_root_completed_at timestamptz[];
+    v_day date;
+    v_moved integer;
+BEGIN
+    -- One archiver at a time; concurrent fibers simply skip.
+    IF NOT pg_try_advisory_xact_lock(hashtext('worker.tasks_archive')) THEN
+        RETURN 0;
+    END IF;
+
+    SELECT array_agg(r.id ORDER BY r.completed_at), array_agg(r.completed_at ORDER BY r.completed_at)
+    INTO v_root_ids, v_root_completed_at
+    FROM (
+        SELECT t.id, t.completed_at
+        FROM worker.tasks AS t
+        WHERE t.parent_id IS NULL
+          AND t.state = 'completed'::worker.task_state
+          AND t.completed_at < now() - p_min_age
+        ORDER BY t.completed_at
+        LIMIT p_max_roots
+        FOR UPDATE OF t SKIP LOCKED
+    ) AS r;
+
+    IF v_root_ids IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    FOR v_day IN
+        SELECT DISTINCT (c.completed_at AT TIME ZONE 'UTC')::date FROM unnest(v_root_completed_at) AS c(completed_at)
+    LOOP
+        PERFORM worker.tasks_archive_ensure_partition(v_day);
+    END LOOP;
+
+    WITH RECURSIVE tree AS (
+        SELECT r.id, r.id AS root_id, r.completed_at AS root_completed_at
+        FROM unnest(v_root_ids, v_root_completed_at) AS r(id, completed_at)
+        UNION ALL
+        SELECT c.id, tree.root_id, tree.root_completed_at
+        FROM worker.tasks AS c
+        JOIN tree ON c.parent_id = tree.id
+    ), moved AS (
+        DELETE FROM worker.tasks AS t
+        USING tree
+        WHERE t.id = tree.id
+        RETURNING t.*, tree.root_id, tree.root_completed_at
+    )
+    INSERT INTO worker.tasks_archive (
+        id, command, priority, created_at, state, process_start_at, completed_at,
+        process_duration_ms, error, scheduled_at, worker_pid, payload, parent_id,
+        child_mode, depth, process_stop_at, completion_duration_ms, info,
+        root_id, root_completed_at
+    )
+    SELECT id, command, priority, created_at, state, process_start_at, completed_at,
+           process_duration_ms, error, scheduled_at, worker_pid, payload, parent_id,
+           child_mode, depth, process_stop_at, completion_duration_ms, info,
+           root_id, root_completed_at
+    FROM moved;
+
+    GET DIAGNOSTICS v_moved = ROW_COUNT;
+    RETURN v_moved;
+END;
+$archive_completed_task_trees$;
+
+----------------------------------------------------------------------
+-- 4. task_cleanup: sweep, and retention of the archive by dropping partitions
+----------------------------------------------------------------------
+
+CREATE OR REPLACE PROCEDURE worker.command_task_cleanup(IN payload jsonb, INOUT p_info jsonb DEFAULT NULL::jsonb)
+ LANGUAGE plpgsql
+ SET search_path TO 'public', 'worker', 'pg_temp'
+AS $command_task_cleanup$
+DECLARE
+    v_completed_retention_days INT = COALESCE((payload->>'completed_retention_days')::int, 7);
+    v_failed_retention_days INT = COALESCE((payload->>'failed_retention_days')::int, 30);
+    v_archived INT := 0;
+    v_moved INT;
+BEGIN
+    -- Sweep completed trees the worker has not moved yet (e.g. on an idle worker).
+    LOOP
+        v_moved := worker.archive_completed_task_trees();
+        EXIT WHEN v_moved = 0;
+        v_archived := v_archived + v_moved;
+    END LOOP;
+
+    DELETE FROM worker.tasks
+    WHERE state = 'completed'::worker.task_state
+      AND process_start_at < (now() - (v_completed_retention_days || ' days')::interval);
+
+    DELETE FROM worker.tasks
+    WHERE state = 'failed'::worker.task_state
+      AND process_start_at < (now() - (v_failed_retention_days || ' days')::interval);
+
+    p_info := jsonb_build_object(
+      'archived_task_count', v_archived,
+      'dropped_archive_partitions', worker.tasks_archive_drop_partitions(v_completed_retention_days)
+    );
+
+    PERFORM worker.enqueue_task_cleanup(
+      v_completed_retention_days,
+      v_failed_retention_days
+    );
+END;
+$command_task_cleanup$;
+
+----------------------------------------------------------------------
+-- 5. Unified view for the admin UI and timing reports
+----------------------------------------------------------------------
+
+CREATE OR REPLACE VIEW public.worker_task
+WITH (security_invoker = on)
+AS
+SELECT t.id,
+    t.command,
+    t.priority,
+    t.state,
+    t.parent_id,
+    t.depth,
+    t.child_mode,
+    t.created_at,
+    t.process_start_at,
+    t.process_stop_at,
+    t.completed_at,
+    t.process_duration_ms,
+    t.completion_duration_ms,
+    t.error,
+    t.scheduled_at,
+    t.worker_pid,
+    t.payload,
+    t.info,
+    cr.queue,
+    cr.description AS command_description
+FROM (
+    SELECT id, command, priority, state, parent_id, depth, child_mode, created_at,
+           process_start_at, process_stop_at, completed_at, process_duration_ms,
+           completion_duration_ms, error, scheduled_at, worker_pid, payload, info
+    FROM worker.tasks
+    UNION ALL
+    SELECT id, command, priority, state, parent_id, depth, child_mode, created_at,
+           process_start_at, process_stop_at, completed_at, process_duration_ms,
+           completion_duration_ms, error, scheduled_at, worker_pid, payload, info
+    FROM worker.tasks_archive
+) AS t
+JOIN worker.command_registry AS cr ON cr.command = t.command;
+
+END;
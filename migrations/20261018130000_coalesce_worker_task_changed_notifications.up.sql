@@ -0,0 +1,80 @@
+-- Migration 20261018130000: coalesce worker_task_changed notifications (UP)
+--
+-- Problem: trg_notify_task_changed fires FOR EACH ROW, so every task state
+-- change sends its own pg_notify. An import that creates tens of thousands of
+-- tasks sends tens of thousands of notifications, and a batch claim in
+-- process_tasks (one UPDATE of many siblings) sends one per claimed row.
+--
+-- Solution: a statement-level trigger with transition tables. Each UPDATE
+-- statement sends one notification per parent_id among the rows whose state
+-- changed, carrying the number of changed tasks, the count per new state and
+-- the first 100 task ids. The SSE layer merges these per parent_id over a
+-- 1s window before sending them to browsers.
+--
+-- Payload: {"parent_id": 17, "count": 250, "states": {"processing": 250},
+--           "ids": [18, 19, ...], "truncated": true}
+-- "truncated" says the id list was cut at 100, so merged payloads can keep it
+-- even when their counts and de-duplicated ids no longer line up.
+BEGIN;
+
+DROP TRIGGER trg_notify_task_changed ON worker.tasks;
+DROP FUNCTION worker.notify_task_changed();
+
+CREATE FUNCTION worker.notify_task_changed()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = worker, pg_temp
+AS $notify_task_changed$
+DECLARE
+    v_payload text;
+BEGIN
+    -- Only notify on actual state changes, not every UPDATE
+    FOR v_payload IN
+        WITH changed AS (
+            SELECT new_row.id, new_row.parent_id, new_row.state
+            FROM new_rows AS new_row
+            JOIN old_rows AS old_row ON old_row.id = new_row.id
+            WHERE old_row.state IS DISTINCT FROM new_row.state
+        ), per_state AS (
+            SELECT parent_id, state, count(*) AS state_count
+            FROM changed
+            GROUP BY parent_id, state
+        ), per_parent AS (
+            SELECT parent_id
+                 , count(*) AS task_count
+                 , (array_agg(id ORDER BY id))[1:100] AS ids
+            FROM changed
+            GROUP BY parent_id
+        )
+        SELECT json_build_object(
+                   'parent_id', pp.parent_id,
+                   'count', pp.task_count,
+                   'states', (SELECT json_object_agg(ps.state, ps.state_count)
+                              FROM per_state AS ps
+                              WHERE ps.parent_id IS NOT DISTINCT FROM pp.parent_id),
+                   'ids', pp.ids,
+                   'truncated', pp.task_count > 100
+               )::text
+        FROM per_parent AS pp
+    LOOP
+        PERFORM pg_notify('worker_task_changed', v_payload);
+    END LOOP;
+    RETURN NULL;
+END;
+$notify_task_changed$;
+
+COMMENT ON FUNCTION worker.notify_task_changed IS
+'Statement-level trigger: sends one pg_notify per parent_id for the tasks whose
+state changed in the statement, so the admin UI can replace polling with
+event-driven updates. Payload has parent_id, count, states (count per new
+state), ids (at most 100) and truncated (true when ids was cut). Merged per
+parent_id over 1s windows in the SSE layer.';
+
+CREATE TRIGGER trg_notify_task_changed
+    AFTER UPDATE ON worker.tasks
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION worker.notify_task_changed();
+
+END;
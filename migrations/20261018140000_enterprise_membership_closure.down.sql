@@ -0,0 +1,441 @@
+-- Down Migration 20261018140000: enterprise membership closure
+BEGIN;
+
+CREATE OR REPLACE FUNCTION public.relevant_statistical_units(unit_type statistical_unit_type, unit_id integer, valid_on date DEFAULT CURRENT_DATE)
+ RETURNS SETOF statistical_unit
+ LANGUAGE sql
+ STABLE
+AS $relevant_statistical_units$
+    -- Step 1: Find the enterprise row directly via temporal PK index
+    WITH root_unit AS (
+        SELECT su.unit_type, su.unit_id,
+               su.related_legal_unit_ids,
+               su.related_establishment_ids,
+               su.external_idents
+        FROM public.statistical_unit AS su
+        WHERE su.unit_type = 'enterprise'
+          AND su.unit_id = public.statistical_unit_enterprise_id($1, $2, $3)
+          AND su.valid_from <= $3 AND $3 < su.valid_until
+    -- Step 2: Collect all relevant (unit_type, unit_id) pairs from arrays
+    ), relevant_ids AS (
+        SELECT 'enterprise'::statistical_unit_type AS unit_type, ru.unit_id FROM root_unit AS ru
+        UNION ALL
+        SELECT 'legal_unit'::statistical_unit_type, unnest(ru.related_legal_unit_ids) FROM root_unit AS ru
+        UNION ALL
+        SELECT 'establishment'::statistical_unit_type, unnest(ru.related_establishment_ids) FROM root_unit AS ru
+    -- Step 3: Single join back to get full rows, ordered by external ident priority
+    ), full_units AS (
+        SELECT su.*
+            , first_external.ident AS first_external_ident
+        FROM relevant_ids AS ri
+        JOIN public.statistical_unit AS su
+          ON su.unit_type = ri.unit_type
+         AND su.unit_id = ri.unit_id
+         AND su.valid_from <= $3 AND $3 < su.valid_until
+        LEFT JOIN LATERAL (
+            SELECT eit.code, (su.external_idents->>eit.code)::text AS ident
+            FROM public.external_ident_type AS eit
+            ORDER BY eit.priority
+            LIMIT 1
+        ) first_external ON true
+        ORDER BY su.unit_type, first_external_ident NULLS LAST, su.unit_id
+    )
+    SELECT unit_type
+         , unit_id
+         , valid_from
+         , valid_to
+         , valid_until
+         , external_idents
+         , name
+         , birth_date
+         , death_date
+         , search
+         , primary_activity_category_id
+         , primary_activity_category_path
+         , primary_activity_category_code
+         , secondary_activity_category_id
+         , secondary_activity_category_path
+         , secondary_activity_category_code
+         , activity_category_paths
+         , sector_id
+         , sector_path
+         , sector_code
+         , sector_name
+         , data_source_ids
+         , data_source_codes
+         , legal_form_id
+         , legal_form_code
+         , legal_form_name
+         --
+         , physical_address_part1
+         , physical_address_part2
+         , physical_address_part3
+         , physical_postcode
+         , physical_postplace
+         , physical_region_id
+         , physical_region_path
+         , physical_region_code
+         , physical_country_id
+         , physical_country_iso_2
+         , physical_latitude
+         , physical_longitude
+         , physical_altitude
+         --
+         , domestic
+         --
+         , postal_address_part1
+         , postal_address_part2
+         , postal_address_part3
+         , postal_postcode
+         , postal_postplace
+         , postal_region_id
+         , postal_region_path
+         , postal_region_code
+         , postal_country_id
+         , postal_country_iso_2
+         , postal_latitude
+         , postal_longitude
+         , postal_altitude
+         --
+         , web_address
+         , email_address
+         , phone_number
+         , landline
+         , mobile_number
+         , fax_number
+         --
+         , unit_size_id
+         , unit_size_code
+         --
+         , status_id
+         , status_code
+         , used_for_counting
+         --
+         , last_edit_comment
+         , last_edit_by_user_id
+         , last_edit_at
+         --
+         , has_legal_unit
+         , related_establishment_ids
+         , excluded_establishment_ids
+         , included_establishment_ids
+         , related_legal_unit_ids
+         , excluded_legal_unit_ids
+         , included_legal_unit_ids
+         , related_enterprise_ids
+         , excluded_enterprise_ids
+         , included_enterprise_ids
+         , stats
+         , stats_summary
+         , included_establishment_count
+         , included_legal_unit_count
+         , included_enterprise_count
+         , tag_paths
+         , daterange(valid_from, valid_until) AS valid_range
+         , hash_slot
+    FROM full_units;
+$relevant_statistical_units$;
+
+CREATE OR REPLACE FUNCTION public.statistical_unit_stats(
+    unit_type public.statistical_unit_type,
+    unit_id INTEGER,
+    valid_on DATE DEFAULT current_date
+) RETURNS SETOF public.statistical_unit_stats LANGUAGE sql STABLE AS $statistical_unit_stats$
+    WITH root_unit AS (
+        SELECT su.unit_id,
+               su.related_legal_unit_ids,
+               su.related_establishment_ids
+        FROM public.statistical_unit AS su
+        WHERE su.unit_type = 'enterprise'
+          AND su.unit_id = public.statistical_unit_enterprise_id($1, $2, $3)
+          AND su.valid_from <= $3 AND $3 < su.valid_until
+    ), relevant_ids AS (
+        SELECT 'enterprise'::statistical_unit_type AS unit_type, ru.unit_id FROM root_unit AS ru
+        UNION ALL
+        SELECT 'legal_unit'::statistical_unit_type, unnest(ru.related_legal_unit_ids) FROM root_unit AS ru
+        UNION ALL
+        SELECT 'establishment'::statistical_unit_type, unnest(ru.related_establishment_ids) FROM root_unit AS ru
+    )
+    SELECT su.unit_type, su.unit_id, su.valid_from, su.valid_to, su.stats, su.stats_summary
+    FROM relevant_ids AS ri
+    JOIN public.statistical_unit AS su
+      ON su.unit_type = ri.unit_type
+     AND su.unit_id = ri.unit_id
+     AND su.valid_from <= $3 AND $3 < su.valid_until
+    ORDER BY su.unit_type, su.unit_id;
+$statistical_unit_stats$;
+
+CREATE OR REPLACE FUNCTION worker.derive_statistical_unit(p_establishment_id_ranges int4multirange DEFAULT NULL::int4multirange, p_legal_unit_id_ranges int4multirange DEFAULT NULL::int4multirange, p_enterprise_id_ranges int4multirange DEFAULT NULL::int4multirange, p_power_group_id_ranges int4multirange DEFAULT NULL::int4multirange, p_valid_from date DEFAULT NULL::date, p_valid_until date DEFAULT NULL::date, p_task_id bigint DEFAULT NULL::bigint)
+ RETURNS jsonb
+ LANGUAGE plpgsql
+AS $derive_statistical_unit$
+DECLARE
+    v_batch RECORD;
+    v_establishment_ids INT[];
+    v_legal_unit_ids INT[];
+    v_enterprise_ids INT[];
+    v_power_group_ids INT[];
+    v_batch_count INT := 0;
+    v_is_full_refresh BOOLEAN;
+    v_orphan_enterprise_ids INT[];
+    v_orphan_legal_unit_ids INT[];
+    v_orphan_establishment_ids INT[];
+    v_orphan_power_group_ids INT[];
+    v_enterprise_count INT := 0;
+    v_legal_unit_count INT := 0;
+    v_establishment_count INT := 0;
+    v_power_group_count INT := 0;
+    v_pg_batch_size INT;
+BEGIN
+    v_is_full_refresh := (p_establishment_id_ranges IS NULL
+                         AND p_legal_unit_id_ranges IS NULL
+                         AND p_enterprise_id_ranges IS NULL
+                         AND p_power_group_id_ranges IS NULL);
+
+    IF v_is_full_refresh THEN
+        FOR v_batch IN SELECT * FROM public.get_temporally_closed_change_sets(p_target_change_set_size => 1000)
+        LOOP
+            v_enterprise_count := v_enterprise_count + COALESCE(array_length(v_batch.enterprise_ids, 1), 0);
+            v_legal_unit_count := v_legal_unit_count + COALESCE(array_length(v_batch.legal_unit_ids, 1), 0);
+            v_establishment_count := v_establishment_count + COALESCE(array_length(v_batch.establishment_ids, 1), 0);
+
+            PERFORM worker.spawn(
+                p_command => 'statistical_unit_refresh_batch',
+                p_payload => jsonb_build_object(
+                    'command', 'statistical_unit_refresh_batch',
+                    'batch_seq', v_batch.change_set_seq,
+                    'enterprise_ids', v_batch.enterprise_ids,
+                    'legal_unit_ids', v_batch.legal_unit_ids,
+                    'establishment_ids', v_batch.establishment_ids,
+                    'valid_from', p_valid_from,
+                    'valid_until', p_valid_until
+                ),
+                p_parent_id => p_task_id
+            );
+            v_batch_count := v_batch_count + 1;
+        END LOOP;
+
+        v_power_group_ids := ARRAY(SELECT id FROM public.power_group ORDER BY id);
+        v_power_group_count := COALESCE(array_length(v_power_group_ids, 1), 0);
+        IF v_power_group_count > 0 THEN
+            v_pg_batch_size := GREATEST(1, ceil(v_power_group_count::numeric / 64));
+            FOR v_batch IN
+                SELECT array_agg(pg_id ORDER BY pg_id) AS pg_ids
+                FROM (SELECT pg_id, ((row_number() OVER (ORDER BY pg_id)) - 1) / v_pg_batch_size AS batch_idx
+                      FROM unnest(v_power_group_ids) AS pg_id) AS t
+                GROUP BY batch_idx ORDER BY batch_idx
+            LOOP
+                PERFORM worker.spawn(
+                    p_command => 'statistical_unit_refresh_batch',
+                    p_payload => jsonb_build_object(
+                        'command', 'statistical_unit_refresh_batch',
+                        'batch_seq', v_batch_count + 1,
+                        'power_group_ids', v_batch.pg_ids,
+                        'valid_from', p_valid_from,
+                        'valid_until', p_valid_until
+                    ),
+                    p_parent_id => p_task_id
+                );
+                v_batch_count := v_batch_count + 1;
+            END LOOP;
+        END IF;
+    ELSE
+        v_establishment_ids := ARRAY(SELECT generate_series(lower(r), upper(r)-1) FROM unnest(COALESCE(p_establishment_id_ranges, '{}'::int4multirange)) AS t(r));
+        v_legal_unit_ids := ARRAY(SELECT generate_series(lower(r), upper(r)-1) FROM unnest(COALESCE(p_legal_unit_id_ranges, '{}'::int4multirange)) AS t(r));
+        v_enterprise_ids := ARRAY(SELECT generate_series(lower(r), upper(r)-1) FROM unnest(COALESCE(p_enterprise_id_ranges, '{}'::int4multirange)) AS t(r));
+        v_power_group_ids := ARRAY(SELECT generate_series(lower(r), upper(r)-1) FROM unnest(COALESCE(p_power_group_id_ranges, '{}'::int4multirange)) AS t(r));
+
+        IF COALESCE(array_length(v_enterprise_ids, 1), 0) > 0 THEN
+            v_orphan_enterprise_ids := ARRAY(SELECT id FROM unnest(v_enterprise_ids) AS id EXCEPT SELECT e.id FROM public.enterprise AS e WHERE e.id = ANY(v_enterprise_ids));
+            IF COALESCE(array_length(v_orphan_enterprise_ids, 1), 0) > 0 THEN
+                DELETE FROM public.timepoints WHERE unit_type = 'enterprise' AND unit_id = ANY(v_orphan_enterprise_ids);
+                DELETE FROM public.timesegments WHERE unit_type = 'enterprise' AND unit_id = ANY(v_orphan_enterprise_ids);
+                DELETE FROM public.timeline_enterprise WHERE enterprise_id = ANY(v_orphan_enterprise_ids);
+                DELETE FROM public.statistical_unit WHERE unit_type = 'enterprise' AND unit_id = ANY(v_orphan_enterprise_ids);
+                INSERT INTO public.statistical_unit_facet_dirty_hash_slots (dirty_hash_slot)
+                SELECT DISTINCT public.hash_slot('enterprise', id)
+                FROM unnest(v_orphan_enterprise_ids) AS id
+                ON CONFLICT DO NOTHING;
+            END IF;
+        END IF;
+        IF COALESCE(array_length(v_legal_unit_ids, 1), 0) > 0 THEN
+            v_orphan_legal_unit_ids := ARRAY(SELECT id FROM unnest(v_legal_unit_ids) AS id EXCEPT SELECT lu.id FROM public.legal_unit AS lu WHERE lu.id = ANY(v_legal_unit_ids));
+            IF COALESCE(array_length(v_orphan_legal_unit_ids, 1), 0) > 0 THEN
+                DELETE FROM public.timepoints WHERE unit_type = 'legal_unit' AND unit_id = ANY(v_orphan_legal_unit_ids);
+                DELETE FROM public.timesegments WHERE unit_type = 'legal_unit' AND unit_id = ANY(v_orphan_legal_unit_ids);
+                DELETE FROM public.timeline_legal_unit WHERE legal_unit_id = ANY(v_orphan_legal_unit_ids);
+                DELETE FROM public.statistical_unit WHERE unit_type = 'legal_unit' AND unit_id = ANY(v_orphan_legal_unit_ids);
+                INSERT INTO public.statistical_unit_facet_dirty_hash_slots (dirty_hash_slot)
+                SELECT DISTINCT public.hash_slot('legal_unit', id)
+                FROM unnest(v_orphan_legal_unit_ids) AS id
+                ON CONFLICT DO NOTHING;
+            END IF;
+        END IF;
+        IF COALESCE(array_length(v_establishment_ids, 1), 0) > 0 THEN
+            v_orphan_establishment_ids := ARRAY(SELECT id FROM unnest(v_establishment_ids) AS id EXCEPT SELECT es.id FROM public.establishment AS es WHERE es.id = ANY(v_establishment_ids));
+            IF COALESCE(array_length(v_orphan_establishment_ids, 1), 0) > 0 THEN
+                DELETE FROM public.timepoints WHERE unit_type = 'establishment' AND unit_id = ANY(v_orphan_establishment_ids);
+                DELETE FROM public.timesegments WHERE unit_type = 'establishment' AND unit_id = ANY(v_orphan_establishment_ids);
+                DELETE FROM public.timeline_establishment WHERE establishment_id = ANY(v_orphan_establishment_ids);
+                DELETE FROM public.statistical_unit WHERE unit_type = 'establishment' AND unit_id = ANY(v_orphan_establishment_ids);
+                INSERT INTO public.statistical_unit_facet_dirty_hash_slots (dirty_hash_slot)
+                SELECT DISTINCT public.hash_slot('establishment', id)
+                FROM unnest(v_orphan_establishment_ids) AS id
+                ON CONFLICT DO NOTHING;
+            END IF;
+        END IF;
+        IF COALESCE(array_length(v_power_group_ids, 1), 0) > 0 THEN
+            v_orphan_power_group_ids := ARRAY(SELECT id FROM unnest(v_power_group_ids) AS id EXCEPT SELECT pg.id FROM public.power_group AS pg WHERE pg.id = ANY(v_power_group_ids));
+            IF COALESCE(array_length(v_orphan_power_group_ids, 1), 0) > 0 THEN
+                DELETE FROM public.timepoints WHERE unit_type = 'power_group' AND unit_id = ANY(v_orphan_power_group_ids);
+                DELETE FROM public.timesegments WHERE unit_type = 'power_group' AND unit_id = ANY(v_orphan_power_group_ids);
+                DELETE FROM public.timeline_power_group WHERE power_group_id = ANY(v_orphan_power_group_ids);
+                DELETE FROM public.statistical_unit WHERE unit_type = 'power_group' AND unit_id = ANY(v_orphan_power_group_ids);
+                INSERT INTO public.statistical_unit_facet_dirty_hash_slots (dirty_hash_slot)
+                SELECT DISTINCT public.hash_slot('power_group', id)
+                FROM unnest(v_orphan_power_group_ids) AS id
+                ON CONFLICT DO NOTHING;
+            END IF;
+        END IF;
+
+        IF p_establishment_id_ranges IS NOT NULL
+           OR p_legal_unit_id_ranges IS NOT NULL
+           OR p_enterprise_id_ranges IS NOT NULL THEN
+            IF to_regclass('pg_temp._change_sets') IS NOT NULL THEN DROP TABLE _change_sets; END IF;
+            CREATE TEMP TABLE _change_sets ON COMMIT DROP AS
+            SELECT * FROM public.get_temporally_closed_change_sets(
+                p_target_change_set_size => 1000,
+                p_establishment_id_ranges => NULLIF(p_establishment_id_ranges, '{}'::int4multirange),
+                p_legal_unit_id_ranges => NULLIF(p_legal_unit_id_ranges, '{}'::int4multirange),
+                p_enterprise_id_ranges => NULLIF(p_enterprise_id_ranges, '{}'::int4multirange)
+            );
+            INSERT INTO public.statistical_unit_facet_dirty_hash_slots (dirty_hash_slot)
+            SELECT DISTINCT public.hash_slot(t.unit_type, t.unit_id)
+            FROM (
+                SELECT 'enterprise'::text AS unit_type, unnest(b.enterprise_ids) AS unit_id FROM _change_sets AS b
+                UNION ALL SELECT 'legal_unit', unnest(b.legal_unit_ids) FROM _change_sets AS b
+                UNION ALL SELECT 'establishment', unnest(b.establishment_ids) FROM _change_sets AS b
+            ) AS t WHERE t.unit_id IS NOT NULL
+            ON CONFLICT DO NOTHING;
+
+            <<effective_counts>>
+            DECLARE
+                v_all_batch_est_ranges int4multirange;
+                v_all_batch_lu_ranges int4multirange;
+                v_all_batch_en_ranges int4multirange;
+                v_propagated_lu int4multirange;
+                v_propagated_en int4multirange;
+                v_eff_est int4multirange;
+                v_eff_lu int4multirange;
+                v_eff_en int4multirange;
+            BEGIN
+                v_all_batch_est_ranges := (SELECT range_agg(int4range(id, id, '[]'))
+                    FROM (SELECT unnest(establishment_ids) AS id FROM _change_sets) AS t);
+                v_all_batch_lu_ranges := (SELECT range_agg(int4range(id, id, '[]'))
+                    FROM (SELECT unnest(legal_unit_ids) AS id FROM _change_sets) AS t);
+                v_all_batch_en_ranges := (SELECT range_agg(int4range(id, id, '[]'))
+                    FROM (SELECT unnest(enterprise_ids) AS id FROM _change_sets) AS t);
+
+                v_eff_est := NULLIF(
+                    COALESCE(v_all_batch_est_ranges, '{}'::int4multirange)
+                    * COALESCE(p_establishment_id_ranges, '{}'::int4multirange),
+                    '{}'::int4multirange);
+
+                SELECT range_agg(int4range(es.legal_unit_id, es.legal_unit_id, '[]'))
+                  INTO v_propagated_lu
+                  FROM public.establishment AS es
+                 WHERE es.id <@ COALESCE(p_establishment_id_ranges, '{}'::int4multirange)
+                   AND es.legal_unit_id IS NOT NULL;
+                v_eff_lu := NULLIF(
+                    COALESCE(v_all_batch_lu_ranges, '{}'::int4multirange)
+                    * (COALESCE(p_legal_unit_id_ranges, '{}'::int4multirange)
+                     + COALESCE(v_propagated_lu, '{}'::int4multirange)),
+                    '{}'::int4multirange);
+
+                SELECT range_agg(int4range(lu.enterprise_id, lu.enterprise_id, '[]'))
+                  INTO v_propagated_en
+                  FROM public.legal_unit AS lu
+                 WHERE lu.id <@ COALESCE(v_eff_lu, '{}'::int4multirange)
+                   AND lu.enterprise_id IS NOT NULL;
+                v_eff_en := NULLIF(
+                    COALESCE(v_all_batch_en_ranges, '{}'::int4multirange)
+                    * (COALESCE(p_enterprise_id_ranges, '{}'::int4multirange)
+                     + COALESCE(v_propagated_en, '{}'::int4multirange)),
+                    '{}'::int4multirange);
+
+                v_establishment_count := COALESCE((SELECT count(*) FROM unnest(COALESCE(v_eff_est, '{}'::int4multirange)) AS r, generate_series(lower(r), upper(r)-1))::INT, 0);
+                v_legal_unit_count := COALESCE((SELECT count(*) FROM unnest(COALESCE(v_eff_lu, '{}'::int4multirange)) AS r, generate_series(lower(r), upper(r)-1))::INT, 0);
+                v_enterprise_count := COALESCE((SELECT count(*) FROM unnest(COALESCE(v_eff_en, '{}'::int4multirange)) AS r, generate_series(lower(r), upper(r)-1))::INT, 0);
+            END effective_counts;
+
+            FOR v_batch IN SELECT * FROM _change_sets LOOP
+                PERFORM worker.spawn(
+                    p_command => 'statistical_unit_refresh_batch',
+                    p_payload => jsonb_build_object(
+                        'command', 'statistical_unit_refresh_batch',
+                        'batch_seq', v_batch.change_set_seq,
+                        'enterprise_ids', v_batch.enterprise_ids,
+                        'legal_unit_ids', v_batch.legal_unit_ids,
+                        'establishment_ids', v_batch.establishment_ids,
+                        'valid_from', p_valid_from,
+                        'valid_until', p_valid_until,
+                        'changed_establishment_id_ranges', p_establishment_id_ranges::text,
+                        'changed_legal_unit_id_ranges', p_legal_unit_id_ranges::text,
+                        'changed_enterprise_id_ranges', p_enterprise_id_ranges::text
+                    ),
+                    p_parent_id => p_task_id
+                );
+                v_batch_count := v_batch_count + 1;
+            END LOOP;
+        END IF;
+
+        IF COALESCE(array_length(v_power_group_ids, 1), 0) > 0 THEN
+            v_power_group_count := array_length(v_power_group_ids, 1);
+            INSERT INTO public.statistical_unit_facet_dirty_hash_slots (dirty_hash_slot)
+            SELECT DISTINCT public.hash_slot('power_group', pg_id)
+            FROM unnest(v_power_group_ids) AS pg_id
+            ON CONFLICT DO NOTHING;
+
+            v_pg_batch_size := GREATEST(1, ceil(v_power_group_count::numeric / 64));
+            FOR v_batch IN
+                SELECT array_agg(pg_id ORDER BY pg_id) AS pg_ids
+                FROM (SELECT pg_id, ((row_number() OVER (ORDER BY pg_id)) - 1) / v_pg_batch_size AS batch_idx
+                      FROM unnest(v_power_group_ids) AS pg_id) AS t
+                GROUP BY batch_idx ORDER BY batch_idx
+            LOOP
+                PERFORM worker.spawn(
+                    p_command => 'statistical_unit_refresh_batch',
+                    p_payload => jsonb_build_object(
+                        'command', 'statistical_unit_refresh_batch',
+                        'batch_seq', v_batch_count + 1,
+                        'power_group_ids', v_batch.pg_ids,
+                        'valid_from', p_valid_from,
+                        'valid_until', p_valid_until
+                    ),
+                    p_parent_id => p_task_id
+                );
+                v_batch_count := v_batch_count + 1;
+            END LOOP;
+        END IF;
+    END IF;
+
+    RAISE DEBUG 'derive_statistical_unit: Spawned % batch children with parent_id %, counts: es=%, lu=%, en=%, pg=%',
+        v_batch_count, p_task_id, v_establishment_count, v_legal_unit_count, v_enterprise_count, v_power_group_count;
+
+    -- BLOCK B: *_used_derive() calls removed. See worker.derive_used_tables
+    -- (spawned as a serial child of derive_units_phase AFTER flush_staging).
+
+    RETURN jsonb_build_object(
+        'effective_establishment_count', v_establishment_count,
+        'effective_legal_unit_count', v_legal_unit_count,
+        'effective_enterprise_count', v_enterprise_count,
+        'effective_power_group_count', v_power_group_count,
+        'batch_count', v_batch_count
+    );
+END;
+$derive_statistical_unit$;
+
+DROP PROCEDURE public.enterprise_membership_refresh(int4multirange, int4multirange, int4multirange);
+DROP TABLE public.enterprise_membership;
+
+END;
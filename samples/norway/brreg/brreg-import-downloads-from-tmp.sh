@@ -106,7 +106,7 @@ fi
 
 # Import roller (legal relationships)
 roller_file=$WORKSPACE/tmp/roller_legal_relationships.csv
-if [ -f "$roller_file" ]; then
+if [ -f "$roller_file" ] || [ -n "${ROLLER_STREAM:-}" ]; then
     # Seed legal relationship types
     echo "Seeding legal relationship types"
     $WORKSPACE/sb psql < samples/norway/brreg/seed-legal-rel-types.sql
@@ -135,9 +135,47 @@ if [ -f "$roller_file" ]; then
         default_valid_to = 'infinity'::DATE,
         review = false;"
 
-    # Load data
-    echo "Loading roller (legal relationships) data"
-    $WORKSPACE/sb psql -c "\copy public.import_roller_2025_upload FROM 'tmp/roller_legal_relationships.csv' WITH CSV HEADER DELIMITER ',' QUOTE '\"' ESCAPE '\"';"
+    if [ -n "${ROLLER_STREAM:-}" ]; then
+        # Stream straight from tmp/roller.json.gz into the job's upload table (no intermediate CSV).
+        # The upload commits, and the job starts, when the extraction finishes.
+        echo "Streaming roller (legal relationships) data into import_roller_2025"
+        eval "$($WORKSPACE/sb config show --postgres)"
+        "$WORKSPACE/.venv/bin/python3" samples/norway/brreg/extract-roller-to-csv.py --workers 0 --copy-to-job import_roller_2025
+    else
+        # Load data. With ROLLER_DELTA set, apply only the changes since the previous
+        # extraction (extract-roller-to-csv.py --delta) instead of the full set:
+        # added edges are imported from ..._added.csv, and the open legal_relationship
+        # rows of removed edges (..._removed.csv) are closed as of TODAY.
+        roller_upload=tmp/roller_legal_relationships.csv
+        if [ -n "${ROLLER_DELTA:-}" ] && [ -f "$WORKSPACE/tmp/roller_legal_relationships_added.csv" ] \
+            && [ -f "$WORKSPACE/tmp/roller_legal_relationships_removed.csv" ]; then
+            roller_upload=tmp/roller_legal_relationships_added.csv
+            echo "ROLLER_DELTA: closing removed edges from tmp/roller_legal_relationships_removed.csv"
+            $WORKSPACE/sb psql -v ON_ERROR_STOP=1 <<EOS
+CREATE TEMP TABLE roller_removed (
+    influencing_tax_ident text,
+    influenced_tax_ident text,
+    rel_type_code text,
+    percentage text
+);
+\\copy roller_removed FROM 'tmp/roller_legal_relationships_removed.csv' WITH CSV HEADER DELIMITER ',' QUOTE '"' ESCAPE '"'
+UPDATE public.legal_relationship AS lr
+SET valid_until = '${TODAY}'::DATE
+FROM roller_removed AS r
+JOIN public.external_ident_type AS eit ON eit.code = 'tax_ident'
+JOIN public.external_ident AS influencing ON influencing.type_id = eit.id AND influencing.ident = r.influencing_tax_ident
+JOIN public.external_ident AS influenced ON influenced.type_id = eit.id AND influenced.ident = r.influenced_tax_ident
+JOIN public.legal_rel_type AS lrt ON lrt.code = r.rel_type_code
+WHERE lr.influencing_id = influencing.legal_unit_id
+  AND lr.influenced_id = influenced.legal_unit_id
+  AND lr.type_id = lrt.id
+  AND lr.valid_from < '${TODAY}'::DATE
+  AND lr.valid_until = 'infinity'::DATE;
+EOS
+        fi
+        echo "Loading roller (legal relationships) data from ${roller_upload}"
+        $WORKSPACE/sb psql -c "\copy public.import_roller_2025_upload FROM '${roller_upload}' WITH CSV HEADER DELIMITER ',' QUOTE '\"' ESCAPE '\"';"
+    fi
 fi
 
 echo "Checking import job states"
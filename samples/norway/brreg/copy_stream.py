@@ -0,0 +1,128 @@
+"""
+Stream rows straight into an import job's upload table with COPY ... FROM STDIN.
+
+The COPY runs on a background thread and pulls CSV lines from a bounded queue,
+so the producer (an extractor) can hand rows over while it is still working,
+no intermediate file is written, and at most max_buffered_rows lines are held
+in memory: when the database falls behind, write_row() blocks.
+
+The upload table accepts a single INSERT/COPY statement per job (its
+statement triggers move the job from waiting_for_upload to upload_completed),
+so one CopyStream carries a job's whole upload. Nothing is visible to the
+import job before close() commits: the job starts after the producer is done,
+not alongside it.
+
+Connection parameters come from the usual libpq environment (PGHOST, PGPORT,
+PGDATABASE, PGUSER, PGPASSWORD), e.g. via `eval $(./sb config show --postgres)`.
+"""
+
+import csv
+import io
+import queue
+import threading
+
+import psycopg2
+from psycopg2 import sql
+
+_EOF = None
+
+
+class _QueueReader:
+    """File-like object for copy_expert(); read() drains CSV lines from a queue."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.pending = ''
+        self.done = False
+
+    def read(self, size=-1):
+        parts = [self.pending]
+        length = len(self.pending)
+        while not self.done and (size < 0 or length < size):
+            line = self.lines.get()
+            if line is _EOF:
+                self.done = True
+                break
+            parts.append(line)
+            length += len(line)
+        data = ''.join(parts)
+        if size < 0:
+            self.pending = ''
+            return data
+        self.pending = data[size:]
+        return data[:size]
+
+
+def upload_table_for_job(conn, job_slug):
+    """Look up public.import_job.upload_table_name for a job slug."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT upload_table_name, state FROM public.import_job WHERE slug = %s", (job_slug,))
+        row = cur.fetchone()
+    if row is None:
+        raise ValueError(f"No import job with slug {job_slug!r}")
+    table, state = row
+    if state != 'waiting_for_upload':
+        raise ValueError(f"Import job {job_slug!r} is in state {state!r}, not waiting_for_upload")
+    return table
+
+
+class CopyStream:
+    """COPY public.<upload table> (columns) FROM STDIN fed row by row from the caller's thread."""
+
+    def __init__(self, job_slug, columns, max_buffered_rows=10000):
+        self.conn = psycopg2.connect('')
+        self.table = upload_table_for_job(self.conn, job_slug)
+        self.rows = 0
+        self.error = None
+        self._lines = queue.Queue(maxsize=max_buffered_rows)
+        self._buf = io.StringIO()
+        self._writer = csv.writer(self._buf, lineterminator='\n')
+        statement = sql.SQL("COPY public.{} ({}) FROM STDIN WITH (FORMAT csv)").format(
+            sql.Identifier(self.table),
+            sql.SQL(', ').join(sql.Identifier(c) for c in columns),
+        )
+        self._thread = threading.Thread(target=self._copy, args=(statement,), daemon=True)
+        self._thread.start()
+
+    def _copy(self, statement):
+        try:
+            with self.conn.cursor() as cur:
+                cur.copy_expert(statement, _QueueReader(self._lines))
+        except Exception as e:
+            self.error = e
+            # Unblock a producer waiting on a full queue.
+            while True:
+                try:
+                    self._lines.get_nowait()
+                except queue.Empty:
+                    break
+
+    def _put(self, item):
+        while True:
+            if self.error is not None:
+                raise RuntimeError(f"COPY into public.{self.table} failed: {self.error}") from self.error
+            try:
+                self._lines.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def write_row(self, row):
+        self._writer.writerow(row)
+        line = self._buf.getvalue()
+        self._buf.seek(0)
+        self._buf.truncate()
+        self._put(line)
+        self.rows += 1
+
+    def close(self):
+        """Finish the COPY and commit, which hands the upload to the import job."""
+        self._put(_EOF)
+        self._thread.join()
+        if self.error is not None:
+            self.conn.rollback()
+            self.conn.close()
+            raise RuntimeError(f"COPY into public.{self.table} failed: {self.error}") from self.error
+        self.conn.commit()
+        self.conn.close()
+        return self.rows
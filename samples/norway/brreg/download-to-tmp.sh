@@ -14,7 +14,7 @@ if test ! -d "$VENV_DIR"; then
   echo "Creating Python venv"
   python3 -m venv "$VENV_DIR"
 fi
-"$VENV_DIR/bin/pip" install --quiet --upgrade pip ijson
+"$VENV_DIR/bin/pip" install --quiet --upgrade pip ijson numpy pyarrow psycopg2-binary
 PYTHON="$VENV_DIR/bin/python3"
 
 pushd $WORKSPACE/tmp
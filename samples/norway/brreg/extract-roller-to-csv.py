@@ -6,15 +6,47 @@ Reads tmp/roller.json.gz (streaming gzip + ijson for memory efficiency on ~2.8GB
 filters to controlling role types where both orgs exist in enheter.csv,
 deduplicates, and outputs tmp/roller_legal_relationships.csv.
 
+With --workers N (N > 1) a single reader decompresses the file and cuts it into
+batches of raw org objects, which a pool of N processes decodes and filters.
+The merged result is sorted, so the CSV is identical to the sequential run.
+
+With --delta the full CSV is still written (it is the next run's baseline), and
+in addition only the edges that changed since the previous run are written to
+tmp/roller_legal_relationships_added.csv and ..._removed.csv. A per-org digest
+of each influenced org's edge list (tmp/roller_legal_relationships.digests.csv)
+identifies the changed orgs, so only their rows of the previous CSV are
+re-read and compared. Every run that writes the CSV also rewrites the digests,
+so a later --delta run always compares against the latest snapshot.
+
+Every --checkpoint-every orgs the org count and the relationships found so far
+are written atomically to tmp/roller_extract.checkpoint.json.gz. After a crash,
+--resume continues from the last checkpoint (the skipped orgs are only
+scanned, not filtered again). The checkpoint is removed when a run completes.
+
+With --copy-to-job SLUG no CSV is written: each new relationship whose orgs are
+both in enheter.csv is streamed, as soon as it is found, into
+COPY public.<upload_table_name> FROM STDIN of that import job (see
+copy_stream.py). The upload table takes one COPY per job, so the rows are
+committed, and the import job starts, only when the extraction finishes;
+extraction and import do not overlap.
+
 Note: BRREG does not provide ownership percentages. The percentage column is
 included in the CSV for schema compatibility but left empty.
 """
 
+import argparse
 import csv
 import gzip
+import hashlib
 import ijson
-import sys
+import json
 import os
+import re
+import sys
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from orgnum_index import OrgnumIndex, cache_path_for
 
 # Role types that represent org-to-org relationships we import.
 # HFOR, EIKM, KOMP are primary_influencer_only (form power groups).
@@ -29,73 +61,395 @@ WORKSPACE = os.path.normpath(WORKSPACE)
 ROLLER_JSON_GZ = os.path.join(WORKSPACE, 'tmp', 'roller.json.gz')
 ENHETER_CSV = os.path.join(WORKSPACE, 'tmp', 'enheter.csv')
 OUTPUT_CSV = os.path.join(WORKSPACE, 'tmp', 'roller_legal_relationships.csv')
+DIGESTS_CSV = os.path.join(WORKSPACE, 'tmp', 'roller_legal_relationships.digests.csv')
+ADDED_CSV = os.path.join(WORKSPACE, 'tmp', 'roller_legal_relationships_added.csv')
+REMOVED_CSV = os.path.join(WORKSPACE, 'tmp', 'roller_legal_relationships_removed.csv')
+CHECKPOINT_JSON_GZ = os.path.join(WORKSPACE, 'tmp', 'roller_extract.checkpoint.json.gz')
+
+OUTPUT_HEADER = ['influencing_tax_ident', 'influenced_tax_ident', 'rel_type_code', 'percentage']
 
 
 def load_enheter_orgnums(path):
-    """Read organisasjonsnummer from enheter.csv into a set."""
-    orgnums = set()
-    with open(path, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            orgnums.add(row['organisasjonsnummer'])
-    print(f"Loaded {len(orgnums)} org numbers from enheter.csv")
+    """Read organisasjonsnummer from enheter.csv into a compact OrgnumIndex (cached as .npy)."""
+    orgnums = OrgnumIndex.from_csv(path)
+    print(f"Loaded {len(orgnums)} org numbers from enheter.csv (cache: {cache_path_for(path)})")
     return orgnums
 
 
-def extract_relationships(roller_path, enheter_orgnums):
-    """Extract relationships using ijson streaming parser (memory efficient)."""
-    relationships = set()
+def org_relationships(org):
+    """Yield (influencing, influenced, rel_type_code) for one top-level org object."""
+    influenced_orgnum = org.get('organisasjonsnummer')
+    if not influenced_orgnum:
+        return
+
+    for gruppe in org.get('rollegrupper') or []:
+        roller = gruppe.get('roller', [])
+        for rolle in roller:
+            rolle_type = rolle.get('type', {})
+            rolle_kode = rolle_type.get('kode', '')
+
+            if rolle_kode not in CONTROLLING_ROLES:
+                continue
+
+            # Only org-to-org relationships (skip person relationships)
+            enhet = rolle.get('enhet')
+            if not enhet:
+                continue
+
+            influencing_orgnum = enhet.get('organisasjonsnummer')
+            if not influencing_orgnum:
+                continue
+
+            # Skip if resigned
+            if rolle.get('fratraadt', False):
+                continue
+
+            # No percentage — BRREG doesn't provide ownership percentages
+            yield (influencing_orgnum, influenced_orgnum, rolle_kode)
+
+
+class Checkpoint:
+    """Periodic, atomically written progress of one extraction over one roller file.
+
+    Holds the number of leading orgs fully processed and every relationship
+    found so far. The relationship set may include edges from orgs after that
+    prefix (parallel batches finish out of order); re-processing them on resume
+    is harmless because results are merged into a set.
+    """
+
+    def __init__(self, path, roller_path, every):
+        self.path = path
+        self.every = every
+        stat = os.stat(roller_path)
+        self.source = {'path': os.path.abspath(roller_path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+        self.saved_orgs = 0
+
+    def load(self):
+        """Return (orgs_done, relationships) from the checkpoint, or (0, set())."""
+        if not os.path.exists(self.path):
+            print(f"No checkpoint at {self.path}; starting from the beginning")
+            return 0, set()
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            state = json.load(f)
+        if state['source'] != self.source:
+            print(f"Error: checkpoint {self.path} was written for a different roller file "
+                  f"({state['source']['path']}); remove it or run without --resume")
+            sys.exit(1)
+        self.saved_orgs = state['orgs_done']
+        print(f"Resuming after org {state['orgs_done']} with {len(state['relationships'])} relationships")
+        return state['orgs_done'], {tuple(r) for r in state['relationships']}
+
+    def due(self, orgs_done):
+        return self.every > 0 and orgs_done - self.saved_orgs >= self.every
+
+    def save(self, orgs_done, relationships):
+        tmp_path = f"{self.path}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump({
+                'source': self.source,
+                'orgs_done': orgs_done,
+                'relationships': sorted(relationships),
+            }, f)
+        os.replace(tmp_path, self.path)
+        self.saved_orgs = orgs_done
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _resume_state(checkpoint, resume, on_new):
+    skip_orgs, relationships = checkpoint.load() if resume else (0, set())
+    if on_new:
+        for r in relationships:
+            on_new(r)
+    return skip_orgs, relationships
+
+
+def extract_relationships(roller_path, enheter_orgnums, checkpoint=None, resume=False, on_new=None):
+    """Extract relationships using ijson streaming parser (memory efficient).
+
+    on_new, if given, is called once for every distinct relationship as soon as
+    it is found.
+    """
+    skip_orgs, relationships = _resume_state(checkpoint, resume, on_new)
     total_orgs = 0
 
     with gzip.open(roller_path, 'rb') as f:
         # Stream through top-level array items
         for org in ijson.items(f, 'item'):
             total_orgs += 1
+            if total_orgs <= skip_orgs:
+                continue
             if total_orgs % 100000 == 0:
                 print(f"  Processed {total_orgs} orgs, found {len(relationships)} relationships so far...")
 
-            influenced_orgnum = org.get('organisasjonsnummer')
-            if not influenced_orgnum:
-                continue
+            # Record the relationship tuples for deduplication
+            if on_new:
+                for r in org_relationships(org):
+                    if r not in relationships:
+                        relationships.add(r)
+                        on_new(r)
+            else:
+                relationships.update(org_relationships(org))
+
+            if checkpoint and checkpoint.due(total_orgs):
+                checkpoint.save(total_orgs, relationships)
+
+    return relationships, total_orgs
+
+
+# Skips everything up to the next structural brace, consuming whole JSON strings
+# (which may contain braces) on the way, and captures that brace. If the buffer
+# ends before a brace or inside a string there is no match, and scanning waits
+# for the next chunk. The pattern is unrolled so it cannot backtrack badly.
+_NEXT_BRACE = re.compile(rb'[^{}"]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^{}"]*)*([{}])')
+
+
+def iter_org_batches(roller_path, batch_size, skip_orgs=0, chunk_size=16 * 1024 * 1024):
+    """Decompress roller.json.gz and yield batches of raw top-level org objects.
+
+    Each batch is a JSON array (bytes) of up to batch_size orgs, cut at the
+    object boundaries of the top-level array without building Python objects,
+    so the JSON decoding itself happens in the worker processes. The first
+    skip_orgs objects are scanned past but not yielded.
+    """
+    buf = b''
+    pos = 0          # scan position in buf
+    depth = 0
+    obj_start = None
+    batch = []
+    to_skip = skip_orgs
+
+    with gzip.open(roller_path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            # Keep only the unfinished object (if any) from the previous buffer.
+            keep_from = obj_start if obj_start is not None else pos
+            buf = buf[keep_from:] + chunk
+            pos -= keep_from
+            if obj_start is not None:
+                obj_start = 0
+
+            while True:
+                m = _NEXT_BRACE.match(buf, pos)
+                if m is None:
+                    break
+                if m.group(1) == b'{':
+                    if depth == 0:
+                        obj_start = m.start(1)
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        if to_skip:
+                            to_skip -= 1
+                        else:
+                            batch.append(buf[obj_start:m.end()])
+                        obj_start = None
+                        if len(batch) >= batch_size:
+                            yield b'[' + b','.join(batch) + b']'
+                            batch = []
+                pos = m.end()
+
+    if depth != 0:
+        raise ValueError(f"{roller_path}: truncated JSON, {depth} unclosed object(s) at end of file")
+    if batch:
+        yield b'[' + b','.join(batch) + b']'
 
-            rollegrupper = org.get('rollegrupper', [])
-            if not rollegrupper:
-                continue
 
-            for gruppe in rollegrupper:
-                roller = gruppe.get('roller', [])
-                for rolle in roller:
-                    rolle_type = rolle.get('type', {})
-                    rolle_kode = rolle_type.get('kode', '')
+def _extract_batch(raw_batch):
+    """Process-pool task: decode one batch of orgs and apply the role filtering."""
+    orgs = json.loads(raw_batch)
+    relationships = set()
+    for org in orgs:
+        relationships.update(org_relationships(org))
+    return relationships, len(orgs)
+
 
-                    if rolle_kode not in CONTROLLING_ROLES:
-                        continue
+def extract_relationships_parallel(roller_path, workers, batch_size=2000, checkpoint=None, resume=False,
+                                   on_new=None):
+    """Extract relationships with one reader feeding a pool of worker processes.
 
-                    # Only org-to-org relationships (skip person relationships)
-                    enhet = rolle.get('enhet')
-                    if not enhet:
-                        continue
+    The reader only decompresses and splits the stream; decoding and role
+    filtering run in the pool. At most 2 * workers batches are in flight, which
+    bounds memory regardless of file size. Results are merged into one set, so
+    the sorted output is identical to extract_relationships().
 
-                    influencing_orgnum = enhet.get('organisasjonsnummer')
-                    if not influencing_orgnum:
-                        continue
+    Batches complete out of order, so checkpoints record only the prefix of
+    batches that are all done.
+    """
+    skip_orgs, relationships = _resume_state(checkpoint, resume, on_new)
+    total_orgs = skip_orgs
+    next_report = (total_orgs // 100000 + 1) * 100000
+    prefix_orgs = skip_orgs    # orgs in the contiguous run of completed batches
+    prefix_seq = 0             # sequence number of the first batch not yet completed
+    completed = {}             # seq -> org count, for completed batches past the prefix
 
-                    # Skip if resigned
-                    if rolle.get('fratraadt', False):
-                        continue
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+
+        def drain(return_when):
+            nonlocal total_orgs, next_report, prefix_orgs, prefix_seq
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                seq = pending.pop(future)
+                batch_relationships, batch_orgs = future.result()
+                if on_new:
+                    batch_relationships -= relationships
+                    for r in batch_relationships:
+                        on_new(r)
+                relationships.update(batch_relationships)
+                total_orgs += batch_orgs
+                completed[seq] = batch_orgs
+            while prefix_seq in completed:
+                prefix_orgs += completed.pop(prefix_seq)
+                prefix_seq += 1
+            if total_orgs >= next_report:
+                print(f"  Processed {total_orgs} orgs, found {len(relationships)} relationships so far...")
+                next_report = (total_orgs // 100000 + 1) * 100000
+            if checkpoint and checkpoint.due(prefix_orgs):
+                checkpoint.save(prefix_orgs, relationships)
 
-                    # Record the relationship tuple for deduplication
-                    # No percentage — BRREG doesn't provide ownership percentages
-                    relationships.add((
-                        influencing_orgnum,
-                        influenced_orgnum,
-                        rolle_kode,
-                    ))
+        for seq, raw_batch in enumerate(iter_org_batches(roller_path, batch_size, skip_orgs)):
+            pending[pool.submit(_extract_batch, raw_batch)] = seq
+            if len(pending) >= 2 * workers:
+                drain(FIRST_COMPLETED)
+        if pending:
+            drain(ALL_COMPLETED)
 
     return relationships, total_orgs
 
 
+def write_relationships_csv(path, rows):
+    """Write relationship tuples in the roller upload format, atomically."""
+    tmp_path = f"{path}.tmp"
+    # Percentage column kept for schema compatibility but empty
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(OUTPUT_HEADER)
+        for row in rows:
+            writer.writerow(list(row) + [''])
+    os.replace(tmp_path, path)
+
+
+def org_digests(relationships):
+    """Map influenced org -> digest of its sorted edge list (relationships must be sorted)."""
+    edges_by_org = {}
+    for r in relationships:
+        edges_by_org.setdefault(r[1], []).append(f"{r[0]},{r[2]}")
+    return {
+        orgnum: hashlib.blake2b('\n'.join(sorted(edges)).encode(), digest_size=8).hexdigest()
+        for orgnum, edges in edges_by_org.items()
+    }
+
+
+def load_digests(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader)
+        return {orgnum: digest for orgnum, digest in reader}
+
+
+def write_digests(path, digests):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['influenced_tax_ident', 'digest'])
+        writer.writerows(sorted(digests.items()))
+    os.replace(tmp_path, path)
+
+
+def read_previous_edges(path, influenced_orgnums):
+    """Read the edges of the given influenced orgs (None = all) from a previous output CSV."""
+    edges = set()
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader)
+        for row in reader:
+            if influenced_orgnums is None or row[1] in influenced_orgnums:
+                edges.add((row[0], row[1], row[2]))
+    return edges
+
+
+def write_delta(filtered):
+    """Write the added/removed edges against the previous run; return the new digests."""
+    digests = org_digests(filtered)
+    if not os.path.exists(OUTPUT_CSV):
+        print(f"No previous snapshot ({OUTPUT_CSV}); every edge counts as added")
+        previous_digests = {}
+    elif os.path.exists(DIGESTS_CSV):
+        previous_digests = load_digests(DIGESTS_CSV)
+    else:
+        # Previous run was not a delta run: derive its digests from its CSV once.
+        previous_digests = org_digests(sorted(read_previous_edges(OUTPUT_CSV, None)))
+
+    changed = {o for o in digests.keys() | previous_digests.keys()
+               if digests.get(o) != previous_digests.get(o)}
+    print(f"Orgs with changed roles since previous run: {len(changed)} of {len(digests)}")
+
+    previous = read_previous_edges(OUTPUT_CSV, changed) if previous_digests else set()
+    current = {r for r in filtered if r[1] in changed}
+    added = sorted(current - previous)
+    removed = sorted(previous - current)
+
+    write_relationships_csv(ADDED_CSV, added)
+    write_relationships_csv(REMOVED_CSV, removed)
+    print(f"Delta: {len(added)} added -> {ADDED_CSV}")
+    print(f"Delta: {len(removed)} removed -> {REMOVED_CSV}")
+    return digests
+
+
+def write_output(args, enheter_orgnums, relationships):
+    """Filter, sort and write the CSV (and the delta files with --delta)."""
+    # Filter to only relationships where BOTH orgs exist in enheter.csv
+    relationships = list(relationships)
+    keep = (enheter_orgnums.contains_many(r[0] for r in relationships)
+            & enheter_orgnums.contains_many(r[1] for r in relationships))
+    filtered = sorted(
+        (r for r, k in zip(relationships, keep) if k),
+        key=lambda r: (r[0], r[1], r[2])
+    )
+    print(f"After filtering to orgs in enheter.csv: {len(filtered)} relationships")
+
+    if args.delta:
+        # Must run before OUTPUT_CSV is overwritten: it is the previous snapshot.
+        digests = write_delta(filtered)
+    else:
+        # A full run replaces the snapshot, so the digests and any delta files
+        # from an earlier --delta run no longer describe it.
+        digests = org_digests(filtered)
+        for path in (ADDED_CSV, REMOVED_CSV):
+            if os.path.exists(path):
+                os.remove(path)
+
+    write_relationships_csv(OUTPUT_CSV, filtered)
+    print(f"Output written to {OUTPUT_CSV}")
+    write_digests(DIGESTS_CSV, digests)
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Extract org-to-org relationships from BRREG roller JSON")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for decoding and filtering; 0 = one per CPU "
+                             "(default: 1, sequential ijson streaming)")
+    parser.add_argument("--checkpoint-every", type=int, default=200000, metavar="N",
+                        help="Write a resumable checkpoint every N orgs; 0 disables (default: 200000)")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"Continue from the last checkpoint ({CHECKPOINT_JSON_GZ})")
+    parser.add_argument("--delta", action="store_true",
+                        help="Also write only the edges added/removed since the previous run")
+    parser.add_argument("--copy-to-job", metavar="SLUG",
+                        help="Stream rows into the upload table of this import job (COPY FROM STDIN "
+                             "over psycopg2, libpq PG* environment) instead of writing the CSV; "
+                             "the job starts when the extraction finishes")
+    args = parser.parse_args()
+    if args.copy_to_job and args.delta:
+        parser.error("--delta needs the full CSV snapshot; it cannot be combined with --copy-to-job")
+    workers = args.workers if args.workers > 0 else os.cpu_count() or 1
+
     if not os.path.exists(ROLLER_JSON_GZ):
         print(f"Error: {ROLLER_JSON_GZ} not found. Run download-to-tmp.sh first.")
         sys.exit(1)
@@ -104,30 +458,48 @@ def main():
         print(f"Error: {ENHETER_CSV} not found. Run download-to-tmp.sh first.")
         sys.exit(1)
 
+    started = time.monotonic()
+
     # Load enheter org numbers for filtering
     enheter_orgnums = load_enheter_orgnums(ENHETER_CSV)
 
-    print(f"Extracting relationships from {ROLLER_JSON_GZ} (streaming gzip + ijson)...")
-    relationships, total_orgs = extract_relationships(ROLLER_JSON_GZ, enheter_orgnums)
+    checkpoint = Checkpoint(CHECKPOINT_JSON_GZ, ROLLER_JSON_GZ, args.checkpoint_every)
+
+    copy_stream = None
+    on_new = None
+    if args.copy_to_job:
+        from copy_stream import CopyStream
+        copy_stream = CopyStream(args.copy_to_job, OUTPUT_HEADER[:3])
+        print(f"Streaming rows into public.{copy_stream.table} (import job {args.copy_to_job})")
+
+        def on_new(r):
+            if r[0] in enheter_orgnums and r[1] in enheter_orgnums:
+                copy_stream.write_row(r)
+
+    extract_started = time.monotonic()
+    if workers > 1:
+        print(f"Extracting relationships from {ROLLER_JSON_GZ} (streaming gzip, {workers} worker processes)...")
+        relationships, total_orgs = extract_relationships_parallel(
+            ROLLER_JSON_GZ, workers, checkpoint=checkpoint, resume=args.resume, on_new=on_new)
+    else:
+        print(f"Extracting relationships from {ROLLER_JSON_GZ} (streaming gzip + ijson)...")
+        relationships, total_orgs = extract_relationships(
+            ROLLER_JSON_GZ, enheter_orgnums, checkpoint=checkpoint, resume=args.resume, on_new=on_new)
+    extract_seconds = time.monotonic() - extract_started
 
     print(f"Total orgs processed: {total_orgs}")
+    print(f"Extraction took {extract_seconds:.1f}s ({total_orgs / max(extract_seconds, 1e-9):,.0f} orgs/s)")
     print(f"Total controlling org-to-org relationships found: {len(relationships)}")
 
-    # Filter to only relationships where BOTH orgs exist in enheter.csv
-    filtered = sorted(
-        (r for r in relationships if r[0] in enheter_orgnums and r[1] in enheter_orgnums),
-        key=lambda r: (r[0], r[1], r[2])
-    )
-    print(f"After filtering to orgs in enheter.csv: {len(filtered)} relationships")
-
-    # Write output CSV — percentage column kept for schema compatibility but empty
-    with open(OUTPUT_CSV, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(['influencing_tax_ident', 'influenced_tax_ident', 'rel_type_code', 'percentage'])
-        for row in filtered:
-            writer.writerow(list(row) + [''])
+    if copy_stream is not None:
+        rows = copy_stream.close()
+        print(f"Streamed {rows} relationships (both orgs in enheter.csv) into public.{copy_stream.table}")
+    else:
+        write_output(args, enheter_orgnums, relationships)
 
-    print(f"Output written to {OUTPUT_CSV}")
+    checkpoint.remove()
+    total_seconds = time.monotonic() - started
+    print(f"End-to-end: {total_seconds:.1f}s ({total_orgs / max(total_seconds, 1e-9):,.0f} orgs/s, workers={workers})")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Offline smoke check for fetch-konsern-fixture.py.
+
+Starts a local stub of the BRREG enhet API on 127.0.0.1 (random port) and runs
+fetch-konsern-fixture.py against it with --api, in a temporary directory:
+
+  1. a cold run fetches every member once (the stub answers the first request
+     with 429 + Retry-After: 0, so the retry path is exercised too) and writes
+     both fixture CSVs;
+  2. a second run is served entirely from the response cache (no requests);
+  3. a --refresh run fetches every member again.
+
+No network access and no database are needed. Exits non-zero on the first
+failed check.
+
+Usage:
+  python3 samples/norway/brreg/fetch-konsern-fixture-smoke.py
+"""
+import csv
+import json
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+SCRIPT = Path(__file__).resolve().parent / "fetch-konsern-fixture.py"
+
+# parent -> child konsern edges; 900000001 is the top of the konsern.
+KONSERN_CSV = """organisasjonsnummer;parentOrganisasjonsnummer;grunnlag
+900000001;;
+900000002;900000001;100%
+900000003;900000001;88,0%
+900000004;900000002;51%
+"""
+MEMBERS = ["900000001", "900000002", "900000003", "900000004"]
+
+
+class StubEnhetApi(BaseHTTPRequestHandler):
+    requests = []
+    throttled = False
+    lock = threading.Lock()
+
+    def do_GET(self):
+        orgnr = self.path.rstrip("/").rsplit("/", 1)[-1]
+        with self.lock:
+            first = not StubEnhetApi.throttled
+            StubEnhetApi.throttled = True
+            if not first:
+                StubEnhetApi.requests.append(orgnr)
+        if first:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        if orgnr not in MEMBERS:
+            self.send_error(404)
+            return
+        body = json.dumps({
+            "organisasjonsnummer": orgnr,
+            "navn": f"STUB ENHET {orgnr}",
+            "organisasjonsform": {"kode": "AS", "beskrivelse": "Aksjeselskap"},
+            "forretningsadresse": {"adresse": ["Stubveien 1"], "landkode": "NO" if orgnr != "900000004" else "KR"},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def check(condition, message):
+    if not condition:
+        print(f"FAIL: {message}", file=sys.stderr)
+        sys.exit(1)
+    print(f"ok: {message}", file=sys.stderr)
+
+
+def run_fixture(api, work, *extra):
+    subprocess.run(
+        [sys.executable, str(SCRIPT), str(work / "konsern.csv"),
+         "--api", api, "--rate", "50", "--workers", "4",
+         "--cache-dir", str(work / "cache"), "--out-dir", str(work / "out"), *extra],
+        check=True,
+    )
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubEnhetApi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api = f"http://127.0.0.1:{server.server_port}/enheter/{{}}"
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            work = Path(tmp)
+            (work / "konsern.csv").write_text(KONSERN_CSV, encoding="utf-8")
+            (work / "out" / "legal_unit").mkdir(parents=True)
+            (work / "out" / "legal_relationship").mkdir(parents=True)
+
+            run_fixture(api, work)
+            check(sorted(StubEnhetApi.requests) == MEMBERS, "cold run fetches every member once (after a 429 retry)")
+            with (work / "out" / "legal_unit" / "konsern-enheter.csv").open(encoding="utf-8") as f:
+                enheter = list(csv.DictReader(f))
+            check([r["organisasjonsnummer"] for r in enheter] == MEMBERS, "konsern-enheter.csv lists every member")
+            check(enheter[-1]["forretningsadresse.landkode"] == "KR", "foreign member keeps its landkode")
+            with (work / "out" / "legal_relationship" / "konsern-roller.csv").open(encoding="utf-8") as f:
+                roller = list(csv.DictReader(f))
+            check([(r["influencing_tax_ident"], r["influenced_tax_ident"], r["percentage"]) for r in roller]
+                  == [("900000001", "900000002", "100"), ("900000001", "900000003", "88.0"),
+                      ("900000002", "900000004", "51")],
+                  "konsern-roller.csv has the konsern edges")
+
+            StubEnhetApi.requests.clear()
+            run_fixture(api, work)
+            check(StubEnhetApi.requests == [], "second run is served from the cache")
+
+            run_fixture(api, work, "--refresh")
+            check(sorted(StubEnhetApi.requests) == MEMBERS, "--refresh fetches every member again")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -20,19 +20,40 @@ committed, hermetic fixtures that plug straight into brreg-import-selection.sh:
 
 Run once; commit the CSVs. Tests load the committed CSVs (no network).
 
+Members are fetched concurrently by a small thread pool that shares a
+token-bucket rate limiter (--rate requests/s, default 5, the pace of the old
+one-by-one loop; the bucket starts with a single token, so there is no initial
+burst). Each successful response is cached as tmp/brreg-enhet-cache/<orgnr>.json,
+so re-runs only fetch members not seen before. Cached responses older than
+--cache-max-age days (default 30) are fetched again; --refresh ignores the
+cache entirely. --api points the fetcher at another server with the same URL
+shape, e.g. a local stub (http://127.0.0.1:8000/enheter/{}), so it can run
+offline; fetch-konsern-fixture-smoke.py does exactly that.
+
 Usage:
   python3 samples/norway/brreg/fetch-konsern-fixture.py tmp/konsern_aker.csv
+  python3 samples/norway/brreg/fetch-konsern-fixture.py --workers 16 --rate 10 tmp/konsern_aker.csv
+  python3 samples/norway/brreg/fetch-konsern-fixture.py --refresh tmp/konsern_aker.csv
 """
+import argparse
 import csv
 import io
 import json
+import os
 import sys
+import threading
 import time
+import urllib.error
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 ENHET_API = "https://data.brreg.no/enhetsregisteret/api/enheter/{}"
 
+# HTTP statuses worth retrying after a pause (rate limited / temporarily down).
+RETRY_STATUSES = {429, 502, 503, 504}
+MAX_ATTEMPTS = 4
+
 # The exact 54-column hovedenhet upload header (must match
 # samples/norway/legal_unit/enheter-selection.csv so \copy targets the same
 # upload table). Order is load-bearing.
@@ -166,6 +187,114 @@ def enhet_row(d):
     }
 
 
+class TokenBucket:
+    """Thread-safe token bucket: at most `rate` acquisitions per second, bursts up to `burst`."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ResponseCache:
+    """On-disk cache of enhet API responses, one <orgnr>.json file per org (None = disabled).
+
+    Entries older than `max_age` seconds (None = never) are treated as missing.
+    """
+
+    def __init__(self, directory, max_age=None):
+        self.directory = directory
+        self.max_age = max_age
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, orgnr):
+        return self.directory / f"{orgnr}.json"
+
+    def get(self, orgnr):
+        if self.directory is None:
+            return None
+        path = self._path(orgnr)
+        try:
+            if self.max_age is not None and time.time() - path.stat().st_mtime >= self.max_age:
+                return None
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, orgnr, body):
+        if self.directory is None:
+            return
+        tmp = self._path(orgnr).with_suffix(f".tmp{threading.get_ident()}")
+        tmp.write_bytes(body)
+        os.replace(tmp, self._path(orgnr))
+
+
+def fetch_enhet(orgnr, api, cache, bucket, timeout=30):
+    """Return (record, from_cache) for one org, retrying throttled/unavailable responses."""
+    body = cache.get(orgnr)
+    if body is not None:
+        return json.loads(body), True
+    url = api.format(orgnr)
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        bucket.acquire()
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as resp:
+                body = resp.read()
+            break
+        except urllib.error.HTTPError as e:
+            if e.code not in RETRY_STATUSES or attempt == MAX_ATTEMPTS:
+                raise
+            retry_after = e.headers.get("Retry-After", "")
+            time.sleep(float(retry_after) if retry_after.isdigit() else 2 ** attempt)
+    record = json.loads(body)
+    cache.put(orgnr, body)
+    return record, False
+
+
+def fetch_all(orgnrs, api, cache, rate, workers):
+    """Fetch every org's enhet record concurrently; returns ({orgnr: record}, n_cached) or exits on failure."""
+    # burst=1: the workers all start at once, so a full bucket of `workers`
+    # tokens would send that many requests in the first instant.
+    bucket = TokenBucket(rate, burst=1)
+    records = {}
+    failed = []
+    cached = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {orgnr: pool.submit(fetch_enhet, orgnr, api, cache, bucket) for orgnr in orgnrs}
+        for orgnr in sorted(futures):
+            try:
+                record, from_cache = futures[orgnr].result()
+            except Exception as e:
+                print(f"  {orgnr}  FETCH FAILED: {e}", file=sys.stderr)
+                failed.append(orgnr)
+                continue
+            cached += from_cache
+            records[orgnr] = record
+            row = enhet_row(record)
+            print(f"  {orgnr}  {row['navn']:40.40}  land={row['forretningsadresse.landkode']}"
+                  f"{'  (cached)' if from_cache else ''}", file=sys.stderr)
+    if failed:
+        print(f"{len(failed)} of {len(orgnrs)} fetches failed; successful responses are cached for the re-run",
+              file=sys.stderr)
+        sys.exit(1)
+    return records, cached
+
+
 def parse_percentage(grunnlag):
     """'100%' -> '100', '88,0%' -> '88.0', '' -> ''."""
     if not grunnlag:
@@ -174,10 +303,26 @@ def parse_percentage(grunnlag):
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit(__doc__)
-    src = Path(sys.argv[1])
     workspace = Path(__file__).resolve().parents[3]
+    parser = argparse.ArgumentParser(description="Build the cross-border power-group fixture from a "
+                                                 "BRREG konsernstruktur CSV")
+    parser.add_argument("konsern_csv", type=Path, help="konsernstruktur CSV (semicolon separated)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent fetches (default: 8)")
+    parser.add_argument("--rate", type=float, default=5.0, help="Max requests per second (default: 5)")
+    parser.add_argument("--api", default=ENHET_API,
+                        help=f"Enhet URL template with {{}} for the org number (default: {ENHET_API})")
+    parser.add_argument("--cache-dir", type=Path, default=workspace / "tmp" / "brreg-enhet-cache",
+                        help="Response cache directory (default: tmp/brreg-enhet-cache)")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the response cache")
+    parser.add_argument("--cache-max-age", type=float, default=30.0, metavar="DAYS",
+                        help="Re-fetch cached responses older than DAYS days (default: 30)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Ignore cached responses and fetch every member again (the cache is rewritten)")
+    parser.add_argument("--out-dir", type=Path, default=workspace / "samples" / "norway",
+                        help="Root for legal_unit/konsern-enheter.csv and "
+                             "legal_relationship/konsern-roller.csv (default: samples/norway)")
+    args = parser.parse_args()
+    src = args.konsern_csv
 
     text = src.read_text(encoding="utf-8-sig")
     reader = csv.DictReader(io.StringIO(text), delimiter=";")
@@ -197,21 +342,14 @@ def main():
     print(f"{len(members)} members, {len(edges)} konsern edges", file=sys.stderr)
 
     # Fetch each member's full enhet record.
-    enhet_rows = []
-    for orgnr in sorted(members):
-        url = ENHET_API.format(orgnr)
-        try:
-            with urllib.request.urlopen(url, timeout=30) as resp:
-                d = json.load(resp)
-            row = enhet_row(d)
-            enhet_rows.append(row)
-            print(f"  {orgnr}  {row['navn']:40.40}  land={row['forretningsadresse.landkode']}", file=sys.stderr)
-        except Exception as e:
-            print(f"  {orgnr}  FETCH FAILED: {e}", file=sys.stderr)
-            sys.exit(1)
-        time.sleep(0.2)
-
-    enheter_path = workspace / "samples/norway/legal_unit/konsern-enheter.csv"
+    started = time.monotonic()
+    cache = ResponseCache(None if args.no_cache else args.cache_dir,
+                          max_age=0 if args.refresh else args.cache_max_age * 86400)
+    records, cached = fetch_all(members, args.api, cache, args.rate, args.workers)
+    enhet_rows = [enhet_row(records[orgnr]) for orgnr in sorted(members)]
+    print(f"{len(records)} members ({cached} from cache) in {time.monotonic() - started:.1f}s", file=sys.stderr)
+
+    enheter_path = args.out_dir / "legal_unit/konsern-enheter.csv"
     with enheter_path.open("w", newline="", encoding="utf-8") as f:
         w = csv.DictWriter(f, fieldnames=ENHETER_HEADER, lineterminator="\n")
         w.writeheader()
@@ -219,7 +357,7 @@ def main():
             w.writerow(row)
     print(f"wrote {enheter_path} ({len(enhet_rows)} rows)", file=sys.stderr)
 
-    roller_path = workspace / "samples/norway/legal_relationship/konsern-roller.csv"
+    roller_path = args.out_dir / "legal_relationship/konsern-roller.csv"
     with roller_path.open("w", newline="", encoding="utf-8") as f:
         w = csv.writer(f, lineterminator="\n")
         w.writerow(["influencing_tax_ident", "influenced_tax_ident", "rel_type_code", "percentage"])
@@ -1,20 +1,181 @@
 #!/usr/bin/env python3
+"""
+Filter tmp/underenheter.csv to the rows whose overordnetEnhet is in enheter.csv.
 
+Run from tmp/ (see download-to-tmp.sh). Two engines:
+
+  arrow  (default when pyarrow is installed) reads the file in bounded byte
+         chunks cut at record boundaries, parses only the overordnetEnhet
+         column with pyarrow.csv, tests the whole column against the org-number
+         index at once, and copies the matching records through byte-for-byte.
+  csv    the original csv.DictReader/DictWriter implementation, kept as a
+         fallback. It re-serializes rows, so quoting and line endings may
+         differ from the input; the selected rows are the same.
+
+--benchmark runs both engines and prints rows/s for each.
+"""
+
+import argparse
 import csv
+import os
+import sys
+import time
+from itertools import islice
+
+import numpy as np
+
+from orgnum_index import OrgnumIndex
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+ENHETER_CSV = 'enheter.csv'
+INPUT_CSV = 'underenheter.csv'
+OUTPUT_CSV = 'underenheter_filtered.csv'
+JOIN_COLUMN = 'overordnetEnhet'
+
+CHUNK_ROWS = 100000
+CHUNK_BYTES = 32 * 1024 * 1024
+
+
+def filter_with_csv_module(enheter_orgnums, input_path, output_path):
+    """Row-at-a-time filter through csv.DictReader/DictWriter. Returns (rows_in, rows_out)."""
+    rows_in = rows_out = 0
+    with open(input_path, newline='', encoding='utf-8') as underenheter_file, \
+         open(output_path, 'w', newline='', encoding='utf-8') as output_file:
+        underenheter_reader = csv.DictReader(underenheter_file)
+        fieldnames = underenheter_reader.fieldnames
+        writer = csv.DictWriter(output_file, fieldnames=fieldnames)
+        writer.writeheader()
+        # Test membership a chunk of rows at a time (one vectorized lookup per chunk)
+        while chunk := list(islice(underenheter_reader, CHUNK_ROWS)):
+            keep = enheter_orgnums.contains_many(row[JOIN_COLUMN] for row in chunk)
+            writer.writerows(row for row, k in zip(chunk, keep) if k)
+            rows_in += len(chunk)
+            rows_out += int(keep.sum())
+    return rows_in, rows_out
+
+
+def record_ends(block):
+    """Offsets just past each record-terminating newline in block.
+
+    A newline ends a record only outside a quoted field, i.e. when the number
+    of quote characters before it is even (an escaped "" adds two). block must
+    start at a record boundary.
+    """
+    data = np.frombuffer(block, dtype=np.uint8)
+    quotes = np.flatnonzero(data == ord('"'))
+    newlines = np.flatnonzero(data == ord('\n'))
+    outside = np.searchsorted(quotes, newlines) % 2 == 0
+    return newlines[outside] + 1
+
+
+def iter_record_blocks(f, chunk_bytes):
+    """Yield (block, ends): byte blocks of whole records and their record end offsets."""
+    rest = b''
+    while True:
+        chunk = f.read(chunk_bytes)
+        if not chunk:
+            break
+        block = rest + chunk
+        ends = record_ends(block)
+        if len(ends) == 0:
+            rest = block
+            continue
+        rest = block[ends[-1]:]
+        yield block[:ends[-1]], ends
+    if rest:
+        # Last record without a trailing newline
+        yield rest, np.array([len(rest)])
+
+
+def filter_columnar(enheter_orgnums, input_path, output_path, chunk_bytes=CHUNK_BYTES):
+    """Chunked pyarrow filter that copies matching records byte-for-byte. Returns (rows_in, rows_out)."""
+    rows_in = rows_out = 0
+    with open(input_path, 'rb') as f, open(output_path, 'wb') as out:
+        header = f.readline()
+        out.write(header)
+        column_names = next(csv.reader([header.decode('utf-8-sig')]))
+        read_options = pa_csv.ReadOptions(column_names=column_names)
+        parse_options = pa_csv.ParseOptions(newlines_in_values=True)
+        convert_options = pa_csv.ConvertOptions(
+            include_columns=[JOIN_COLUMN],
+            column_types={JOIN_COLUMN: pa.string()},
+            strings_can_be_null=False,
+        )
+
+        for block, ends in iter_record_blocks(f, chunk_bytes):
+            table = pa_csv.read_csv(pa.py_buffer(block), read_options=read_options,
+                                    parse_options=parse_options, convert_options=convert_options)
+            if table.num_rows != len(ends):
+                raise ValueError(f"{input_path}: parsed {table.num_rows} rows but found "
+                                 f"{len(ends)} record boundaries; use --engine csv")
+            keep = enheter_orgnums.contains_many(table.column(JOIN_COLUMN).to_pylist())
+
+            # Expand the per-record mask to a per-byte mask and copy the kept bytes.
+            lengths = np.diff(ends, prepend=0)
+            data = np.frombuffer(block, dtype=np.uint8)
+            out.write(data[np.repeat(keep, lengths)].tobytes())
+
+            rows_in += len(ends)
+            rows_out += int(keep.sum())
+    return rows_in, rows_out
+
+
+ENGINES = {
+    'arrow': filter_columnar,
+    'csv': filter_with_csv_module,
+}
+
+
+def run_engine(engine, enheter_orgnums, input_path, output_path):
+    started = time.monotonic()
+    rows_in, rows_out = ENGINES[engine](enheter_orgnums, input_path, output_path)
+    seconds = time.monotonic() - started
+    print(f"{engine:>5}: {rows_in} rows in, {rows_out} kept, {seconds:.1f}s "
+          f"({rows_in / max(seconds, 1e-9):,.0f} rows/s)")
+    return rows_in, rows_out
+
+
+def benchmark(enheter_orgnums, input_path):
+    """Run every available engine on the same input and compare rows/s."""
+    results = {}
+    for engine in ENGINES:
+        if engine == 'arrow' and pa is None:
+            print("arrow: skipped (pyarrow not installed)")
+            continue
+        output_path = f"{OUTPUT_CSV}.bench-{engine}"
+        results[engine] = run_engine(engine, enheter_orgnums, input_path, output_path)
+        os.remove(output_path)
+    if len(set(results.values())) > 1:
+        print(f"Error: engines disagree on row counts: {results}")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filter underenheter.csv to units with a known overordnetEnhet")
+    parser.add_argument("--engine", choices=list(ENGINES), default='arrow' if pa is not None else 'csv',
+                        help="Filter implementation (default: arrow if pyarrow is installed, else csv)")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Run all engines on the input and report rows/s; writes no output")
+    args = parser.parse_args()
+
+    if args.engine == 'arrow' and pa is None:
+        print("Error: --engine arrow requires pyarrow")
+        sys.exit(1)
+
+    # Read 'organisasjonsnummer' from 'enheter.csv' into a compact index (cached as enheter.orgnums.npy)
+    enheter_orgnums = OrgnumIndex.from_csv(ENHETER_CSV)
+
+    if args.benchmark:
+        benchmark(enheter_orgnums, INPUT_CSV)
+    else:
+        # Open 'underenheter.csv' and filter out inconsistent lines
+        run_engine(args.engine, enheter_orgnums, INPUT_CSV, OUTPUT_CSV)
 
-# Read 'organisasjonsnummer' from 'enheter.csv' into a set
-with open('enheter.csv', newline='', encoding='utf-8') as enheter_file:
-    enheter_reader = csv.DictReader(enheter_file)
-    enheter_orgnums = set(row['organisasjonsnummer'] for row in enheter_reader)
-
-# Open 'underenheter.csv' and filter out inconsistent lines
-with open('underenheter.csv', newline='', encoding='utf-8') as underenheter_file, \
-     open('underenheter_filtered.csv', 'w', newline='', encoding='utf-8') as output_file:
-    underenheter_reader = csv.DictReader(underenheter_file)
-    fieldnames = underenheter_reader.fieldnames
-    writer = csv.DictWriter(output_file, fieldnames=fieldnames)
-    writer.writeheader()
-    for row in underenheter_reader:
-        if row['overordnetEnhet'] in enheter_orgnums:
-            writer.writerow(row)
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Compact index of BRREG organisasjonsnummer for the brreg sample scripts.
+
+A Python set of ~1.1M nine-digit strings costs hundreds of MB. Org numbers fit
+in 32 bits, so the index is a sorted, de-duplicated NumPy uint32 array (4 bytes
+per org), and membership is a binary search that can test a whole column at
+once.
+
+The parsed array is cached as a .npy file next to the CSV it came from
+(tmp/enheter.csv -> tmp/enheter.orgnums.npy) and memory-mapped on later runs,
+so re-running an extractor skips re-parsing the CSV. The cache is rebuilt
+whenever the CSV is newer than it.
+"""
+
+import csv
+import os
+
+import numpy as np
+
+ORGNUM_COLUMN = 'organisasjonsnummer'
+
+
+def _to_keys(orgnums):
+    """Convert org number strings to int64 keys; anything not a 9-digit number becomes -1."""
+    return np.fromiter(
+        (int(o) if len(o) == 9 and o.isdigit() else -1 for o in orgnums),
+        dtype=np.int64,
+    )
+
+
+class OrgnumIndex:
+    """Sorted uint32 set of org numbers with scalar and vectorized membership tests."""
+
+    def __init__(self, keys):
+        self.keys = keys
+
+    @classmethod
+    def from_orgnums(cls, orgnums):
+        keys = _to_keys(orgnums)
+        keys = np.unique(keys[keys >= 0]).astype(np.uint32)
+        return cls(keys)
+
+    @classmethod
+    def from_csv(cls, csv_path, column=ORGNUM_COLUMN, use_cache=True):
+        """Build the index from a BRREG CSV, using (and refreshing) the .npy cache."""
+        cache_path = cache_path_for(csv_path)
+        if use_cache and os.path.exists(cache_path) \
+                and os.path.getmtime(cache_path) >= os.path.getmtime(csv_path):
+            return cls(np.load(cache_path, mmap_mode='r'))
+
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            col = next(reader).index(column)
+            index = cls.from_orgnums(row[col] for row in reader)
+
+        if use_cache:
+            index.save(cache_path)
+        return index
+
+    def save(self, path):
+        """Write the keys as .npy atomically (write to a temp file, then rename)."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(self.keys, dtype=np.uint32))
+        os.replace(tmp_path, path)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, orgnum):
+        if not (isinstance(orgnum, str) and len(orgnum) == 9 and orgnum.isdigit()):
+            return False
+        key = int(orgnum)
+        i = int(np.searchsorted(self.keys, np.uint32(key)))
+        return i < len(self.keys) and int(self.keys[i]) == key
+
+    def contains_many(self, orgnums):
+        """Return a bool array: for each org number string, whether it is in the index."""
+        keys = _to_keys(orgnums)
+        valid = keys >= 0
+        if len(self.keys) == 0 or len(keys) == 0:
+            return np.zeros(len(keys), dtype=bool)
+        # Search in uint32 so the (possibly memory-mapped) index is never upcast/copied.
+        query = np.where(valid, keys, 0).astype(np.uint32)
+        i = np.minimum(np.searchsorted(self.keys, query), len(self.keys) - 1)
+        return valid & (self.keys[i] == query)
+
+
+def cache_path_for(csv_path):
+    """tmp/enheter.csv -> tmp/enheter.orgnums.npy"""
+    root, _ = os.path.splitext(csv_path)
+    return f"{root}.orgnums.npy"
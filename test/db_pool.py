@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Pool of pre-cloned isolated test databases.
+
+create_isolated_db() pays for CREATE DATABASE ... TEMPLATE on every run, under
+the template advisory lock (59328). The pool moves that cost off the critical
+path: ready databases are cloned ahead of time and a run claims one with a
+single ALTER DATABASE ... RENAME, which is atomic across processes (a rename
+of a database someone else already claimed simply fails and the next one is
+tried).
+
+Ready databases are named test_concurrent_pool_<template oid>_<random>, so
+they show up in --list/--cleanup-all, and clones of a template that has since
+been rebuilt (new oid) are recognised as stale and dropped instead of handed
+out.
+
+Filling and dropping run in a detached background process (spawn()), so a
+test run never waits for them:
+
+    python3 test/db_pool.py fill 4              # top up to 4 ready databases and exit
+    python3 test/db_pool.py maintain 4          # keep 4 ready, e.g. as a CI service
+    python3 test/db_pool.py drop DBNAME [...]   # drop used databases
+
+Connection parameters come from the libpq environment (PGHOST, PGPORT, PGUSER,
+PGPASSWORD), e.g. via `eval $(./sb config show --postgres)`.
+"""
+
+import argparse
+import os
+import secrets
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import psycopg2
+from psycopg2 import errors
+
+WORKSPACE = Path(__file__).parent.parent.absolute()
+POOL_LOG = WORKSPACE / "tmp" / "db_pool.log"
+POOL_PREFIX = "test_concurrent_pool_"
+TEMPLATE_LOCK = 59328  # Same advisory lock as create_isolated_db()
+
+
+def connect_maintenance():
+    conn = psycopg2.connect(dbname="postgres")
+    conn.autocommit = True
+    return conn
+
+
+def template_oid(cur, template):
+    cur.execute("SELECT oid FROM pg_database WHERE datname = %s", (template,))
+    row = cur.fetchone()
+    if row is None:
+        raise ValueError(f"Template database {template!r} does not exist")
+    return row[0]
+
+
+def pool_databases(cur):
+    cur.execute("SELECT datname FROM pg_database WHERE datname LIKE %s ORDER BY datname",
+                (POOL_PREFIX.replace("_", r"\_") + "%",))
+    return [row[0] for row in cur.fetchall()]
+
+
+def ready_databases(cur, template):
+    """Pool databases cloned from the current incarnation of template."""
+    prefix = f"{POOL_PREFIX}{template_oid(cur, template)}_"
+    return [name for name in pool_databases(cur) if name.startswith(prefix)]
+
+
+def drop(cur, dbname):
+    cur.execute("""
+        SELECT pg_terminate_backend(pid)
+        FROM pg_stat_activity
+        WHERE datname = %s AND pid != pg_backend_pid()
+    """, (dbname,))
+    cur.execute(f'DROP DATABASE IF EXISTS "{dbname}"')
+
+
+def prune_stale(cur, template):
+    """Drop pool databases cloned from an older template. Returns their names."""
+    ready = set(ready_databases(cur, template))
+    stale = [name for name in pool_databases(cur) if name not in ready]
+    for name in stale:
+        drop(cur, name)
+    return stale
+
+
+def clone_one(cur, template):
+    """Clone template into a new ready pool database under the template lock."""
+    name = f"{POOL_PREFIX}{template_oid(cur, template)}_{secrets.token_hex(4)}"
+    cur.execute("SELECT pg_advisory_lock(%s)", (TEMPLATE_LOCK,))
+    try:
+        cur.execute(f"ALTER DATABASE {template} WITH ALLOW_CONNECTIONS = true")
+        cur.execute(f'CREATE DATABASE "{name}" WITH TEMPLATE {template}')
+        cur.execute(f"ALTER DATABASE {template} WITH ALLOW_CONNECTIONS = false")
+    finally:
+        cur.execute("SELECT pg_advisory_unlock(%s)", (TEMPLATE_LOCK,))
+    return name
+
+
+def fill(cur, template, size):
+    """Top the pool up to size ready databases. Returns the names created."""
+    prune_stale(cur, template)
+    created = []
+    while len(ready_databases(cur, template)) < size:
+        created.append(clone_one(cur, template))
+    return created
+
+
+def claim(cur, template, target):
+    """Atomically rename a ready pool database to target; None if the pool is empty."""
+    for name in ready_databases(cur, template):
+        try:
+            cur.execute(f'ALTER DATABASE "{name}" RENAME TO "{target}"')
+            return target
+        except (errors.InvalidCatalogName, errors.ObjectInUse):
+            continue  # Claimed (or being dropped) by another process
+    return None
+
+
+def spawn(args, env=None):
+    """Run `db_pool.py <args>` detached from this process, logging to tmp/db_pool.log."""
+    POOL_LOG.parent.mkdir(exist_ok=True)
+    with open(POOL_LOG, "a") as log_file:
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).absolute()), *args],
+            stdin=subprocess.DEVNULL, stdout=log_file, stderr=subprocess.STDOUT,
+            env=env, cwd=str(WORKSPACE), start_new_session=True,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain a pool of pre-cloned test databases")
+    parser.add_argument("--template", default=os.environ.get("POSTGRES_TEST_DB", "statbus_test_template"),
+                        help="Template database to clone (default: POSTGRES_TEST_DB or statbus_test_template)")
+    sub = parser.add_subparsers(dest="action", required=True)
+    fill_parser = sub.add_parser("fill", help="Top up the pool to SIZE ready databases and exit")
+    fill_parser.add_argument("size", type=int)
+    maintain_parser = sub.add_parser("maintain", help="Keep SIZE ready databases until interrupted")
+    maintain_parser.add_argument("size", type=int)
+    maintain_parser.add_argument("--interval", type=float, default=5.0,
+                                 help="Seconds between pool checks (default: 5)")
+    drop_parser = sub.add_parser("drop", help="Drop used databases")
+    drop_parser.add_argument("dbnames", nargs="+")
+    args = parser.parse_args()
+
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+    conn = connect_maintenance()
+    with conn.cursor() as cur:
+        if args.action == "fill":
+            created = fill(cur, args.template, args.size)
+            print(f"{stamp} fill: created {len(created)}, ready {len(ready_databases(cur, args.template))}")
+        elif args.action == "maintain":
+            try:
+                while True:
+                    for name in fill(cur, args.template, args.size):
+                        print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} maintain: created {name}", flush=True)
+                    time.sleep(args.interval)
+            except KeyboardInterrupt:
+                pass
+        elif args.action == "drop":
+            for name in args.dbnames:
+                drop(cur, name)
+                print(f"{stamp} drop: {name}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
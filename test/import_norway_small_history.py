@@ -13,15 +13,18 @@ import os
 import sys
 import json
 import time
+import asyncio
 import requests
 import tempfile
-import threading
 import argparse
 import subprocess
-from queue import Queue, Empty
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional, Any, Union
 
+import httpx
+
+from sse_client import IMPORT_JOBS, OPEN, WORKER_STATUS, SSEClient, SSEError
+
 # Colors for output
 RED = '\033[0;31m'
 GREEN = '\033[0;32m'
@@ -368,219 +371,7 @@ def setup_import_definitions(session: requests.Session) -> bool:
     establishment_target_id = establishment_target["id"]
     log_success(f"Using import target '{establishment_target.get('table_name')}' (ID: {establishment_target_id}) for establishments")
     
-    # Function to ensure a definition exists and is in draft mode
-    def ensure_definition(slug, name, target_id):
-        if slug in existing_definitions:
-            definition = existing_definitions[slug]
-            definition_id = definition["id"]
-            log_success(f"Found existing {name} definition (ID: {definition_id})")
-            
-            # Set to draft mode if needed
-            if not definition.get("draft", False):
-                update_result = api_request(session, "PATCH", f"/rest/import_definition?id=eq.{definition_id}", 
-                                          data={"draft": True, "valid": False}, expected_status=204)
-                if update_result is not None:
-                    log_success(f"Set existing {name} definition to draft mode")
-                else:
-                    log_warning(f"Failed to set existing {name} definition to draft mode")
-        else:
-            # Create new definition
-            new_def = {
-                "slug": slug,
-                "name": name,
-                "target_id": target_id,
-                "data_source_id": data_source_id,
-                "note": f"Import definition for {name}",
-                "draft": True,
-                "valid": False
-            }
-            
-            result = api_request(session, "POST", "/rest/import_definition", data=new_def)
-            if not result:
-                log_error(f"Failed to create {name} import definition")
-                return None
-            
-            # Extract ID from response
-            if isinstance(result, list) and len(result) > 0:
-                definition_id = result[0]["id"]
-            elif isinstance(result, dict) and "id" in result:
-                definition_id = result["id"]
-            else:
-                # Try to get by querying
-                created_def = api_request(session, "GET", f"/rest/import_definition?slug=eq.{slug}")
-                if created_def and len(created_def) > 0:
-                    definition_id = created_def[0]["id"]
-                else:
-                    log_error(f"Could not get ID for created {name} definition")
-                    return None
-            
-            log_success(f"Created {name} import definition with ID: {definition_id}")
-        
-        return definition_id
-    
-    # Function to ensure source columns exist
-    def ensure_source_columns(definition_id, columns):
-        # Get existing source columns
-        existing_columns = api_request(session, "GET", f"/rest/import_source_column?definition_id=eq.{definition_id}")
-        existing_col_dict = {col["column_name"]: col["id"] for col in existing_columns} if existing_columns else {}
-        
-        # Create any missing columns
-        for i, col_info in enumerate(columns):
-            col_name = col_info["column_name"]
-            if col_name not in existing_col_dict:
-                new_col = {
-                    "definition_id": definition_id,
-                    "column_name": col_name,
-                    "priority": col_info["priority"]
-                }
-                result = api_request(session, "POST", "/rest/import_source_column", data=new_col)
-                if result:
-                    log_success(f"Created source column: {col_name}")
-                    # Update dictionary with new ID
-                    if isinstance(result, list) and len(result) > 0:
-                        existing_col_dict[col_name] = result[0]["id"]
-                    elif isinstance(result, dict) and "id" in result:
-                        existing_col_dict[col_name] = result["id"]
-                else:
-                    log_warning(f"Failed to create source column: {col_name}")
-        
-        # If we added columns, refresh the list
-        if len(existing_col_dict) < len(columns):
-            updated_columns = api_request(session, "GET", f"/rest/import_source_column?definition_id=eq.{definition_id}")
-            if updated_columns:
-                existing_col_dict = {col["column_name"]: col["id"] for col in updated_columns}
-        
-        return existing_col_dict
-    
-    # Function to ensure mappings exist
-    def ensure_mappings(definition_id, target_id, source_col_dict, mapping_pairs):
-        # Get target columns
-        target_columns = api_request(session, "GET", f"/rest/import_target_column?target_id=eq.{target_id}")
-        if not target_columns:
-            log_error(f"Could not get target columns for target_id {target_id}")
-            return False
-        
-        # Create target column dictionary
-        target_col_dict = {col["column_name"]: col["id"] for col in target_columns}
-        
-        # Get temporal column IDs
-        valid_from_id = target_col_dict.get("valid_from")
-        valid_to_id = target_col_dict.get("valid_to")
-        
-        if not valid_from_id or not valid_to_id:
-            log_error(f"Could not find temporal column IDs for target_id {target_id}")
-            log_info(f"Available target columns: {', '.join([col['column_name'] for col in target_columns])}")
-            return False
-        
-        # Get existing mappings
-        existing_mappings = api_request(session, "GET", f"/rest/import_mapping?definition_id=eq.{definition_id}")
-        
-        # Create a set of existing mappings for quick lookup
-        existing_mapping_set = set()
-        if existing_mappings:
-            for mapping in existing_mappings:
-                source_id = mapping.get("source_column_id")
-                target_id = mapping.get("target_column_id")
-                if source_id and target_id:
-                    existing_mapping_set.add(f"{source_id}:{target_id}")
-                elif mapping.get("source_expression") == "default" and target_id:
-                    # For temporal columns with default expression
-                    existing_mapping_set.add(f"default:{target_id}")
-        
-        # First ensure temporal columns are mapped
-        temporal_mappings = [
-            {"source_column_id": None,
-             "target_column_id": valid_from_id,
-             "source_expression": "default",
-             "definition_id": definition_id},
-            {"source_column_id": None,
-             "target_column_id": valid_to_id,
-             "source_expression": "default",
-             "definition_id": definition_id}
-        ]
-        
-        for mapping in temporal_mappings:
-            target_id = mapping["target_column_id"]
-            mapping_key = f"default:{target_id}"
-            
-            if mapping_key not in existing_mapping_set:
-                result = api_request(session, "POST", "/rest/import_mapping", data=mapping)
-                if result:
-                    log_success(f"Created temporal mapping for column ID {target_id}")
-                    existing_mapping_set.add(mapping_key)
-                else:
-                    # Try once more with delay
-                    time.sleep(1)
-                    result = api_request(session, "POST", "/rest/import_mapping", data=mapping)
-                    if result:
-                        log_success(f"Created temporal mapping for column ID {target_id} on retry")
-                        existing_mapping_set.add(mapping_key)
-                    else:
-                        log_error(f"Failed to create temporal mapping for column ID {target_id}")
-                        return False
-        
-        # Now create regular column mappings
-        for source_name, target_name in mapping_pairs:
-            source_id = source_col_dict.get(source_name)
-            
-            if not source_id:
-                log_warning(f"Source column '{source_name}' not found")
-                continue
-                
-            # Handle NULL target mappings (columns that should be ignored)
-            if target_name is None:
-                mapping_key = f"{source_id}:null"
-                
-                if mapping_key not in existing_mapping_set:
-                    mapping = {
-                        "definition_id": definition_id,
-                        "source_column_id": source_id,
-                        "target_column_id": None
-                    }
-                    
-                    result = api_request(session, "POST", "/rest/import_mapping", data=mapping)
-                    if result:
-                        log_success(f"Created NULL mapping for source column: {source_name}")
-                        existing_mapping_set.add(mapping_key)
-                    else:
-                        log_warning(f"Failed to create NULL mapping for source column: {source_name}")
-            else:
-                # Regular mapping with target column
-                target_id = target_col_dict.get(target_name)
-                
-                if not target_id:
-                    log_warning(f"Target column '{target_name}' not found")
-                    continue
-                    
-                mapping_key = f"{source_id}:{target_id}"
-                
-                if mapping_key not in existing_mapping_set:
-                    mapping = {
-                        "definition_id": definition_id,
-                        "source_column_id": source_id,
-                        "target_column_id": target_id
-                    }
-                    
-                    result = api_request(session, "POST", "/rest/import_mapping", data=mapping)
-                    if result:
-                        log_success(f"Created mapping: {source_name} -> {target_name}")
-                        existing_mapping_set.add(mapping_key)
-                    else:
-                        log_warning(f"Failed to create mapping: {source_name} -> {target_name}")
-        
-        return True
-    
-    # Process hovedenhet (legal unit) definition
-    hovedenhet_def_id = ensure_definition(
-        "brreg_hovedenhet_2024", 
-        "BRREG Hovedenhet 2024", 
-        legal_unit_target_id
-    )
-    
-    if not hovedenhet_def_id:
-        return False
-    
-    # Define source columns for hovedenhet with target mappings - order is important and must match priority
+    # Source columns with target mappings - order is important and must match priority
     hovedenhet_columns = [
         {"column_name": "organisasjonsnummer", "priority": 1, "target_name": "tax_ident"},
         {"column_name": "navn", "priority": 2, "target_name": "name"},
@@ -652,38 +443,7 @@ def setup_import_definitions(session: requests.Session) -> bool:
         {"column_name": "registreringsnummerIHjemlandet", "priority": 68, "target_name": None},
         {"column_name": "paategninger", "priority": 69, "target_name": None}
     ]
-    
-    # Create source columns first
-    hovedenhet_source_cols = ensure_source_columns(hovedenhet_def_id, hovedenhet_columns)
-    
-    # Extract mapping pairs from the combined structure
-    hovedenhet_mapping_pairs = [
-        (col["column_name"], col["target_name"]) 
-        for col in hovedenhet_columns
-    ]
-    
-    if not ensure_mappings(hovedenhet_def_id, legal_unit_target_id, hovedenhet_source_cols, hovedenhet_mapping_pairs):
-        return False
-    
-    # Set hovedenhet definition to valid
-    update_result = api_request(session, "PATCH", f"/rest/import_definition?id=eq.{hovedenhet_def_id}", 
-                              data={"draft": False, "valid": True})
-    if update_result is not None:
-        log_success("Set hovedenhet definition to valid")
-    else:
-        log_warning("Failed to set hovedenhet definition to valid")
-    
-    # Process underenhet (establishment) definition
-    underenhet_def_id = ensure_definition(
-        "brreg_underenhet_2024", 
-        "BRREG Underenhet 2024", 
-        establishment_target_id
-    )
-    
-    if not underenhet_def_id:
-        return False
-    
-    # Define source columns for underenhet with target mappings - order is important and must match priority
+
     underenhet_columns = [
         {"column_name": "organisasjonsnummer", "priority": 1, "target_name": "tax_ident"},
         {"column_name": "navn", "priority": 2, "target_name": "name"},
@@ -722,26 +482,156 @@ def setup_import_definitions(session: requests.Session) -> bool:
         {"column_name": "overordnetEnhet", "priority": 35, "target_name": "legal_unit_tax_ident"},
         {"column_name": "nedleggelsesdato", "priority": 36, "target_name": "death_date"}
     ]
+
+    definition_specs = [
+        {"slug": "brreg_hovedenhet_2024", "name": "BRREG Hovedenhet 2024",
+         "target_id": legal_unit_target_id, "columns": hovedenhet_columns},
+        {"slug": "brreg_underenhet_2024", "name": "BRREG Underenhet 2024",
+         "target_id": establishment_target_id, "columns": underenhet_columns},
+    ]
+    slug_list = ",".join(spec["slug"] for spec in definition_specs)
+    
+    # Each table below is read once, diffed locally, and the missing rows are sent as
+    # one array POST. With on_conflict (a real unique constraint) rows another run
+    # already created are skipped (ignore-duplicates); without it the local diff alone
+    # decides what is missing.
+    def bulk_insert(endpoint, rows, on_conflict, what):
+        if not rows:
+            log_success(f"All {what} already exist")
+            return True
+        if on_conflict:
+            url = f"{endpoint}?on_conflict={on_conflict}"
+            prefer = "return=representation,resolution=ignore-duplicates"
+        else:
+            url = endpoint
+            prefer = "return=representation"
+        result = api_request(session, "POST", url, data=rows, headers={"Prefer": prefer})
+        if result is None:
+            log_error(f"Failed to create {len(rows)} {what}")
+            return False
+        log_success(f"Created {len(result)} of {len(rows)} missing {what}")
+        return True
+    
+    # Definitions: create the missing ones, put existing ones back in draft mode
+    new_definitions = [
+        {
+            "slug": spec["slug"],
+            "name": spec["name"],
+            "target_id": spec["target_id"],
+            "data_source_id": data_source_id,
+            "note": f"Import definition for {spec['name']}",
+            "draft": True,
+            "valid": False
+        }
+        for spec in definition_specs if spec["slug"] not in existing_definitions
+    ]
+    if not bulk_insert("/rest/import_definition", new_definitions, "slug", "import definitions"):
+        return False
     
-    # Create source columns first
-    underenhet_source_cols = ensure_source_columns(underenhet_def_id, underenhet_columns)
+    not_draft_ids = [d["id"] for d in existing_definitions.values() if not d.get("draft", False)]
+    if not_draft_ids:
+        update_result = api_request(session, "PATCH", f"/rest/import_definition?id=in.({','.join(map(str, not_draft_ids))})",
+                                    data={"draft": True, "valid": False}, expected_status=204)
+        if update_result is not None:
+            log_success(f"Set {len(not_draft_ids)} existing definitions to draft mode")
+        else:
+            log_warning("Failed to set existing definitions to draft mode")
     
-    # Extract mapping pairs from the combined structure
-    underenhet_mapping_pairs = [
-        (col["column_name"], col["target_name"]) 
-        for col in underenhet_columns
+    definitions = api_request(session, "GET", f"/rest/import_definition?slug=in.({slug_list})")
+    definition_ids = {d["slug"]: d["id"] for d in definitions or []}
+    if len(definition_ids) != len(definition_specs):
+        log_error(f"Could not get IDs for all import definitions (found: {', '.join(definition_ids) or 'none'})")
+        return False
+    id_list = ",".join(str(definition_id) for definition_id in definition_ids.values())
+    
+    # Source columns
+    def read_source_columns():
+        columns = api_request(session, "GET", f"/rest/import_source_column?definition_id=in.({id_list})")
+        return {(col["definition_id"], col["column_name"]): col["id"] for col in columns or []}
+    
+    source_col_dict = read_source_columns()
+    new_source_columns = [
+        {
+            "definition_id": definition_ids[spec["slug"]],
+            "column_name": col_info["column_name"],
+            "priority": col_info["priority"]
+        }
+        for spec in definition_specs
+        for col_info in spec["columns"]
+        if (definition_ids[spec["slug"]], col_info["column_name"]) not in source_col_dict
     ]
+    if not bulk_insert("/rest/import_source_column", new_source_columns, "definition_id,column_name", "source columns"):
+        return False
+    if new_source_columns:
+        source_col_dict = read_source_columns()
+    
+    # Target columns of both targets, including the temporal columns mapped with the default expression
+    target_id_list = ",".join(str(spec["target_id"]) for spec in definition_specs)
+    target_columns = api_request(session, "GET", f"/rest/import_target_column?target_id=in.({target_id_list})")
+    if not target_columns:
+        log_error(f"Could not get target columns for target_ids {target_id_list}")
+        return False
+    target_col_dict = {(col["target_id"], col["column_name"]): col["id"] for col in target_columns}
     
-    if not ensure_mappings(underenhet_def_id, establishment_target_id, underenhet_source_cols, underenhet_mapping_pairs):
+    # Mappings; every row carries the same keys, as PostgREST requires for an array POST
+    existing_mappings = api_request(session, "GET", f"/rest/import_mapping?definition_id=in.({id_list})")
+    existing_mapping_set = {
+        (m["definition_id"], m.get("source_column_id"), m.get("target_column_id"), m.get("source_expression"))
+        for m in existing_mappings or []
+    }
+    new_mappings = []
+    
+    def add_mapping(definition_id, source_id, target_id, source_expression=None):
+        key = (definition_id, source_id, target_id, source_expression)
+        if key not in existing_mapping_set:
+            existing_mapping_set.add(key)
+            new_mappings.append({
+                "definition_id": definition_id,
+                "source_column_id": source_id,
+                "target_column_id": target_id,
+                "source_expression": source_expression
+            })
+    
+    for spec in definition_specs:
+        definition_id = definition_ids[spec["slug"]]
+        valid_from_id = target_col_dict.get((spec["target_id"], "valid_from"))
+        valid_to_id = target_col_dict.get((spec["target_id"], "valid_to"))
+        if not valid_from_id or not valid_to_id:
+            log_error(f"Could not find temporal column IDs for target_id {spec['target_id']}")
+            log_info(f"Available target columns: {', '.join(name for tid, name in target_col_dict if tid == spec['target_id'])}")
+            return False
+        add_mapping(definition_id, None, valid_from_id, "default")
+        add_mapping(definition_id, None, valid_to_id, "default")
+        
+        for col_info in spec["columns"]:
+            source_name, target_name = col_info["column_name"], col_info["target_name"]
+            source_id = source_col_dict.get((definition_id, source_name))
+            if not source_id:
+                log_warning(f"Source column '{source_name}' not found")
+                continue
+            if target_name is None:
+                # NULL target mapping: the column is ignored
+                add_mapping(definition_id, source_id, None)
+                continue
+            target_id = target_col_dict.get((spec["target_id"], target_name))
+            if not target_id:
+                log_warning(f"Target column '{target_name}' not found")
+                continue
+            add_mapping(definition_id, source_id, target_id)
+    
+    # No on_conflict: the mapping rows use the legacy target_column_id key, which
+    # matches neither unique_source_to_target_mapping nor the partial unique index
+    # on (definition_id, target_data_column_id).
+    if not bulk_insert("/rest/import_mapping", new_mappings, None, "mappings"):
         return False
     
-    # Set underenhet definition to valid
-    update_result = api_request(session, "PATCH", f"/rest/import_definition?id=eq.{underenhet_def_id}", 
-                              data={"draft": False, "valid": True})
+    # Set both definitions to valid
+    update_result = api_request(session, "PATCH", f"/rest/import_definition?id=in.({id_list})",
+                                data={"draft": False, "valid": True})
     if update_result is not None:
-        log_success("Set underenhet definition to valid")
+        log_success("Set import definitions to valid")
     else:
-        log_warning("Failed to set underenhet definition to valid")
+        log_warning("Failed to set import definitions to valid")
     
     # Verify import definitions are valid
     definitions = api_request(session, "GET", "/rest/import_definition?slug=in.(brreg_hovedenhet_2024,brreg_underenhet_2024)")
@@ -912,6 +802,18 @@ def create_import_jobs(session: requests.Session) -> bool:
         log_error(f"Not all import jobs were created. Expected 8, found {len(jobs) if jobs else 0}")
         return False
 
+# Data files and the import jobs they are uploaded to
+UPLOAD_FILES = [
+    ("samples/norway/small-history/2015-enheter.csv", "import_lu_2015_sht"),
+    ("samples/norway/small-history/2016-enheter.csv", "import_lu_2016_sht"),
+    ("samples/norway/small-history/2017-enheter.csv", "import_lu_2017_sht"),
+    ("samples/norway/small-history/2018-enheter.csv", "import_lu_2018_sht"),
+    ("samples/norway/small-history/2015-underenheter.csv", "import_es_2015_sht"),
+    ("samples/norway/small-history/2016-underenheter.csv", "import_es_2016_sht"),
+    ("samples/norway/small-history/2017-underenheter.csv", "import_es_2017_sht"),
+    ("samples/norway/small-history/2018-underenheter.csv", "import_es_2018_sht")
+]
+
 def upload_data_files(session: requests.Session) -> bool:
     """Upload data files for import jobs"""
     log_info("Uploading data files...")
@@ -926,19 +828,7 @@ def upload_data_files(session: requests.Session) -> bool:
     # Create a dictionary of jobs by slug for quick lookup
     job_dict = {job['slug']: job for job in jobs}
     
-    # Define file paths and corresponding job slugs
-    file_mappings = [
-        ("samples/norway/small-history/2015-enheter.csv", "import_lu_2015_sht"),
-        ("samples/norway/small-history/2016-enheter.csv", "import_lu_2016_sht"),
-        ("samples/norway/small-history/2017-enheter.csv", "import_lu_2017_sht"),
-        ("samples/norway/small-history/2018-enheter.csv", "import_lu_2018_sht"),
-        ("samples/norway/small-history/2015-underenheter.csv", "import_es_2015_sht"),
-        ("samples/norway/small-history/2016-underenheter.csv", "import_es_2016_sht"),
-        ("samples/norway/small-history/2017-underenheter.csv", "import_es_2017_sht"),
-        ("samples/norway/small-history/2018-underenheter.csv", "import_es_2018_sht")
-    ]
-    
-    for file_path, job_slug in file_mappings:
+    for file_path, job_slug in UPLOAD_FILES:
         # Check if job exists and its state
         if job_slug in job_dict:
             job_state = job_dict[job_slug]['state']
@@ -1030,8 +920,225 @@ def upload_data_files(session: requests.Session) -> bool:
                 
     return True
 
-import threading
-from queue import Queue, Empty
+# States after which a job needs no further monitoring
+TERMINAL_JOB_STATES = ('finished', 'rejected', 'deleted')
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+async def _file_chunks(path: Path):
+    """Yield a file in chunks without blocking the event loop"""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+class ImportJobTracker:
+    """Follow import job states over /api/sse/import-jobs
+
+    The jobs are re-read over REST after every SSE reconnect (the endpoint does
+    not replay missed notifications) and whenever no state changed for `quiet`
+    seconds, so a broken SSE connection degrades to polling.
+    Create inside a running event loop.
+    """
+
+    def __init__(self, session: requests.Session, jobs: List[Dict], quiet: float = 15):
+        self.session = session
+        self.status = {job['id']: job['state'] for job in jobs}
+        self.slugs = {job['id']: job['slug'] for job in jobs}
+        self.quiet = quiet
+        self.heartbeats = 0
+        self.connected = asyncio.Event()
+        self.done = asyncio.Event()
+        self.sse = SSEClient(API_BASE_URL, IMPORT_JOBS, cookies=dict(session.cookies),
+                             params={"ids": ",".join(str(job_id) for job_id in self.status),
+                                     "scope": "updates_for_ids_only"})
+        self._tasks = []
+        self._check_done()
+
+    def _check_done(self):
+        if all(state in TERMINAL_JOB_STATES for state in self.status.values()):
+            self.done.set()
+
+    def update(self, job_id, state, source):
+        old_state = self.status.get(job_id)
+        if job_id not in self.status or old_state == state:
+            return
+        self.status[job_id] = state
+        log_info(f"Job {self.slugs[job_id]} state changed ({source}): {old_state} -> {state}")
+        self._check_done()
+
+    async def refresh(self, source):
+        jobs = await asyncio.to_thread(api_request, self.session, "GET", "/rest/import_job?slug=like.import_*_sht")
+        for job in jobs or []:
+            self.update(job['id'], job['state'], source)
+
+    async def _follow(self):
+        async for event in self.sse:
+            for line in self.sse.drain_debug():
+                debug_info(f"SSE Raw: {line}")
+            if event.event == OPEN:
+                if self.connected.is_set():
+                    log_warning("SSE connection re-established, re-reading job states")
+                    await self.refresh("resync")
+                self.connected.set()
+            elif event.event == "heartbeat":
+                self.heartbeats += 1
+                if self.heartbeats <= 5 or self.heartbeats % 10 == 0:
+                    log_info(f"Received SSE heartbeat ({self.heartbeats})")
+            elif event.event == "message":
+                try:
+                    data = event.json()
+                except ValueError:
+                    log_warning(f"Failed to parse SSE data: {event.data}")
+                    continue
+                job = data.get('import_job')
+                if data.get('type') == 'connection_established':
+                    log_info(f"SSE connection established for job IDs: {data.get('jobIds', [])}")
+                elif job is None:
+                    log_warning(f"Received unexpected data format: {data}")
+                elif data.get('verb') == 'DELETE':
+                    self.update(job.get('id'), 'deleted', "SSE")
+                else:
+                    self.update(job.get('id'), job.get('state'), "SSE")
+
+    async def _poll(self):
+        while not self.done.is_set():
+            try:
+                await asyncio.wait_for(self.done.wait(), self.quiet)
+            except asyncio.TimeoutError:
+                await self.refresh("poll")
+
+    async def start(self, connect_timeout: float = 10) -> bool:
+        """Start following; returns whether SSE connected within connect_timeout (polling runs either way)"""
+        follow = asyncio.create_task(self._follow())
+        self._tasks = [follow, asyncio.create_task(self._poll())]
+        connected = asyncio.create_task(self.connected.wait())
+        await asyncio.wait([connected, follow], timeout=connect_timeout, return_when=asyncio.FIRST_COMPLETED)
+        connected.cancel()
+        if follow.done() and follow.exception() is not None:
+            log_warning(f"SSE connection failed: {follow.exception()}")
+        return self.connected.is_set()
+
+    async def wait(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self.done.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.sse.debug_dropped:
+            debug_info(f"SSE debug buffer dropped {self.sse.debug_dropped} lines")
+
+    def report(self, completed: bool, timeout: float) -> bool:
+        """Log the outcome; True if every job finished"""
+        if not completed:
+            log_warning(f"Not all jobs completed within {timeout:.0f} seconds")
+            for job_id, state in self.status.items():
+                log_info(f"Job {self.slugs[job_id]} final state: {state}")
+            return False
+        rejected = [self.slugs[job_id] for job_id, state in self.status.items() if state == 'rejected']
+        if rejected:
+            log_warning(f"{len(rejected)} jobs rejected: {', '.join(rejected)}")
+            return False
+        log_success("All import jobs completed successfully")
+        return True
+
+async def _upload_and_monitor(session: requests.Session, concurrency: int, timeout: float) -> bool:
+    jobs = api_request(session, "GET", "/rest/import_job?slug=like.import_*_sht")
+    if not jobs:
+        log_error("No import jobs found")
+        return False
+
+    job_by_slug = {job['slug']: job for job in jobs}
+    tracker = ImportJobTracker(session, jobs)
+    if tracker.done.is_set():
+        log_success("All jobs are already completed, nothing to upload")
+        return True
+
+    async with httpx.AsyncClient(base_url=API_BASE_URL, cookies=dict(session.cookies),
+                                 timeout=httpx.Timeout(30.0)) as client:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def upload(file_path, job_slug):
+            """Stream one file into its job's upload table. Returns an error message or None"""
+            job = job_by_slug.get(job_slug)
+            if job is None:
+                return f"Import job {job_slug} not found"
+            if job['state'] not in ['created', 'waiting_for_upload', 'failed']:
+                log_info(f"Skipping upload for job {job_slug} (state: {job['state']})")
+                return None
+            full_path = WORKSPACE / file_path
+            if not full_path.exists():
+                return f"Data file not found: {file_path}"
+            headers = {
+                "Content-Type": "text/csv",
+                "Content-Length": str(full_path.stat().st_size),
+                "X-Import-Job-Slug": job_slug
+            }
+            async with semaphore:
+                log_info(f"Uploading {file_path} for job {job_slug}...")
+                started = time.monotonic()
+                response = await client.post(f"/rest/{job['upload_table_name']}", headers=headers,
+                                             content=_file_chunks(full_path),
+                                             timeout=httpx.Timeout(30.0, read=300.0, write=None))
+            if response.status_code not in [200, 201]:
+                return f"Failed to upload {file_path}: {response.status_code} - {response.text}"
+            log_success(f"Uploaded {file_path} to {job['upload_table_name']} in {time.monotonic() - started:.1f}s")
+            return None
+
+        # Subscribe before the first upload so no state transition is missed
+        if await tracker.start():
+            log_success("SSE connection established")
+        else:
+            log_warning("SSE connection not established, relying on polling")
+
+        try:
+            started = time.monotonic()
+            errors = [e for e in await asyncio.gather(*(upload(f, s) for f, s in UPLOAD_FILES)) if e]
+            if errors:
+                for error in errors:
+                    log_warning(error)
+                return False
+            log_info(f"Uploads finished in {time.monotonic() - started:.1f}s (concurrency {concurrency}), waiting for the worker...")
+            completed = await tracker.wait(timeout)
+            if completed:
+                log_success(f"All jobs completed {time.monotonic() - started:.1f}s after the first upload started")
+        finally:
+            await tracker.stop()
+
+    return tracker.report(completed, timeout)
+
+def upload_and_monitor_async(session: requests.Session, concurrency: int = 4, timeout: float = 300) -> bool:
+    """Upload data files concurrently and wait for the import jobs to finish
+
+    Replaces upload_data_files + wait_for_worker_processing_of_import_jobs: up to
+    `concurrency` files are streamed in chunks at once, and job state is followed
+    through /api/sse/import-jobs (with a REST poll as fallback) instead of sleeps.
+    """
+    log_info(f"Uploading data files asynchronously (concurrency {concurrency})...")
+    return asyncio.run(_upload_and_monitor(session, concurrency, timeout))
+
+async def _wait_for_import_jobs(session: requests.Session, jobs: List[Dict], timeout: float) -> bool:
+    tracker = ImportJobTracker(session, jobs)
+    if tracker.done.is_set():
+        log_success("All jobs are already completed, no need to monitor")
+        return True
+    if await tracker.start():
+        log_success("SSE connection established")
+    else:
+        log_warning("SSE connection not established, relying on polling")
+    try:
+        completed = await tracker.wait(timeout)
+    finally:
+        await tracker.stop()
+    log_info("Performing final job status check...")
+    await tracker.refresh("final check")
+    return tracker.report(completed or tracker.done.is_set(), timeout)
 
 def wait_for_worker_processing_of_import_jobs(session: requests.Session) -> bool:
     """Wait for import jobs to be processed by the worker"""
@@ -1047,347 +1154,89 @@ def wait_for_worker_processing_of_import_jobs(session: requests.Session) -> bool
     # Check initial state
     for job in jobs:
         log_info(f"Job {job['slug']} initial state: {job['state']}")
-        
-    # Create a shared queue for SSE events and a flag for completion
-    event_queue = Queue()
-    stop_event = threading.Event()
     
-    # Track job status
-    job_status = {job['id']: job['state'] for job in jobs}
-    
-    # Check if all jobs are already completed before starting SSE
-    if all(state in ['finished', 'rejected'] for state in job_status.values()):
-        log_success("All jobs are already completed, no need to monitor")
-        return True
-    
-    # Function to check if all jobs are completed (including deleted)
+    return asyncio.run(_wait_for_import_jobs(session, jobs, timeout=300))
+
+async def _wait_for_worker_derive(session: requests.Session, timeout: float, quiet: float = 30) -> bool:
+    # Assume deriving until the first status read says otherwise
+    derivation_status = {"isDerivingUnits": True, "isDerivingReports": True}
+    status_keys = {"is_deriving_statistical_units": "isDerivingUnits", "is_deriving_reports": "isDerivingReports"}
+    done = asyncio.Event()
+
     def check_all_completed():
-        completed_count = sum(1 for state in job_status.values() if state in ['finished', 'rejected', 'deleted'])
-        log_info(f"Job completion status: {completed_count}/{len(jobs)} jobs completed, rejected, or deleted")
-        return completed_count == len(jobs)
+        return not derivation_status["isDerivingUnits"] and not derivation_status["isDerivingReports"]
 
-    # Get job IDs for monitoring
-    job_ids = [job['id'] for job in jobs]
-    job_id_str = ",".join(str(job_id) for job_id in job_ids)
-    
-    # Thread function to monitor SSE events
-    def sse_monitor_thread():
+    async def refresh(label):
         try:
-            # Clone the session cookies and headers for the SSE connection
-            sse_session = requests.Session()
-            sse_session.cookies.update(session.cookies)
-            
-            # Prepare the SSE request
-            sse_url = f"{API_BASE_URL}/api/sse/import-jobs?ids={job_id_str}"
-            log_info(f"SSE thread connecting to endpoint: {sse_url}")
-            
-            # Start the SSE request
-            sse_response = sse_session.get(
-                sse_url,
-                stream=True,
-                headers={"Accept": "text/event-stream"}
-            )
-            
-            if sse_response.status_code != 200:
-                event_queue.put(("error", f"SSE connection failed with status {sse_response.status_code}"))
-                event_queue.put(("error_details", {
-                    "status": sse_response.status_code,
-                    "body": sse_response.text,
-                    "headers": dict(sse_response.headers),
-                    "url": sse_url
-                }))
-                return
-            
-            event_queue.put(("info", "SSE connection established (HTTP 200 OK)"))
-
-            # Process SSE events line by line
-            buffer = ""
-            event_type = None
-            for line_bytes in sse_response.iter_lines():
-                if stop_event.is_set():
-                    log_info("SSE thread: Stop event received, breaking loop.")
-                    break
-
-                line = line_bytes.decode('utf-8')
-                event_queue.put(("raw_line", line)) # Log raw lines for debugging
-
-                if not line: # Empty line signifies end of an event
-                    if buffer and event_type:
-                        event_queue.put(("debug", f"Processing event: type={event_type}, data={buffer}"))
-                        if event_type == "message": # Default event type if none specified
-                            try:
-                                data = json.loads(buffer)
-                                event_queue.put(("data", data))
-                            except json.JSONDecodeError:
-                                event_queue.put(("warning", f"Failed to parse SSE data: {buffer}"))
-                        elif event_type == "heartbeat":
-                            try:
-                                data = json.loads(buffer)
-                                event_queue.put(("heartbeat", data))
-                            except json.JSONDecodeError:
-                                event_queue.put(("warning", f"Failed to parse heartbeat data: {buffer}"))
-                        else:
-                             event_queue.put(("warning", f"Received unknown event type: {event_type}"))
-                    # Reset for next event
-                    buffer = ""
-                    event_type = None
+            status_response = await asyncio.to_thread(api_request, session, "GET", "/api/diagnostics")
+        except Exception as e:
+            log_warning(f"Failed to get worker status: {e}")
+            return
+        if not status_response or "diagnostics" not in status_response:
+            log_warning("Failed to get worker status")
+            return
+        worker_status = status_response["diagnostics"].get("workerStatus", {})
+        derivation_status["isDerivingUnits"] = worker_status.get("isDerivingUnits", False)
+        derivation_status["isDerivingReports"] = worker_status.get("isDerivingReports", False)
+        log_info(f"{label} status - Deriving units: {derivation_status['isDerivingUnits']}, " +
+                 f"Deriving reports: {derivation_status['isDerivingReports']}")
+        if check_all_completed():
+            done.set()
+
+    async def follow(sse):
+        async for event in sse:
+            for line in sse.drain_debug():
+                debug_info(f"SSE Raw: {line}")
+            if event.event == "connected":
+                # Sent once the server listens for us; the endpoint only pushes changes, so read the current status
+                log_info("Received connected event from SSE")
+                await refresh("Initial" if sse.connects == 1 else "Resync")
+            elif event.event == "message":
+                try:
+                    payload = event.json()
+                except ValueError:
+                    log_warning(f"Failed to parse SSE data: {event.data}")
                     continue
+                key = status_keys.get(payload.get("type"))
+                if key is None:
+                    continue
+                old_status = derivation_status[key]
+                derivation_status[key] = payload.get("status")
+                if old_status != derivation_status[key]:
+                    log_info(f"{key} changed: {old_status} -> {derivation_status[key]}")
+                if check_all_completed():
+                    log_success("Worker has finished all derivation tasks (detected by SSE)")
+                    done.set()
 
-                if line.startswith("event:"):
-                    event_type = line[6:].strip()
-                elif line.startswith("data:"):
-                    buffer += line[5:].strip() # Append data, removing "data:" prefix
-                elif line.startswith("retry:"):
-                    event_queue.put(("info", f"Received retry directive: {line}"))
-                elif line.startswith(":"): # Comment line, often used for heartbeats without data
-                    event_queue.put(("debug", f"Received comment line: {line}"))
-                    # Treat simple comments as potential heartbeats if no event type is set
-                    if not event_type:
-                         event_type = "heartbeat" # Assume simple comment is heartbeat
-                         buffer = "{}" # Provide empty JSON object for heartbeat handler
-                else:
-                    event_queue.put(("warning", f"Received unexpected SSE line: {line}"))
+    async def poll(sse):
+        # Only when the stream has gone quiet (worker_status sends a heartbeat every 30 seconds)
+        while not done.is_set():
+            try:
+                await asyncio.wait_for(done.wait(), quiet)
+            except asyncio.TimeoutError:
+                if time.monotonic() - sse.last_activity >= quiet:
+                    log_info("No recent events, checking worker status directly")
+                    await refresh("Current")
 
-            log_info("SSE thread: iter_lines loop finished.")
-            # Close the SSE connection if not already closed
-            if sse_response:
-                sse_response.close()
-            event_queue.put(("info", "SSE connection closed"))
-            
-        except Exception as e:
-            event_queue.put(("error", f"Error in SSE thread: {str(e)}"))
-    
-    # Start the SSE monitor thread
-    sse_thread = threading.Thread(target=sse_monitor_thread)
-    sse_thread.daemon = True
-    sse_thread.start()
-    
-    # Process events from the queue
-    all_completed = False
-    timeout = time.time() + 300  # 5 minutes timeout
-    last_heartbeat = time.time()
-    heartbeat_count = 0
-    
+    sse = SSEClient(API_BASE_URL, WORKER_STATUS, cookies=dict(session.cookies))
+    tasks = [asyncio.create_task(follow(sse)), asyncio.create_task(poll(sse))]
     try:
-        # Wait for initial connection
-        initial_timeout = time.time() + 10  # 10 seconds for initial connection
-        connection_established = False
-        
-        while time.time() < initial_timeout and not connection_established:
-            try:
-                event_type, event_data = event_queue.get(timeout=1)
-                
-                if event_type == "error":
-                    log_error(event_data)
-                    if event_queue.qsize() > 0:
-                        error_type, error_details = event_queue.get(timeout=1)
-                        if error_type == "error_details":
-                            def print_sse_error_details():
-                                print(f"{RED}SSE response status: {error_details['status']}{NC}")
-                                print(f"{RED}SSE response body: {error_details['body']}{NC}")
-                                print(f"{RED}SSE response headers: {error_details['headers']}{NC}")
-                                print(f"{RED}SSE request URL: {error_details['url']}{NC}")
-                            
-                            log_error("SSE connection failed", print_sse_error_details)
-                    stop_event.set()
-                    return False
-                
-                if event_type == "info" and event_data == "SSE connection established":
-                    log_success("SSE connection established")
-                    connection_established = True
-                
-                event_queue.task_done()
-            except Empty:
-                pass
-        
-        if not connection_established:
-            log_error("Timed out waiting for SSE connection to establish")
-            stop_event.set()
-            return False
-        
-        # Main event processing loop
-        while time.time() < timeout and not all_completed:
-            # Check if jobs have been updated directly
-            if time.time() % 10 < 1:  # Check roughly every 10 seconds
-                updated_jobs = api_request(session, "GET", "/rest/import_job?slug=like.import_*_sht")
-                if updated_jobs:
-                    for job in updated_jobs:
-                        job_id = job['id']
-                        new_state = job['state']
-                        old_state = job_status.get(job_id)
-                        
-                        if old_state != new_state:
-                            log_info(f"Job {job['slug']} state changed (poll): {old_state} -> {new_state}")
-                            job_status[job_id] = new_state
-                    
-                    # Check if all jobs are completed after polling
-                    if check_all_completed():
-                        log_success("All jobs completed (detected by polling)")
-                        all_completed = True
-                        break
-            
-            # Check if we've been idle too long (no heartbeats)
-            if time.time() - last_heartbeat > 15:  # 15 seconds without heartbeat
-                log_info("No recent heartbeats, checking job status directly")
-                updated_jobs = api_request(session, "GET", "/rest/import_job?slug=like.import_*_sht")
-                if updated_jobs:
-                    for job in updated_jobs:
-                        job_id = job['id']
-                        new_state = job['state']
-                        old_state = job_status.get(job_id)
-                        
-                        if old_state != new_state:
-                            log_info(f"Job {job['slug']} state changed (poll): {old_state} -> {new_state}")
-                            job_status[job_id] = new_state
-                    
-                    # Check if all jobs are completed after polling
-                    if check_all_completed():
-                        log_success("All jobs completed (detected by polling during idle period)")
-                        all_completed = True
-                        break
-                
-                # Reset heartbeat timer
-                last_heartbeat = time.time()
-            
-            # Process events from the queue
-            try:
-                event_type, event_data = event_queue.get(timeout=1)
-                
-                if event_type == "error":
-                    log_warning(f"SSE error: {event_data}")
-                
-                elif event_type == "data":
-                    # Handle connection established message
-                    if isinstance(event_data, dict) and event_data.get('type') == 'connection_established':
-                        log_info(f"SSE connection established for job IDs: {event_data.get('jobIds', [])}")
-                    
-                    # Handle structured job updates { verb: '...', import_job: { ... } }
-                    elif isinstance(event_data, dict) and 'verb' in event_data and 'import_job' in event_data:
-                        verb = event_data['verb']
-                        job_data = event_data['import_job'] # Use 'import_job' key
-
-                        if verb == 'DELETE':
-                            job_id = job_data.get('id')
-                            if job_id in job_status:
-                                log_info(f"Job {job_id} deleted (SSE)")
-                                job_status[job_id] = 'deleted' # Mark as deleted
-                        elif verb in ['INSERT', 'UPDATE']:
-                            job_id = job_data.get('id')
-                            new_state = job_data.get('state')
-                            old_state = job_status.get(job_id)
-
-                            if job_id in job_status and old_state != new_state:
-                                log_info(f"Job {job_data.get('slug', job_id)} state changed (SSE): {old_state} -> {new_state} (verb: {verb})")
-                                job_status[job_id] = new_state
-
-                                # Log additional details if available
-                                if 'message' in job_data:
-                                    log_info(f"Job message: {job_data['message']}")
-                                if 'import_completed_pct' in job_data:
-                                    log_info(f"Job progress: {job_data['import_completed_pct']}%")
-                        else:
-                            log_warning(f"Received unknown verb in job update: {verb}")
-
-                        # Check if all jobs are completed after each state change
-                        # Include 'deleted' as a completed state for this check
-                        if check_all_completed():
-                            log_success("All jobs completed or deleted (detected by SSE)")
-                            all_completed = True
-                            break
-                    else:
-                        # Log unexpected data format
-                        log_warning(f"Received unexpected data format: {event_data}")
-
-                elif event_type == "heartbeat":
-                    heartbeat_count += 1
-                    last_heartbeat = time.time()
-                    # Log first few and then periodically
-                    if heartbeat_count <= 5 or heartbeat_count % 10 == 0:
-                        log_info(f"Received SSE heartbeat ({heartbeat_count}): {event_data}")
-
-                elif event_type == "raw_line":
-                    # Log raw lines only if DEBUG is enabled
-                    debug_info(f"SSE Raw: {event_data}")
-
-                elif event_type == "debug":
-                    debug_info(f"SSE Debug: {event_data}")
-
-                elif event_type == "warning":
-                    log_warning(f"SSE Warning: {event_data}")
-
-                elif event_type == "info":
-                    log_info(f"SSE Info: {event_data}")
-
-                event_queue.task_done()
-
-            except Empty:
-                # No events in the queue, check if we need to trigger processing
-                if not any(state in ['processing', 'validating'] for state in job_status.values()):
-                    waiting_jobs = [job_id for job_id, state in job_status.items() if state == 'waiting_for_upload']
-                    if waiting_jobs:
-                        log_info(f"Found {len(waiting_jobs)} jobs still waiting for upload, triggering processing")
-                        # The worker must do this, so output approriate instructions to check/debug found elsewhere.
-        
-        # Stop the SSE thread
-        stop_event.set()
-        
-        # Final check of job status
-        log_info("Performing final job status check...")
-        updated_jobs = api_request(session, "GET", "/rest/import_job?slug=like.import_*_sht")
-        if updated_jobs:
-            # Print detailed status of each job
-            for job in updated_jobs:
-                job_id = job['id']
-                new_state = job['state']
-                old_state = job_status.get(job_id)
-                job_status[job_id] = new_state
-                
-                if old_state != new_state:
-                    log_info(f"Job {job['slug']} final state update: {old_state} -> {new_state}")
-                else:
-                    log_info(f"Job {job['slug']} final state: {new_state}")
-            
-            all_completed = check_all_completed()
-            
-            # If all jobs are in a terminal state (finished or rejected), consider the process complete
-            if all(state in ['finished', 'rejected'] for state in job_status.values()):
-                log_success("All jobs are in terminal states (finished or rejected)")
-                all_completed = True
-        
-        # Wait for the thread to finish
-        sse_thread.join(timeout=5)
-        
-    except Exception as e:
-        log_error(f"Error during job monitoring: {e}")
-        stop_event.set()
-        return False
-    
-    if not all_completed:
-        log_warning("Not all jobs completed within the timeout period")
-        
-        # Show current status
-        updated_jobs = api_request(session, "GET", "/rest/import_job?slug=like.import_*_sht")
-        if updated_jobs:
-            for job in updated_jobs:
-                log_info(f"Job {job['slug']} final state: {job['state']}")
-        
-        return False
-    
-    # Check for any rejected jobs
-    rejected_jobs = [job_id for job_id, state in job_status.items() if state == 'rejected']
-    if rejected_jobs:
-        log_warning(f"{len(rejected_jobs)} jobs rejected")
-        
-        # Get details of rejected jobs
-        updated_jobs = api_request(session, "GET", "/rest/import_job?slug=like.import_*_sht")
-        if updated_jobs:
-            for job in updated_jobs:
-                if job['state'] == 'rejected':
-                    log_warning(f"Job {job['slug']} rejected")
-        
+        await asyncio.wait_for(done.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    if isinstance(results[0], SSEError):
+        log_warning(f"SSE connection failed: {results[0]}")
+
+    log_info("Performing final derivation status check...")
+    await refresh("Final")
+    if not check_all_completed():
+        log_warning("Worker derivation did not complete within the timeout period")
         return False
-    
-    log_success("All import jobs completed successfully")
+    log_success("Worker has finished deriving all statistical units and reports")
     return True
 
 def wait_for_worker_derive(session: requests.Session) -> bool:
@@ -1397,250 +1246,7 @@ def wait_for_worker_derive(session: requests.Session) -> bool:
     until both is_deriving_statistical_units and is_deriving_reports are false.
     """
     log_info("Waiting for worker to finish deriving statistical units and reports...")
-    
-    # Create a shared queue for SSE events and a flag for completion
-    event_queue = Queue()
-    stop_event = threading.Event()
-    
-    # Track derivation status
-    derivation_status = {
-        "isDerivingUnits": True,  # Assume true initially
-        "isDerivingReports": True  # Assume true initially
-    }
-    
-    # Function to check if all derivation is completed
-    def check_all_completed():
-        return not derivation_status["isDerivingUnits"] and not derivation_status["isDerivingReports"]
-    
-    # Thread function to monitor SSE events
-    def sse_monitor_thread():
-        try:
-            # Clone the session cookies and headers for the SSE connection
-            sse_session = requests.Session()
-            sse_session.cookies.update(session.cookies)
-            
-            # Prepare the SSE request
-            sse_url = f"{API_BASE_URL}/api/sse/worker_status"
-            log_info(f"SSE thread connecting to endpoint: {sse_url}")
-            
-            # Start the SSE request
-            sse_response = sse_session.get(
-                sse_url,
-                stream=True,
-                headers={"Accept": "text/event-stream"}
-            )
-            
-            if sse_response.status_code != 200:
-                event_queue.put(("error", f"SSE connection failed with status {sse_response.status_code}"))
-                event_queue.put(("error_details", {
-                    "status": sse_response.status_code,
-                    "body": sse_response.text,
-                    "headers": dict(sse_response.headers),
-                    "url": sse_url
-                }))
-                return
-            
-            event_queue.put(("info", "SSE connection established"))
-            
-            # Process SSE events line by line
-            for line_bytes in sse_response.iter_lines():
-                if stop_event.is_set():
-                    break
-                
-                line = line_bytes.decode('utf-8')
-
-                if line.startswith("data:"):
-                    try:
-                        data = json.loads(line[5:].strip())
-                        event_queue.put(("data", data))
-                    except json.JSONDecodeError:
-                        event_queue.put(("warning", f"Failed to parse SSE data: {line[5:].strip()}"))
-                elif line.startswith("event:"):
-                    event_type = line[6:].strip()
-                    event_queue.put(("event", {"type": event_type, "data": None}))
-                elif line.startswith(":"): # comment/heartbeat
-                    event_queue.put(("heartbeat", {}))
-            
-            # Close the SSE connection
-            sse_response.close()
-            event_queue.put(("info", "SSE connection closed"))
-            
-        except Exception as e:
-            event_queue.put(("error", f"Error in SSE thread: {str(e)}"))
-    
-    # Start the SSE monitor thread
-    sse_thread = threading.Thread(target=sse_monitor_thread)
-    sse_thread.daemon = True
-    sse_thread.start()
-    
-    # Process events from the queue
-    all_completed = False
-    timeout = time.time() + 300  # 5 minutes timeout
-    last_activity = time.time()
-    
-    try:
-        # Wait for initial connection
-        initial_timeout = time.time() + 10  # 10 seconds for initial connection
-        connection_established = False
-        
-        while time.time() < initial_timeout and not connection_established:
-            try:
-                event_type, event_data = event_queue.get(timeout=1)
-                
-                if event_type == "error":
-                    log_error(event_data)
-                    if event_queue.qsize() > 0:
-                        error_type, error_details = event_queue.get(timeout=1)
-                        if error_type == "error_details":
-                            def print_sse_error_details():
-                                print(f"{RED}SSE response status: {error_details['status']}{NC}")
-                                print(f"{RED}SSE response body: {error_details['body']}{NC}")
-                                print(f"{RED}SSE response headers: {error_details['headers']}{NC}")
-                                print(f"{RED}SSE request URL: {error_details['url']}{NC}")
-                            
-                            log_error("SSE connection failed", print_sse_error_details)
-                    stop_event.set()
-                    return False
-                
-                if event_type == "info" and event_data == "SSE connection established":
-                    log_success("SSE connection established")
-                    connection_established = True
-                
-                event_queue.task_done()
-            except Empty:
-                pass
-        
-        if not connection_established:
-            log_error("Timed out waiting for SSE connection to establish")
-            stop_event.set()
-            return False
-        
-        # Check initial status directly
-        log_info("Checking initial worker status...")
-        try:
-            # Make a direct API call to get current status
-            status_response = api_request(session, "GET", "/api/diagnostics")
-            if status_response and "diagnostics" in status_response:
-                worker_status = status_response["diagnostics"].get("workerStatus", {})
-                derivation_status["isDerivingUnits"] = worker_status.get("isDerivingUnits", False)
-                derivation_status["isDerivingReports"] = worker_status.get("isDerivingReports", False)
-                
-                log_info(f"Initial status - Deriving units: {derivation_status['isDerivingUnits']}, " +
-                         f"Deriving reports: {derivation_status['isDerivingReports']}")
-                
-                # If already completed, we can exit early
-                if check_all_completed():
-                    log_success("Worker is not currently deriving any data")
-                    all_completed = True
-                    stop_event.set()
-                    return True
-        except Exception as e:
-            log_warning(f"Failed to get initial worker status: {e}")
-        
-        # Main event processing loop
-        while time.time() < timeout and not all_completed:
-            # Check if we've been idle too long
-            if time.time() - last_activity > 30:  # 30 seconds without activity
-                log_info("No recent events, checking worker status directly")
-                try:
-                    # Make a direct API call to get current status
-                    status_response = api_request(session, "GET", "/api/diagnostics")
-                    if status_response and "diagnostics" in status_response:
-                        worker_status = status_response["diagnostics"].get("workerStatus", {})
-                        derivation_status["isDerivingUnits"] = worker_status.get("isDerivingUnits", False)
-                        derivation_status["isDerivingReports"] = worker_status.get("isDerivingReports", False)
-                        
-                        log_info(f"Current status - Deriving units: {derivation_status['isDerivingUnits']}, " +
-                                 f"Deriving reports: {derivation_status['isDerivingReports']}")
-                        
-                        # Check if all derivation is completed
-                        if check_all_completed():
-                            log_success("Worker has finished all derivation tasks (detected by polling)")
-                            all_completed = True
-                            break
-                except Exception as e:
-                    log_warning(f"Failed to get worker status: {e}")
-                
-                # Reset activity timer
-                last_activity = time.time()
-            
-            # Process events from the queue
-            try:
-                event_type, event_data = event_queue.get(timeout=1)
-                last_activity = time.time()
-                
-                if event_type == "error":
-                    log_warning(f"SSE error: {event_data}")
-                
-                elif event_type == "data":
-                    payload = event_data
-                    status_type = payload.get("type")
-                    status_value = payload.get("status")
-
-                    if status_type == "is_deriving_statistical_units":
-                        key = "isDerivingUnits"
-                        old_status = derivation_status[key]
-                        derivation_status[key] = status_value
-                        if old_status != status_value:
-                             log_info(f"Deriving units status changed: {old_status} -> {status_value}")
-                    elif status_type == "is_deriving_reports":
-                        key = "isDerivingReports"
-                        old_status = derivation_status[key]
-                        derivation_status[key] = status_value
-                        if old_status != status_value:
-                             log_info(f"Deriving reports status changed: {old_status} -> {status_value}")
-
-                    # Check if all derivation is completed
-                    if check_all_completed():
-                        log_success("Worker has finished all derivation tasks (detected by SSE)")
-                        all_completed = True
-                        break
-                
-                elif event_type == "event" and event_data["type"] == "connected":
-                    log_info("Received connected event from SSE")
-                
-                event_queue.task_done()
-            
-            except Empty:
-                # No events in the queue, continue waiting
-                pass
-        
-        # Stop the SSE thread
-        stop_event.set()
-        
-        # Final check of derivation status
-        log_info("Performing final derivation status check...")
-        try:
-            # Make a direct API call to get current status
-            status_response = api_request(session, "GET", "/api/diagnostics")
-            if status_response and "diagnostics" in status_response:
-                worker_status = status_response["diagnostics"].get("workerStatus", {})
-                derivation_status["isDerivingUnits"] = worker_status.get("isDerivingUnits", False)
-                derivation_status["isDerivingReports"] = worker_status.get("isDerivingReports", False)
-                
-                log_info(f"Final status - Deriving units: {derivation_status['isDerivingUnits']}, " +
-                         f"Deriving reports: {derivation_status['isDerivingReports']}")
-                
-                all_completed = check_all_completed()
-            else:
-                log_warning("Failed to get final worker status")
-        except Exception as e:
-            log_warning(f"Error during final status check: {e}")
-        
-        # Wait for the thread to finish
-        sse_thread.join(timeout=5)
-        
-    except Exception as e:
-        log_error(f"Error during worker derivation monitoring: {e}")
-        stop_event.set()
-        return False
-    
-    if not all_completed:
-        log_warning("Worker derivation did not complete within the timeout period")
-        return False
-    
-    log_success("Worker has finished deriving all statistical units and reports")
-    return True
+    return asyncio.run(_wait_for_worker_derive(session, timeout=300))
 
 
 def verify_imported_data(session: requests.Session) -> bool:
@@ -1882,6 +1488,10 @@ def parse_args():
     parser = argparse.ArgumentParser(description='Import or delete Norway small history data')
     parser.add_argument('action', choices=['create', 'delete'], 
                         help='Action to perform: create (import data) or delete (clean up)')
+    parser.add_argument('--async-upload', action='store_true',
+                        help='Upload data files concurrently (asyncio/httpx) and follow job state over SSE')
+    parser.add_argument('--upload-concurrency', type=int, default=4, metavar='N',
+                        help='Maximum concurrent uploads with --async-upload (default: 4)')
     return parser.parse_args()
 
 def main():
@@ -2081,15 +1691,21 @@ def main():
             log_error("Failed to create import jobs")
             return
         
-        # Upload data files
-        if not upload_data_files(session):
-            log_error("Failed to upload data files")
-            return
-        
-        # Wait for background processing of import jobs
-        if not wait_for_worker_processing_of_import_jobs(session):
-            log_error("Failed to process import jobs")
-            return
+        if args.async_upload:
+            # Concurrent streaming uploads, job state followed over SSE
+            if not upload_and_monitor_async(session, args.upload_concurrency):
+                log_error("Failed to upload data files or process import jobs")
+                return
+        else:
+            # Upload data files
+            if not upload_data_files(session):
+                log_error("Failed to upload data files")
+                return
+            
+            # Wait for background processing of import jobs
+            if not wait_for_worker_processing_of_import_jobs(session):
+                log_error("Failed to process import jobs")
+                return
         
         # Wait for worker to finish deriving statistical units and reports
         if not wait_for_worker_derive(session):
@@ -3,9 +3,10 @@
 # This test replicates the functionality in test/sql/50_import_jobs_for_norway_small_history.sql
 # but uses the REST API instead of direct SQL connections.
 #
-# Usage: ./test/import_norway_small_history.sh [create|delete]
+# Usage: ./test/import_norway_small_history.sh [create|delete] [--async-upload [--upload-concurrency N]]
 #   create: Set up and import Norway small history data (default)
 #   delete: Clean up by removing imported data and definitions
+#   --async-upload: Upload the files concurrently and follow job state over SSE
 
 set -euo pipefail
 
@@ -49,18 +50,18 @@ source "$VENV_DIR/bin/activate"
 
 # Install required packages
 echo "Installing required Python packages..."
-pip install requests
+pip install requests httpx
 
 # Verify installation was successful
-if ! python -c "import requests" 2>/dev/null; then
+if ! python -c "import requests, httpx" 2>/dev/null; then
   echo "Failed to install required packages. Please install manually:"
-  echo "pip install requests"
+  echo "pip install requests httpx"
   exit 1
 fi
 
 # Run the Python test script
 echo "Running Norway small history import test (action: $ACTION)..."
-python "$WORKSPACE/test/import_norway_small_history.py" "$ACTION"
+python "$WORKSPACE/test/import_norway_small_history.py" "$@"
 
 # Deactivate virtual environment
 deactivate
@@ -132,8 +132,11 @@ DECLARE
 
     -- Drilldown Functions: Performance — avoid RLS evaluation on large read-only queries
     v_drilldown_funcs TEXT[] := ARRAY[
+        'public.drilldown_cache_invalidate',
         'public.statistical_history_drilldown',
-        'public.statistical_unit_facet_drilldown'
+        'public.statistical_history_drilldown_uncached',
+        'public.statistical_unit_facet_drilldown',
+        'public.statistical_unit_facet_drilldown_uncached'
     ];
 
     -- GraphQL Schema: Access graphql schema sequence (no grants to non-postgres)
@@ -116,7 +116,8 @@ DECLARE
             '{"schema": "public", "name": "timepoints", "class": "derived"}'::jsonb,
             '{"schema": "public", "name": "timesegments", "class": "derived"}'::jsonb,
             '{"schema": "public", "name": "timeline_establishment", "suffix": ", `timeline_legal_unit`, `timeline_enterprise`, `timeline_power_group`", "class": "derived"}'::jsonb,
-            '{"schema": "public", "name": "statistical_unit", "class": "derived"}'::jsonb
+            '{"schema": "public", "name": "statistical_unit", "class": "derived"}'::jsonb,
+            '{"schema": "public", "name": "enterprise_membership", "class": "derived"}'::jsonb
         )),
         (4, 2, 2, 'Derivations for UI listing of relevant time periods', NULL, jsonb_build_array(
             '{"schema": "public", "name": "timesegments_years", "class": "derived"}'::jsonb,
@@ -126,7 +127,9 @@ DECLARE
         )),
         (4, 2, 3, 'Derivations for drilling on facets of statistical_unit (/reports)', NULL, jsonb_build_array(
             '{"schema": "public", "name": "statistical_unit_facet", "class": "derived"}'::jsonb,
-            '{"schema": "public", "name": "statistical_unit_facet_dirty_hash_slots", "class": "derived"}'::jsonb
+            '{"schema": "public", "name": "statistical_unit_facet_dirty_hash_slots", "class": "derived"}'::jsonb,
+            '{"schema": "public", "name": "drilldown_cache", "class": "derived"}'::jsonb,
+            '{"schema": "public", "name": "drilldown_cache_generation", "class": "infrastructure"}'::jsonb
         )),
         (4, 2, 4, 'Derivations to create statistical_history for reporting and statistical_history_facet for drilldown.', NULL, jsonb_build_array(
             '{"schema": "public", "name": "statistical_history", "class": "derived"}'::jsonb,
@@ -149,6 +152,7 @@ DECLARE
         )),
         (6, 1, 1, 'Worker System', 'Handles background processing. A long-running worker process calls `worker.process_tasks()` to process tasks synchronously.', jsonb_build_array(
             '{"schema": "worker", "name": "tasks", "class": "infrastructure"}'::jsonb,
+            '{"schema": "worker", "name": "tasks_archive", "class": "infrastructure"}'::jsonb,
             '{"schema": "worker", "name": "command_registry", "class": "infrastructure"}'::jsonb,
             '{"schema": "worker", "name": "queue_registry", "class": "infrastructure"}'::jsonb,
             '{"schema": "worker", "name": "base_change_log", "class": "infrastructure"}'::jsonb,
@@ -384,7 +388,9 @@ Views have no class (they follow their underlying table).
     )
     -- Exclude postgres extension tables
     AND ae.table_name NOT LIKE 'hypopg_%'
-    AND ae.table_name NOT LIKE 'pg_stat_%';
+    AND ae.table_name NOT LIKE 'pg_stat_%'
+    -- Exclude the daily partitions of worker.tasks_archive
+    AND NOT (ae.table_schema = 'worker' AND ae.table_name ~ '^tasks_archive_p[0-9]{8}$');
 
     IF v_undocumented_str IS NOT NULL THEN
         undocumented := E'## Undocumented Entities\nThe following tables/views were found in the schema but are not yet documented. Please add them to a section or a helper pattern in `test/sql/015_generate_data_model_doc.sql`.\n\n' || v_undocumented_str;
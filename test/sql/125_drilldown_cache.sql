@@ -0,0 +1,74 @@
+\echo "=== Test: drilldown result cache ==="
+\echo "Verifies: hit vs. miss, generation bump on facet / region / settings writes,"
+\echo "          stale generations are never served, read-only transactions do not store."
+
+BEGIN;
+
+\i test/setup.sql
+
+-- Hide NOTICEs from triggers on the reference tables touched below.
+SET client_min_messages = warning;
+
+-- Start from an empty cache and remember the generations; only their increments are shown.
+DELETE FROM public.drilldown_cache;
+CREATE TEMP TABLE drilldown_generation_before AS
+SELECT function_name, generation FROM public.drilldown_cache_generation;
+
+CREATE TEMP VIEW drilldown_generation_bump AS
+SELECT g.function_name, g.generation - b.generation AS bumped_by
+FROM public.drilldown_cache_generation AS g
+JOIN drilldown_generation_before AS b USING (function_name)
+ORDER BY g.function_name;
+
+\echo "--- 1. First call is a miss: the result is computed and stored under the current generation ---"
+SELECT public.statistical_unit_facet_drilldown(valid_on => '2026-05-24') IS NOT NULL AS has_result;
+SELECT c.function_name, c.args, c.generation = g.generation AS current_generation
+FROM public.drilldown_cache AS c
+JOIN public.drilldown_cache_generation AS g USING (function_name)
+ORDER BY c.function_name;
+
+\echo "--- 2. Second call with the same arguments is a hit: it returns the stored result ---"
+UPDATE public.drilldown_cache SET result = '{"served_from": "cache"}';
+SELECT public.statistical_unit_facet_drilldown(valid_on => '2026-05-24') AS result;
+-- Other arguments are another key, so they miss.
+SELECT public.statistical_unit_facet_drilldown(valid_on => '2026-05-23') = public.statistical_unit_facet_drilldown_uncached(valid_on => '2026-05-23') AS computed;
+SELECT count(*) AS cached_rows FROM public.drilldown_cache;
+
+\echo "--- 3. An entry stored under an older generation is not served ---"
+UPDATE public.drilldown_cache
+SET result = '{"served_from": "stale"}', generation = generation - 1
+WHERE args ->> 7 = '2026-05-24';
+SELECT public.statistical_unit_facet_drilldown(valid_on => '2026-05-24') = public.statistical_unit_facet_drilldown_uncached(valid_on => '2026-05-24') AS recomputed;
+
+\echo "--- 4. A write to statistical_unit_facet bumps only the facet drilldown generation and drops its entries ---"
+SELECT public.statistical_history_drilldown() IS NOT NULL AS has_result;
+SELECT function_name, count(*) AS cached_rows FROM public.drilldown_cache GROUP BY function_name ORDER BY function_name;
+-- A statement trigger: it fires even when no row matches.
+DELETE FROM public.statistical_unit_facet WHERE false;
+SELECT * FROM drilldown_generation_bump;
+SELECT function_name, count(*) AS cached_rows FROM public.drilldown_cache GROUP BY function_name ORDER BY function_name;
+
+\echo "--- 5. A write to region bumps both functions and empties the cache ---"
+SELECT public.statistical_unit_facet_drilldown(valid_on => '2026-05-24') IS NOT NULL AS has_result;
+UPDATE public.region SET name = name WHERE false;
+SELECT * FROM drilldown_generation_bump;
+SELECT count(*) AS cached_rows FROM public.drilldown_cache;
+
+\echo "--- 6. A write to settings bumps both functions and empties the cache ---"
+SELECT public.statistical_unit_facet_drilldown(valid_on => '2026-05-24') IS NOT NULL AND public.statistical_history_drilldown() IS NOT NULL AS has_results;
+UPDATE public.settings SET activity_category_standard_id = activity_category_standard_id WHERE false;
+SELECT * FROM drilldown_generation_bump;
+SELECT count(*) AS cached_rows FROM public.drilldown_cache;
+
+\echo "--- 7. In a read-only transaction results are computed but not stored ---"
+SAVEPOINT read_only;
+SET TRANSACTION READ ONLY;
+SELECT public.statistical_unit_facet_drilldown(valid_on => '2026-05-24') = public.statistical_unit_facet_drilldown_uncached(valid_on => '2026-05-24') AS computed;
+SELECT public.statistical_history_drilldown() = public.statistical_history_drilldown_uncached() AS computed;
+SELECT count(*) AS cached_rows FROM public.drilldown_cache;
+ROLLBACK TO SAVEPOINT read_only;
+SHOW transaction_read_only;
+SELECT public.statistical_unit_facet_drilldown(valid_on => '2026-05-24') IS NOT NULL AS has_result;
+SELECT count(*) AS cached_rows FROM public.drilldown_cache;
+
+ROLLBACK;
@@ -0,0 +1,111 @@
+\echo "=== Test: batch task claiming in process_tasks (p_claim_batch) ==="
+\echo "Verifies: claimed siblings run one at a time with their own state, timing and error,"
+\echo "          a failing sibling does not affect the others, p_batch_size caps the claim,"
+\echo "          and claims stranded by an earlier call are handed back before picking."
+
+BEGIN;
+
+\i test/setup.sql
+
+SET client_min_messages = warning;
+
+-- Lock worker.tasks so the background worker neither picks nor archives our tasks.
+LOCK TABLE worker.tasks IN EXCLUSIVE MODE;
+
+-- A queue of its own, so process_tasks only sees the tasks created here.
+INSERT INTO worker.queue_registry (queue, description)
+VALUES ('test_batch_claim', 'Batch claiming test');
+
+-- The handler fails when payload.fail is true; otherwise it records which siblings
+-- this backend has claimed but not started yet (process_start_at still NULL).
+CREATE PROCEDURE test.batch_claim_handler(IN payload jsonb, INOUT p_info jsonb DEFAULT NULL)
+LANGUAGE plpgsql
+AS $batch_claim_handler$
+BEGIN
+    IF (payload->>'fail')::boolean THEN
+        RAISE EXCEPTION 'child % fails on purpose', payload->>'n';
+    END IF;
+    SELECT jsonb_build_object('claimed_ahead', COALESCE(jsonb_agg(t.payload->'n' ORDER BY t.priority), '[]'::jsonb))
+    INTO p_info
+    FROM worker.tasks AS t
+    WHERE t.command = 'test_batch_child'
+      AND t.state = 'processing'
+      AND t.worker_pid = pg_backend_pid()
+      AND t.process_start_at IS NULL;
+END;
+$batch_claim_handler$;
+
+INSERT INTO worker.command_registry (command, handler_procedure, description, queue)
+VALUES ('test_batch_parent', 'test.batch_claim_handler', 'Batch claiming test parent', 'test_batch_claim'),
+       ('test_batch_child', 'test.batch_claim_handler', 'Batch claiming test child', 'test_batch_claim');
+
+\echo "--- 1. A waiting concurrent parent with five children; child 3 fails ---"
+INSERT INTO worker.tasks (command, payload, state)
+VALUES ('test_batch_parent', '{"command": "test_batch_parent"}', 'processing')
+RETURNING id AS parent_id \gset
+SELECT count(worker.spawn(
+    p_command => 'test_batch_child',
+    p_payload => jsonb_build_object('n', n, 'fail', n = 3),
+    p_parent_id => :parent_id,
+    p_priority => n
+)) AS spawned
+FROM generate_series(1, 5) AS n;
+UPDATE worker.tasks SET state = 'waiting', process_start_at = clock_timestamp()
+WHERE id = :parent_id;
+
+\echo "--- 2. Children 4 and 5 look like claims stranded by an earlier call ---"
+-- Child 4 was claimed by this backend in a call that raised past the loop;
+-- child 5 by a backend that is gone (no backend has pid 0).
+UPDATE worker.tasks SET state = 'processing', worker_pid = pg_backend_pid()
+WHERE parent_id = :parent_id AND payload->>'n' = '4';
+UPDATE worker.tasks SET state = 'processing', worker_pid = 0
+WHERE parent_id = :parent_id AND payload->>'n' = '5';
+SELECT payload->>'n' AS n, state, worker_pid = pg_backend_pid() AS this_backend, process_start_at IS NULL AS not_started
+FROM worker.tasks
+WHERE parent_id = :parent_id
+ORDER BY priority;
+
+\echo "--- 3. Run the children with p_claim_batch => 3 ---"
+-- Hide the WARNING for the failing child; its error is checked below.
+SET client_min_messages = error;
+CALL worker.process_tasks(p_queue => 'test_batch_claim', p_mode => 'concurrent', p_claim_batch => 3);
+SET client_min_messages = warning;
+
+-- claimed_ahead: the siblings already claimed when the child ran.
+-- Children 1-3 are one claim, the released children 4-5 the next.
+SELECT payload->>'n' AS n
+     , state
+     , info->'claimed_ahead' AS claimed_ahead
+     , process_start_at IS NOT NULL AND process_stop_at >= process_start_at AND process_duration_ms >= 0 AS timed
+     , worker_pid = pg_backend_pid() AS ran_here
+     , split_part(error, E'\n', 1) AS error
+FROM worker.tasks
+WHERE parent_id = :parent_id
+ORDER BY priority;
+SELECT state, error FROM worker.tasks WHERE id = :parent_id;
+
+\echo "--- 4. p_batch_size caps the claim; unclaimed siblings stay pending ---"
+INSERT INTO worker.tasks (command, payload, state)
+VALUES ('test_batch_parent', '{"command": "test_batch_parent"}', 'processing')
+RETURNING id AS capped_parent_id \gset
+SELECT count(worker.spawn(
+    p_command => 'test_batch_child',
+    p_payload => jsonb_build_object('n', n),
+    p_parent_id => :capped_parent_id,
+    p_priority => n
+)) AS spawned
+FROM generate_series(1, 3) AS n;
+UPDATE worker.tasks SET state = 'waiting', process_start_at = clock_timestamp()
+WHERE id = :capped_parent_id;
+CALL worker.process_tasks(p_queue => 'test_batch_claim', p_mode => 'concurrent', p_batch_size => 2, p_claim_batch => 5);
+SELECT payload->>'n' AS n, state, info->'claimed_ahead' AS claimed_ahead, worker_pid IS NULL AS unclaimed
+FROM worker.tasks
+WHERE parent_id = :capped_parent_id
+ORDER BY priority;
+
+\echo "--- 5. Nothing is left claimed ---"
+SELECT count(*) AS processing
+FROM worker.tasks
+WHERE command = 'test_batch_child' AND state = 'processing';
+
+ROLLBACK;
@@ -0,0 +1,99 @@
+\echo "=== Test: worker.tasks_archive ==="
+\echo "Verifies: archive_completed_task_trees moves only whole completed trees past the grace period,"
+\echo "          public.worker_task shows live and archived tasks, task_cleanup drops old partitions."
+
+BEGIN;
+
+\i test/setup.sql
+
+SET client_min_messages = warning;
+
+-- Lock worker.tasks so the background worker neither picks nor archives our tasks.
+LOCK TABLE worker.tasks IN EXCLUSIVE MODE;
+
+-- Commands of their own; the tasks below are inserted in their final states and never run.
+INSERT INTO worker.queue_registry (queue, description)
+VALUES ('test_archive', 'Task archive test');
+INSERT INTO worker.command_registry (command, handler_procedure, description, queue)
+VALUES ('test_archive_root', 'test.archive_not_run', 'Task archive test root', 'test_archive'),
+       ('test_archive_child', 'test.archive_not_run', 'Task archive test child', 'test_archive');
+
+-- Where each test task is now, by label.
+CREATE TEMP VIEW test_archive_location AS
+SELECT payload->>'label' AS label, state, 'tasks' AS location
+FROM worker.tasks
+WHERE command IN ('test_archive_root', 'test_archive_child')
+UNION ALL
+SELECT payload->>'label', state, 'tasks_archive'
+FROM worker.tasks_archive
+WHERE command IN ('test_archive_root', 'test_archive_child')
+ORDER BY label;
+
+-- Archive partitions at least two days old, by age in days.
+CREATE TEMP VIEW test_archive_old_partition AS
+SELECT (now() AT TIME ZONE 'UTC')::date - to_date(substr(c.relname, 16), 'YYYYMMDD') AS days_old
+FROM pg_inherits AS i
+JOIN pg_class AS c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'worker.tasks_archive'::regclass
+  AND to_date(substr(c.relname, 16), 'YYYYMMDD') <= (now() AT TIME ZONE 'UTC')::date - 2
+ORDER BY days_old DESC;
+
+\echo "--- 1. Four trees: A completed two minutes ago, B still waiting, C completed 30 seconds ago, D failed ---"
+INSERT INTO worker.tasks (command, payload, state, child_mode, completed_at)
+VALUES ('test_archive_root', '{"command": "test_archive_root", "label": "A"}', 'completed', 'concurrent', now() - interval '2 minutes')
+RETURNING id AS root_a \gset
+INSERT INTO worker.tasks (command, payload, state, parent_id, depth, child_mode, completed_at)
+VALUES ('test_archive_child', '{"command": "test_archive_child", "label": "A1"}', 'completed', :root_a, 1, 'serial', now() - interval '3 minutes')
+RETURNING id AS task_a1 \gset
+INSERT INTO worker.tasks (command, payload, state, parent_id, depth, completed_at)
+VALUES ('test_archive_child', '{"command": "test_archive_child", "label": "A1a"}', 'completed', :task_a1, 2, now() - interval '4 minutes');
+INSERT INTO worker.tasks (command, payload, state, child_mode)
+VALUES ('test_archive_root', '{"command": "test_archive_root", "label": "B"}', 'waiting', 'concurrent')
+RETURNING id AS root_b \gset
+INSERT INTO worker.tasks (command, payload, state, parent_id, depth, completed_at)
+VALUES ('test_archive_child', '{"command": "test_archive_child", "label": "B1"}', 'completed', :root_b, 1, now() - interval '5 minutes'),
+       ('test_archive_child', '{"command": "test_archive_child", "label": "B2"}', 'pending', :root_b, 1, NULL);
+INSERT INTO worker.tasks (command, payload, state, child_mode, completed_at)
+VALUES ('test_archive_root', '{"command": "test_archive_root", "label": "C"}', 'completed', 'concurrent', now() - interval '30 seconds')
+RETURNING id AS root_c \gset
+INSERT INTO worker.tasks (command, payload, state, parent_id, depth, completed_at)
+VALUES ('test_archive_child', '{"command": "test_archive_child", "label": "C1"}', 'completed', :root_c, 1, now() - interval '40 seconds');
+INSERT INTO worker.tasks (command, payload, state, error, completed_at)
+VALUES ('test_archive_root', '{"command": "test_archive_root", "label": "D"}', 'failed', 'Failed on purpose', now() - interval '2 minutes');
+
+\echo "--- 2. Only tree A is moved, with all three tasks ---"
+SELECT worker.archive_completed_task_trees() AS moved;
+SELECT * FROM test_archive_location;
+-- Every archived task carries the root's id and completion time, the partition key.
+SELECT payload->>'label' AS label
+     , root_id = :root_a AS root_is_a
+     , root_completed_at = (SELECT completed_at FROM worker.tasks_archive WHERE id = :root_a) AS root_completed_at_is_a
+FROM worker.tasks_archive
+WHERE root_id = :root_a
+ORDER BY depth;
+
+\echo "--- 3. A shorter grace period also moves tree C ---"
+SELECT worker.archive_completed_task_trees(p_min_age => '10 seconds') AS moved;
+SELECT * FROM test_archive_location;
+
+\echo "--- 4. public.worker_task shows live and archived tasks alike ---"
+SELECT payload->>'label' AS label, state, queue
+FROM public.worker_task
+WHERE command IN ('test_archive_root', 'test_archive_child')
+ORDER BY label;
+SELECT (SELECT count(*) FROM public.worker_task)
+     = (SELECT count(*) FROM worker.tasks) + (SELECT count(*) FROM worker.tasks_archive) AS union_complete;
+
+\echo "--- 5. task_cleanup drops archive partitions past the completed retention ---"
+INSERT INTO worker.tasks (command, payload, state, completed_at)
+VALUES ('test_archive_root', '{"command": "test_archive_root", "label": "E"}', 'completed', now() - interval '10 days'),
+       ('test_archive_root', '{"command": "test_archive_root", "label": "F"}', 'completed', now() - interval '3 days');
+SELECT worker.archive_completed_task_trees() AS moved;
+SELECT * FROM test_archive_old_partition;
+CALL worker.command_task_cleanup('{"command": "task_cleanup", "completed_retention_days": 7}', NULL);
+SELECT * FROM test_archive_old_partition;
+SELECT label, location
+FROM test_archive_location
+WHERE label IN ('E', 'F');
+
+ROLLBACK;
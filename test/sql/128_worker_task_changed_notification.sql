@@ -0,0 +1,92 @@
+\echo "=== Test: worker_task_changed notification payload ==="
+\echo "Verifies: one notification per statement and parent_id, only for state changes,"
+\echo "          with count, states per new state and at most 100 ids."
+
+BEGIN;
+
+\i test/setup.sql
+
+SET client_min_messages = warning;
+
+-- Lock worker.tasks to prevent background worker interference and ensure deterministic IDs
+LOCK TABLE worker.tasks IN EXCLUSIVE MODE;
+
+-- Notifications are only delivered on commit, so capture them instead: point the
+-- trigger function's search_path at a test.pg_notify that records each call.
+-- pg_catalog must be listed explicitly to be searched after schema test.
+CREATE TEMP TABLE captured_notification (channel text, payload jsonb);
+CREATE FUNCTION test.pg_notify(channel text, payload text)
+RETURNS void
+LANGUAGE sql
+AS $pg_notify$
+    INSERT INTO pg_temp.captured_notification (channel, payload) VALUES (channel, payload::jsonb);
+$pg_notify$;
+ALTER FUNCTION worker.notify_task_changed() SET search_path TO test, pg_catalog, worker, pg_temp;
+
+CREATE TEMP VIEW notification AS
+SELECT payload->'parent_id' AS parent_id
+     , payload->'count' AS count
+     , payload->'states' AS states
+     , payload->'ids' AS ids
+     , payload->'truncated' AS truncated
+FROM captured_notification
+WHERE channel = 'worker_task_changed'
+ORDER BY (payload->>'parent_id')::bigint NULLS FIRST;
+
+INSERT INTO worker.queue_registry (queue, description)
+VALUES ('test_notify', 'Task notification test');
+INSERT INTO worker.command_registry (command, handler_procedure, description, queue)
+VALUES ('test_notify_task', 'test.notify_not_run', 'Task notification test', 'test_notify');
+
+\echo "--- 1. Parent 3 with children 4-6, and a top-level task 7 ---"
+INSERT INTO worker.tasks (command, payload, state, child_mode)
+VALUES ('test_notify_task', '{"command": "test_notify_task"}', 'waiting', 'concurrent')
+RETURNING id AS parent_id \gset
+INSERT INTO worker.tasks (command, payload, parent_id, depth)
+SELECT 'test_notify_task', '{"command": "test_notify_task"}', :parent_id, 1
+FROM generate_series(1, 3);
+INSERT INTO worker.tasks (command, payload)
+VALUES ('test_notify_task', '{"command": "test_notify_task"}');
+SELECT id, parent_id, state
+FROM worker.tasks
+WHERE command = 'test_notify_task'
+ORDER BY id;
+
+\echo "--- 2. One UPDATE of four tasks sends one notification per parent_id ---"
+UPDATE worker.tasks
+SET state = CASE WHEN id = 6 THEN 'interrupted'::worker.task_state ELSE 'processing'::worker.task_state END
+WHERE command = 'test_notify_task' AND state = 'pending';
+SELECT * FROM notification;
+
+\echo "--- 3. An UPDATE that changes no state sends nothing ---"
+DELETE FROM captured_notification;
+UPDATE worker.tasks SET priority = priority
+WHERE command = 'test_notify_task';
+SELECT count(*) AS notifications FROM captured_notification;
+
+\echo "--- 4. Only rows whose state changed are counted ---"
+-- Children 4 and 5 are already processing; only child 6 changes.
+UPDATE worker.tasks SET state = 'processing'
+WHERE parent_id = :parent_id;
+SELECT * FROM notification;
+
+\echo "--- 5. The id list stops at 100 and is marked truncated; count covers every changed task ---"
+DELETE FROM captured_notification;
+INSERT INTO worker.tasks (command, payload, state, child_mode)
+VALUES ('test_notify_task', '{"command": "test_notify_task"}', 'waiting', 'concurrent')
+RETURNING id AS big_parent_id \gset
+INSERT INTO worker.tasks (command, payload, parent_id, depth)
+SELECT 'test_notify_task', '{"command": "test_notify_task"}', :big_parent_id, 1
+FROM generate_series(1, 150);
+UPDATE worker.tasks SET state = 'processing'
+WHERE parent_id = :big_parent_id;
+SELECT parent_id
+     , count
+     , truncated
+     , states
+     , jsonb_array_length(ids) AS id_count
+     , ids->0 AS first_id
+     , ids->(-1) AS last_id
+FROM notification;
+
+ROLLBACK;
@@ -0,0 +1,145 @@
+\echo "=== Test: enterprise_membership across a valid-time move ==="
+\echo "Verifies: relevant_statistical_units and statistical_unit_stats find the same units"
+\echo "          as the related_*_ids arrays did, and a legal unit that changes enterprise"
+\echo "          closes its old membership, and an enterprise without members still returns itself."
+
+BEGIN;
+
+\i test/setup.sql
+
+-- A Super User configures statbus.
+CALL test.set_user_from_email('test.admin@statbus.org');
+
+-- Suppress the verbatim echo of the shared include. Its content is not what
+-- this test asserts, and echoing it would couple the expected file to a file
+-- that churns (any edit to it would break this test's expected output). Only
+-- this test's own queries below contribute to the expected output.
+-- (STATBUS-175: the standard pattern for tests that \i shared files.)
+\o /dev/null
+\set ECHO none
+\i samples/norway/getting-started.sql
+\o
+\set ECHO all
+
+-- The array-based lookup that relevant_statistical_units and statistical_unit_stats
+-- used before enterprise_membership: the root enterprise's related_*_ids arrays.
+CREATE FUNCTION test.array_relevant_unit_ids(p_unit_type public.statistical_unit_type, p_unit_id integer, p_valid_on date)
+RETURNS TABLE (unit_type public.statistical_unit_type, unit_id integer)
+LANGUAGE sql
+STABLE
+AS $array_relevant_unit_ids$
+    WITH root_unit AS (
+        SELECT su.unit_id,
+               su.related_legal_unit_ids,
+               su.related_establishment_ids
+        FROM public.statistical_unit AS su
+        WHERE su.unit_type = 'enterprise'
+          AND su.unit_id = public.statistical_unit_enterprise_id(p_unit_type, p_unit_id, p_valid_on)
+          AND su.valid_from <= p_valid_on AND p_valid_on < su.valid_until
+    ), relevant_ids AS (
+        SELECT 'enterprise'::public.statistical_unit_type AS unit_type, ru.unit_id FROM root_unit AS ru
+        UNION ALL
+        SELECT 'legal_unit'::public.statistical_unit_type, unnest(ru.related_legal_unit_ids) FROM root_unit AS ru
+        UNION ALL
+        SELECT 'establishment'::public.statistical_unit_type, unnest(ru.related_establishment_ids) FROM root_unit AS ru
+    )
+    SELECT su.unit_type, su.unit_id
+    FROM relevant_ids AS ri
+    JOIN public.statistical_unit AS su
+      ON su.unit_type = ri.unit_type
+     AND su.unit_id = ri.unit_id
+     AND su.valid_from <= p_valid_on AND p_valid_on < su.valid_until;
+$array_relevant_unit_ids$;
+
+\echo "--- 1. EM-A has EM Alpha and EM Mover (with its EM Mover Depot), EM-B has EM Beta ---"
+INSERT INTO public.enterprise (short_name, edit_by_user_id, edit_comment)
+SELECT t.short_name, (SELECT id FROM auth.user LIMIT 1), 'Test 129 enterprise'
+FROM (VALUES ('EM-A'), ('EM-B')) AS t(short_name);
+SELECT id AS enterprise_a_id FROM public.enterprise WHERE short_name = 'EM-A' \gset
+SELECT id AS enterprise_b_id FROM public.enterprise WHERE short_name = 'EM-B' \gset
+
+INSERT INTO public.legal_unit (valid_from, name, enterprise_id, primary_for_enterprise, status_id, edit_by_user_id, edit_comment)
+SELECT '2020-01-01'::date, t.name, t.enterprise_id, t.primary_for_enterprise,
+       (SELECT id FROM public.status WHERE code = 'active' LIMIT 1),
+       (SELECT id FROM auth.user LIMIT 1),
+       'Test 129 legal unit'
+FROM (VALUES ('EM Alpha', :enterprise_a_id, true),
+             ('EM Mover', :enterprise_a_id, false),
+             ('EM Beta', :enterprise_b_id, true)) AS t(name, enterprise_id, primary_for_enterprise);
+SELECT id AS mover_id FROM public.legal_unit WHERE name = 'EM Mover' \gset
+
+INSERT INTO public.establishment (valid_from, name, legal_unit_id, primary_for_legal_unit, status_id, edit_by_user_id, edit_comment)
+SELECT '2020-01-01'::date, 'EM Mover Depot', :mover_id, true,
+       (SELECT id FROM public.status WHERE code = 'active' LIMIT 1),
+       (SELECT id FROM auth.user LIMIT 1),
+       'Test 129 establishment';
+
+CREATE TEMP TABLE unit_label (unit_type public.statistical_unit_type, unit_id integer, label text);
+INSERT INTO unit_label (unit_type, unit_id, label)
+SELECT 'enterprise', en.id, en.short_name FROM public.enterprise AS en WHERE en.short_name LIKE 'EM-%'
+UNION
+SELECT 'legal_unit', lu.id, lu.name FROM public.legal_unit AS lu WHERE lu.name LIKE 'EM %'
+UNION
+SELECT 'establishment', es.id, es.name FROM public.establishment AS es WHERE es.name LIKE 'EM %';
+
+CREATE TEMP VIEW membership AS
+SELECT en.short_name AS enterprise, ul.unit_type, ul.label AS unit, em.valid_range
+FROM public.enterprise_membership AS em
+JOIN public.enterprise AS en ON en.id = em.enterprise_id
+JOIN unit_label AS ul ON ul.unit_type = em.unit_type AND ul.unit_id = em.unit_id
+ORDER BY en.short_name, ul.unit_type, ul.label, em.valid_range;
+
+-- For every unit and date: the members found through enterprise_membership, and
+-- whether both functions return exactly the units the arrays lead to.
+CREATE TEMP VIEW membership_comparison AS
+SELECT ul.unit_type
+     , ul.label AS unit
+     , d.valid_on
+     , (SELECT string_agg(m.label, ', ' ORDER BY m.unit_type, m.label)
+        FROM public.relevant_statistical_units(ul.unit_type, ul.unit_id, d.valid_on) AS su
+        JOIN unit_label AS m ON m.unit_type = su.unit_type AND m.unit_id = su.unit_id) AS members
+     , ARRAY(SELECT format('%s:%s', su.unit_type, su.unit_id)
+             FROM public.relevant_statistical_units(ul.unit_type, ul.unit_id, d.valid_on) AS su ORDER BY 1)
+       = ARRAY(SELECT format('%s:%s', a.unit_type, a.unit_id)
+               FROM test.array_relevant_unit_ids(ul.unit_type, ul.unit_id, d.valid_on) AS a ORDER BY 1) AS same_units
+     , ARRAY(SELECT format('%s:%s', s.unit_type, s.unit_id)
+             FROM public.statistical_unit_stats(ul.unit_type, ul.unit_id, d.valid_on) AS s ORDER BY 1)
+       = ARRAY(SELECT format('%s:%s', a.unit_type, a.unit_id)
+               FROM test.array_relevant_unit_ids(ul.unit_type, ul.unit_id, d.valid_on) AS a ORDER BY 1) AS same_stats
+FROM unit_label AS ul
+CROSS JOIN (VALUES ('2023-06-01'::date), ('2024-06-01'::date)) AS d(valid_on)
+ORDER BY d.valid_on, ul.unit_type, ul.label;
+
+\echo "Run worker processing for analytics tasks"
+CALL worker.process_tasks(p_queue => 'analytics');
+
+\echo "--- 2. Every unit is a member of its enterprise for all of its valid time ---"
+SELECT * FROM membership;
+
+\echo "--- 3. EM Mover moves from EM-A to EM-B on 2024-01-01 ---"
+SELECT result->'old_enterprise_id' = to_jsonb(:enterprise_a_id) AS left_em_a
+     , result->'new_enterprise_id' = to_jsonb(:enterprise_b_id) AS joined_em_b
+     , result->'deleted_enterprise_id' AS deleted_enterprise_id
+FROM public.connect_legal_unit_to_enterprise(:mover_id, :enterprise_b_id, '2024-01-01'::date, 'infinity'::date) AS result;
+
+\echo "Run worker processing for analytics tasks"
+CALL worker.process_tasks(p_queue => 'analytics');
+
+\echo "--- 4. The EM-A memberships of EM Mover and its establishment end on 2024-01-01 ---"
+SELECT * FROM membership;
+
+\echo "--- 5. Before and after the move, the closure finds the same units as the arrays ---"
+SELECT * FROM membership_comparison;
+
+\echo "--- 6. An enterprise without members on the date still returns its own row ---"
+DELETE FROM public.enterprise_membership WHERE enterprise_id = :enterprise_a_id;
+SELECT 'relevant_statistical_units' AS function, ul.label AS unit
+FROM public.relevant_statistical_units('enterprise', :enterprise_a_id, '2024-06-01') AS su
+JOIN unit_label AS ul ON ul.unit_type = su.unit_type AND ul.unit_id = su.unit_id
+UNION ALL
+SELECT 'statistical_unit_stats', ul.label
+FROM public.statistical_unit_stats('enterprise', :enterprise_a_id, '2024-06-01') AS s
+JOIN unit_label AS ul ON ul.unit_type = s.unit_type AND ul.unit_id = s.unit_id
+ORDER BY 1, 2;
+
+ROLLBACK;
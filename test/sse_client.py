@@ -0,0 +1,163 @@
+"""
+Server-Sent Events client for the app's /api/sse/* endpoints.
+
+    client = SSEClient(API_BASE_URL, IMPORT_JOBS, cookies=dict(session.cookies),
+                       params={"ids": "1,2", "scope": "updates_for_ids_only"})
+    async for event in client:
+        if event.event == OPEN: ...           # after every (re)connect
+        elif event.event == "message": event.json()
+
+Events are parsed per the text/event-stream format (multi-line data, event,
+id and retry fields, comments). When the stream ends or the connection drops
+the client reconnects after the server's retry delay (doubling on repeated
+failures), sending Last-Event-ID when the server has assigned ids. Our
+endpoints do not assign ids or replay missed events, so the synthetic OPEN
+event is yielded after every reconnect to let the caller re-read current
+state over REST.
+
+The stream is only read as fast as the caller consumes events, so real events
+are never dropped. Raw lines and comments (heartbeats on worker-tasks) go to
+a bounded debug buffer instead that keeps the newest `debug_buffer` lines.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+
+import httpx
+
+IMPORT_JOBS = "/api/sse/import-jobs"
+WORKER_TASKS = "/api/sse/worker-tasks"
+WORKER_STATUS = "/api/sse/worker_status"
+
+OPEN = "open"  # Synthetic event yielded after each successful (re)connect
+DEFAULT_RETRY_MS = 3000
+MAX_RETRY_MS = 30000
+
+
+class SSEError(Exception):
+    """The endpoint refused the connection, or reconnecting gave up."""
+
+    def __init__(self, message, status=None, body=None):
+        super().__init__(message)
+        self.status = status
+        self.body = body
+
+
+class Event:
+    __slots__ = ("event", "data", "id")
+
+    def __init__(self, event, data, id=""):
+        self.event = event
+        self.data = data
+        self.id = id
+
+    def json(self):
+        return json.loads(self.data)
+
+    def __repr__(self):
+        return f"Event({self.event!r}, {self.data!r}, id={self.id!r})"
+
+
+class SSEParser:
+    """Incremental text/event-stream parser: feed() lines, get an Event at each blank line that ends one."""
+
+    def __init__(self):
+        self.last_event_id = ""
+        self.retry_ms = None
+        self.reset()
+
+    def reset(self):
+        """Discard a partially received event (e.g. after a disconnect)."""
+        self._event = ""
+        self._data = []
+
+    def feed(self, line):
+        if line == "":
+            if not self._data:
+                self._event = ""
+                return None
+            event = Event(self._event or "message", "\n".join(self._data), self.last_event_id)
+            self.reset()
+            return event
+        if line.startswith(":"):
+            return None
+        field, colon, value = line.partition(":")
+        if colon and value.startswith(" "):
+            value = value[1:]
+        if field == "event":
+            self._event = value
+        elif field == "data":
+            self._data.append(value)
+        elif field == "id" and "\0" not in value:
+            self.last_event_id = value
+        elif field == "retry" and value.isdigit():
+            self.retry_ms = int(value)
+        return None
+
+
+class SSEClient:
+    """Async iterator over the events of one SSE endpoint, reconnecting until the caller stops iterating."""
+
+    def __init__(self, base_url, path, cookies=None, params=None, max_reconnects=10, debug_buffer=200,
+                 connect_timeout=10.0):
+        self.base_url = base_url
+        self.path = path
+        self.cookies = cookies or {}
+        self.params = params or {}
+        self.max_reconnects = max_reconnects
+        self.connect_timeout = connect_timeout
+        self.parser = SSEParser()
+        self.debug = deque(maxlen=debug_buffer)
+        self.debug_dropped = 0
+        self.connects = 0
+        self.last_activity = time.monotonic()  # Any received line, comments included
+
+    def _debug(self, line):
+        if len(self.debug) == self.debug.maxlen:
+            self.debug_dropped += 1
+        self.debug.append(line)
+
+    def drain_debug(self):
+        """Return and clear the buffered debug lines (oldest first)."""
+        lines = list(self.debug)
+        self.debug.clear()
+        return lines
+
+    def _retry_delay(self, failures):
+        base = self.parser.retry_ms if self.parser.retry_ms is not None else DEFAULT_RETRY_MS
+        return min(MAX_RETRY_MS, base * 2 ** max(0, failures - 1)) / 1000
+
+    async def __aiter__(self):
+        failures = 0
+        timeout = httpx.Timeout(self.connect_timeout, read=None)
+        async with httpx.AsyncClient(base_url=self.base_url, cookies=self.cookies, timeout=timeout) as client:
+            while True:
+                headers = {"Accept": "text/event-stream", "Cache-Control": "no-cache"}
+                if self.parser.last_event_id:
+                    headers["Last-Event-ID"] = self.parser.last_event_id
+                try:
+                    async with client.stream("GET", self.path, params=self.params, headers=headers) as response:
+                        if response.status_code != 200:
+                            body = (await response.aread()).decode("utf-8", errors="replace")
+                            raise SSEError(f"{self.path} returned HTTP {response.status_code}",
+                                           response.status_code, body)
+                        self.connects += 1
+                        failures = 0
+                        self.last_activity = time.monotonic()
+                        yield Event(OPEN, "", self.parser.last_event_id)
+                        async for line in response.aiter_lines():
+                            self.last_activity = time.monotonic()
+                            self._debug(line)
+                            event = self.parser.feed(line)
+                            if event is not None:
+                                yield event
+                    self._debug("(stream closed by server)")
+                except httpx.TransportError as e:
+                    self._debug(f"(connection lost: {e!r})")
+                self.parser.reset()
+                failures += 1
+                if self.max_reconnects is not None and failures > self.max_reconnects:
+                    raise SSEError(f"{self.path}: giving up after {failures} failed connection attempts")
+                await asyncio.sleep(self._retry_delay(failures))
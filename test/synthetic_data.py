@@ -0,0 +1,291 @@
+"""
+Deterministic synthetic BRREG-shaped data for derive-pipeline benchmarks.
+
+The bundled datasets stop at the ~29K-row selection, far below production
+(~1M legal units with ten years of history). generate() builds a synthetic
+register at any scale from a seed:
+
+  - legal_units hovedenheter alive in the first year, each with one or more
+    underenheter;
+  - `years` yearly snapshots; every year a `churn` fraction of units is born,
+    dies (disappears from the snapshot; its underenheter are closed with
+    nedleggelsesdato) or changes (employees, activity, name);
+  - power groups: a `group_share` fraction of the units alive in the last
+    year is arranged in HFOR ownership trees up to `group_depth` levels deep,
+    plus a few DTPR partnerships.
+
+Code values (legal form / activity / sector combinations and postal
+addresses) are drawn from the bundled selection so they validate against the
+same classifications as the real data. Rows come out in the upload format of
+the brreg_*_2025 import definitions and are streamed into upload tables with
+COPY (copy_rows()) without intermediate files.
+
+Same seed and parameters -> identical data.
+"""
+
+import csv
+import io
+import math
+import random
+from pathlib import Path
+
+WORKSPACE = Path(__file__).parent.parent.absolute()
+PROFILE_CSV = WORKSPACE / "samples" / "norway" / "legal_unit" / "enheter-selection.csv"
+
+LU_COLUMNS = [
+    "organisasjonsnummer", "navn", "organisasjonsform.kode", "naeringskode1.kode", "antallAnsatte",
+    "forretningsadresse.adresse", "forretningsadresse.poststed", "forretningsadresse.postnummer",
+    "forretningsadresse.kommunenummer", "forretningsadresse.landkode",
+    "institusjonellSektorkode.kode", "stiftelsesdato",
+]
+ES_COLUMNS = [
+    "organisasjonsnummer", "navn", "naeringskode1.kode", "antallAnsatte",
+    "beliggenhetsadresse.adresse", "beliggenhetsadresse.poststed", "beliggenhetsadresse.postnummer",
+    "beliggenhetsadresse.kommunenummer", "beliggenhetsadresse.landkode",
+    "oppstartsdato", "overordnetEnhet", "nedleggelsesdato",
+]
+ROLLER_COLUMNS = ["influencing_tax_ident", "influenced_tax_ident", "rel_type_code", "percentage"]
+
+ORGNR_WEIGHTS = (3, 2, 7, 6, 5, 4, 3, 2)
+STREETS = ("Storgata", "Kirkeveien", "Industriveien", "Skolegata", "Fjordveien", "Parkveien", "Havnegata")
+WORDS = ("NORD", "FJELL", "KYST", "BYGG", "DATA", "HANDEL", "TRANSPORT", "SERVICE", "INVEST", "MARIN")
+
+
+def orgnr_with_check_digit(base):
+    """8-digit base -> 9-digit org number with a valid mod 11 check digit, or None if base has none."""
+    digits = f"{base:08d}"
+    remainder = sum(int(d) * w for d, w in zip(digits, ORGNR_WEIGHTS)) % 11
+    check = 0 if remainder == 0 else 11 - remainder
+    return None if check == 10 else f"{digits}{check}"
+
+
+def orgnr_sequence(start=81000000):
+    base = start
+    while True:
+        orgnr = orgnr_with_check_digit(base)
+        if orgnr is not None:
+            yield orgnr
+        base += 1
+
+
+def load_value_pools(path=PROFILE_CSV):
+    """(profiles, addresses) seen in the selection: (form, activity, sector) and (postnummer, poststed, kommunenummer)."""
+    profiles, addresses = set(), set()
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row["naeringskode1.kode"]:
+                profiles.add((row["organisasjonsform.kode"], row["naeringskode1.kode"],
+                              row["institusjonellSektorkode.kode"]))
+            if row["forretningsadresse.kommunenummer"] and row["forretningsadresse.postnummer"]:
+                addresses.add((row["forretningsadresse.postnummer"], row["forretningsadresse.poststed"],
+                               row["forretningsadresse.kommunenummer"]))
+    return sorted(profiles), sorted(addresses)
+
+
+def _geometric_year(rng, after, rate):
+    """First year after `after` in which an event with yearly probability rate happens."""
+    if rate <= 0:
+        return None
+    if rate >= 1:
+        return after + 1
+    return after + 1 + int(math.log(1.0 - rng.random()) / math.log(1.0 - rate))
+
+
+def _mix(*values):
+    """Cheap deterministic hash of small ints to a float in [0, 1) (splitmix64 finalizer)."""
+    x = 0
+    for v in values:
+        x = (x ^ v) * 0x9E3779B97F4A7C15 & 0xFFFFFFFFFFFFFFFF
+        x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & 0xFFFFFFFFFFFFFFFF
+        x = (x ^ (x >> 27)) * 0x94D049BB133111EB & 0xFFFFFFFFFFFFFFFF
+        x ^= x >> 31
+    return x / 2.0 ** 64
+
+
+class Unit:
+    __slots__ = ("orgnr", "birth_year", "death_year", "change_years", "seed", "parent")
+
+    def __init__(self, orgnr, birth_year, death_year, change_years, seed, parent=None):
+        self.orgnr = orgnr
+        self.birth_year = birth_year
+        self.death_year = death_year
+        self.change_years = change_years
+        self.seed = seed
+        self.parent = parent
+
+    def version(self, year):
+        return sum(1 for y in self.change_years if y <= year)
+
+
+class SyntheticRegister:
+    """Synthetic hovedenheter/underenheter with yearly history and power groups."""
+
+    def __init__(self, legal_units=10000, years=3, last_year=2025, churn=0.05, establishments_per_unit=1.3,
+                 group_share=0.1, group_depth=3, seed=42):
+        self.years = list(range(last_year - years + 1, last_year + 1))
+        self.first_year = self.years[0]
+        self.group_share = group_share
+        self.group_depth = group_depth
+        self.seed = seed
+        self.profiles, self.addresses = load_value_pools()
+        # Activity changes keep the unit's legal form and sector
+        self.similar_profiles = {}
+        for profile in self.profiles:
+            self.similar_profiles.setdefault((profile[0], profile[2]), []).append(profile)
+
+        rng = random.Random(seed)
+        orgnrs = orgnr_sequence()
+        self.legal_units = []
+        self.establishments = []
+        extra_probability = (establishments_per_unit - 1) / establishments_per_unit
+        for year in self.years:
+            births = legal_units if year == self.first_year else round(legal_units * churn)
+            for _ in range(births):
+                lu = self._unit(rng, next(orgnrs), year, churn)
+                self.legal_units.append(lu)
+                count = 1
+                while rng.random() < extra_probability and count < 50:
+                    count += 1
+                for _ in range(count):
+                    es = self._unit(rng, next(orgnrs), year, churn, parent=lu)
+                    if lu.death_year is not None and (es.death_year is None or es.death_year > lu.death_year):
+                        es.death_year = lu.death_year
+                    self.establishments.append(es)
+
+    def _unit(self, rng, orgnr, birth_year, churn, parent=None):
+        end = self.years[-1]
+        death_year = _geometric_year(rng, birth_year, churn)
+        if death_year is not None and death_year > end:
+            death_year = None
+        change_years = []
+        year = _geometric_year(rng, birth_year, churn)
+        while year is not None and year <= end and (death_year is None or year < death_year):
+            change_years.append(year)
+            year = _geometric_year(rng, year, churn)
+        return Unit(orgnr, birth_year, death_year, tuple(change_years), rng.getrandbits(32), parent)
+
+    def _attributes(self, unit, year):
+        """(profile, address, employees, name suffix) for unit as of year; stable between changes."""
+        version = unit.version(year)
+        profile = self.profiles[int(_mix(unit.seed, 1) * len(self.profiles))]
+        if version:
+            candidates = self.similar_profiles[(profile[0], profile[2])]
+            profile = candidates[int(_mix(unit.seed, 2, version) * len(candidates))]
+        address = self.addresses[int(_mix(unit.seed, 3) * len(self.addresses))]
+        u = _mix(unit.seed, 4, version)
+        if profile[0] == "ENK" and u < 0.8:
+            employees = ""
+        else:
+            # Pareto-distributed head count: most units are tiny, a few are large
+            employees = str(min(int((1.0 - _mix(unit.seed, 5, version)) ** (-1 / 1.2)) - 1, 50000))
+        return profile, address, employees, f" {version}" if version else ""
+
+    def _birth_date(self, unit):
+        if unit.birth_year == self.first_year:
+            year = 1950 + int(_mix(unit.seed, 6) * (self.first_year - 1950))
+            month = 1 + int(_mix(unit.seed, 7) * 12)
+        else:
+            # Registered in the second half of the year before its first snapshot
+            year = unit.birth_year - 1
+            month = 7 + int(_mix(unit.seed, 7) * 6)
+        return f"{year}-{month:02d}-{1 + int(_mix(unit.seed, 8) * 28):02d}"
+
+    def legal_unit_rows(self, year):
+        """LU_COLUMNS rows of the hovedenheter snapshot for year."""
+        for lu in self.legal_units:
+            if lu.birth_year > year or (lu.death_year is not None and lu.death_year <= year):
+                continue
+            (form, activity, sector), (postcode, postplace, region), employees, suffix = self._attributes(lu, year)
+            yield (
+                lu.orgnr, f"SYNTETISK {WORDS[lu.seed % len(WORDS)]} {lu.orgnr}{suffix} {form}", form, activity,
+                employees, f"{STREETS[lu.seed % len(STREETS)]} {lu.seed % 200 + 1}", postplace, postcode,
+                region, "NO", sector, self._birth_date(lu),
+            )
+
+    def establishment_rows(self, year):
+        """ES_COLUMNS rows of the underenheter snapshot for year; units closing this year carry nedleggelsesdato."""
+        for es in self.establishments:
+            if es.birth_year > year or (es.death_year is not None and es.death_year < year):
+                continue
+            (_, activity, _), (postcode, postplace, region), employees, suffix = self._attributes(es, year)
+            closed = ""
+            if es.death_year == year:
+                closed = f"{year}-{es.seed % 12 + 1:02d}-{es.seed % 28 + 1:02d}"
+            yield (
+                es.orgnr, f"SYNTETISK AVD {es.orgnr}{suffix}", activity, employees,
+                f"{STREETS[es.seed % len(STREETS)]} {es.seed % 200 + 1}", postplace, postcode, region, "NO",
+                self._birth_date(es), es.parent.orgnr, closed,
+            )
+
+    def relationship_rows(self):
+        """ROLLER_COLUMNS rows: HFOR power-group trees and DTPR partnerships among units alive in the last year."""
+        last = self.years[-1]
+        alive = [lu for lu in self.legal_units if lu.death_year is None or lu.death_year > last]
+        rng = random.Random(self.seed + 1)
+        members = rng.sample(alive, int(len(alive) * self.group_share))
+        i = 0
+        while i < len(members):
+            # One power group: breadth-first levels under a root, each member owned by one parent
+            level = [members[i]]
+            i += 1
+            for _ in range(self.group_depth - 1):
+                next_level = []
+                for parent in level:
+                    for _ in range(rng.randint(1, 4)):
+                        if i >= len(members):
+                            break
+                        yield (parent.orgnr, members[i].orgnr, "HFOR", "")
+                        next_level.append(members[i])
+                        i += 1
+                level = next_level
+                if not level:
+                    break
+
+        for influenced in rng.sample(alive, min(len(alive) // 100, len(alive))):
+            partners = rng.sample(alive, 2)
+            for partner in partners:
+                if partner is not influenced:
+                    yield (partner.orgnr, influenced.orgnr, "DTPR", "50")
+
+
+def generate(**spec):
+    return SyntheticRegister(**spec)
+
+
+class _RowReader:
+    """File-like object for copy_expert(); read() renders CSV lines from a row iterator on demand."""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.count = 0
+        self.pending = ""
+        self._buf = io.StringIO()
+        self._writer = csv.writer(self._buf, lineterminator="\n")
+
+    def read(self, size=-1):
+        while size < 0 or len(self.pending) < size:
+            batch = 0
+            for row in self.rows:
+                self._writer.writerow(row)
+                batch += 1
+                if batch == 1000:
+                    break
+            if batch == 0:
+                break
+            self.count += batch
+            self.pending += self._buf.getvalue()
+            self._buf.seek(0)
+            self._buf.truncate()
+        if size < 0:
+            data, self.pending = self.pending, ""
+        else:
+            data, self.pending = self.pending[:size], self.pending[size:]
+        return data
+
+
+def copy_rows(cur, table, columns, rows):
+    """COPY rows into public.<table> (columns) in one statement. Returns the row count."""
+    column_list = ", ".join(f'"{c}"' for c in columns)
+    reader = _RowReader(rows)
+    cur.copy_expert(f'COPY public."{table}" ({column_list}) FROM STDIN WITH (FORMAT csv)', reader)
+    return reader.count
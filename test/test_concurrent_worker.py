@@ -16,6 +16,8 @@ import time
 import signal
 import subprocess
 import argparse
+import hashlib
+import json
 import atexit
 import logging
 import threading
@@ -23,6 +25,13 @@ from pathlib import Path
 
 import psycopg2
 
+import db_pool
+import synthetic_data
+import worker_bench
+import worker_contention
+import worker_statements
+import worker_task_tree
+
 # ============================================================================
 # Configuration
 # ============================================================================
@@ -157,15 +166,26 @@ def run_psql_file(filepath, dbname=None):
 # Database Setup/Teardown
 # ============================================================================
 
-def create_isolated_db():
-    """Create isolated test database from template"""
+def create_isolated_db(use_pool=False):
+    """Create isolated test database from template (or claim a pre-cloned one from the pool)"""
     global TEST_DB
     TEST_DB = f"test_concurrent_{os.getpid()}"
 
-    log_print(f"{BLUE}Creating isolated database: {TEST_DB}{NC}")
-
     conn = get_conn(dbname="postgres")
     conn.autocommit = True
+
+    if use_pool:
+        start = time.time()
+        with conn.cursor() as cur:
+            claimed = db_pool.claim(cur, TEMPLATE_DB, TEST_DB)
+        if claimed:
+            conn.close()
+            log_print(f"{GREEN}Database claimed from pool: {TEST_DB} ({(time.time() - start) * 1000:.0f}ms){NC}")
+            return TEST_DB
+        log_print(f"{YELLOW}Database pool is empty; cloning on demand{NC}")
+
+    log_print(f"{BLUE}Creating isolated database: {TEST_DB}{NC}")
+
     with conn.cursor() as cur:
         cur.execute("SELECT pg_advisory_lock(59328)")
         cur.execute(f"ALTER DATABASE {TEMPLATE_DB} WITH ALLOW_CONNECTIONS = true")
@@ -178,8 +198,8 @@ def create_isolated_db():
     return TEST_DB
 
 
-def drop_isolated_db(force=False):
-    """Drop the isolated test database"""
+def drop_isolated_db(force=False, background=False):
+    """Drop the isolated test database (in a detached process if background)"""
     if not TEST_DB:
         return
 
@@ -190,6 +210,11 @@ def drop_isolated_db(force=False):
         log_print(f"  Delete:  {MANAGE} psql -d postgres -c \"DROP DATABASE \\\"{TEST_DB}\\\"\"")
         return
 
+    if background:
+        log_print(f"{YELLOW}Dropping database in background: {TEST_DB} (log: {db_pool.POOL_LOG}){NC}")
+        db_pool.spawn(["drop", TEST_DB], env=pg_env())
+        return
+
     log_print(f"{YELLOW}Dropping database: {TEST_DB}{NC}")
     try:
         conn = get_conn(dbname="postgres")
@@ -264,12 +289,28 @@ DATASETS = {
         "roller_csv": "tmp/roller_legal_relationships.csv",
         "roller_slug": "import_roller_2025",
     },
+    # Generated by test/synthetic_data.py and streamed into the upload tables
+    "synthetic-small": {
+        "description": "Synthetic 10K legal units, 3 years of history",
+        "synthetic": {"legal_units": 10_000, "years": 3},
+    },
+    "synthetic-medium": {
+        "description": "Synthetic 100K legal units, 5 years of history",
+        "synthetic": {"legal_units": 100_000, "years": 5},
+    },
+    "synthetic-large": {
+        "description": "Synthetic 1M legal units, 10 years of history (production scale)",
+        "synthetic": {"legal_units": 1_000_000, "years": 10, "group_depth": 4},
+    },
 }
 
 
 def setup_test_data(dataset="selection"):
     """Setup test data from the specified dataset."""
     ds = DATASETS[dataset]
+    if "synthetic" in ds:
+        setup_synthetic_data(ds)
+        return
     year = ds["definition_year"]
 
     log_print(f"\n{BLUE}Setting up test data: {ds['description']}...{NC}")
@@ -285,18 +326,7 @@ def setup_test_data(dataset="selection"):
         size_mb = full_path.stat().st_size / (1024 * 1024)
         log_print(f"  {label} CSV: {path} ({size_mb:.1f} MB)")
 
-    # Run setup files via psql
-    log_print("  Running test/setup.sql...")
-    run_psql_file("test/setup.sql")
-
-    log_print("  Running samples/norway/getting-started.sql...")
-    run_psql_file("samples/norway/getting-started.sql")
-
-    log_print(f"  Running import definition for hovedenhet ({year})...")
-    run_psql_file(f"samples/norway/brreg/create-import-definition-hovedenhet-{year}.sql")
-
-    log_print(f"  Running import definition for underenhet ({year})...")
-    run_psql_file(f"samples/norway/brreg/create-import-definition-underenhet-{year}.sql")
+    run_setup_files(year)
 
     # Create import jobs
     log_print("  Creating import jobs...")
@@ -373,7 +403,91 @@ COMMIT;
     log_print(f"  Loading roller CSV data ({ds['roller_csv']})...")
     run_psql(f"\\copy public.{ds['roller_slug']}_upload FROM '{ds['roller_csv']}' WITH CSV HEADER")
 
-    # Show task state
+    show_loaded_state()
+
+
+def run_setup_files(year):
+    """Run the base setup and the hovedenhet/underenhet import definitions for year via psql."""
+    log_print("  Running test/setup.sql...")
+    run_psql_file("test/setup.sql")
+
+    log_print("  Running samples/norway/getting-started.sql...")
+    run_psql_file("samples/norway/getting-started.sql")
+
+    log_print(f"  Running import definition for hovedenhet ({year})...")
+    run_psql_file(f"samples/norway/brreg/create-import-definition-hovedenhet-{year}.sql")
+
+    log_print(f"  Running import definition for underenhet ({year})...")
+    run_psql_file(f"samples/norway/brreg/create-import-definition-underenhet-{year}.sql")
+
+
+def setup_synthetic_data(ds):
+    """Generate a synthetic register and COPY it straight into one upload table per job.
+
+    One hovedenhet and one underenhet job per history year (valid from 1 January),
+    created oldest first so earlier years get higher priority, then one roller job
+    for the last year.
+    """
+    spec = ds["synthetic"]
+    log_print(f"\n{BLUE}Setting up test data: {ds['description']}...{NC}")
+    start = time.time()
+    register = synthetic_data.generate(**spec)
+    log_print(f"  Generated {len(register.legal_units)} legal units and {len(register.establishments)} "
+              f"establishments over {register.years[0]}-{register.years[-1]} in {time.time() - start:.1f}s")
+
+    run_setup_files("2025")
+    log_print("  Seeding legal relationship types...")
+    run_psql_file("samples/norway/brreg/seed-legal-rel-types.sql")
+    log_print("  Creating import definition for roller...")
+    run_psql_file("samples/norway/brreg/create-import-definition-roller-2025.sql")
+
+    jobs = []
+    for year in register.years:
+        jobs.append((f"import_hovedenhet_synthetic_{year}", "brreg_hovedenhet_2025", f"{year}-01-01",
+                     synthetic_data.LU_COLUMNS, lambda y=year: register.legal_unit_rows(y)))
+        jobs.append((f"import_underenhet_synthetic_{year}", "brreg_underenhet_2025", f"{year}-01-01",
+                     synthetic_data.ES_COLUMNS, lambda y=year: register.establishment_rows(y)))
+    jobs.append(("import_roller_synthetic", "brreg_roller_2025", f"{register.years[-1]}-01-01",
+                 synthetic_data.ROLLER_COLUMNS, register.relationship_rows))
+
+    log_print(f"  Creating {len(jobs)} import jobs...")
+    values = ",\n       ".join(
+        f"({i}, '{slug}', '{definition}', '{valid_from}'::date)"
+        for i, (slug, definition, valid_from, _, _) in enumerate(jobs)
+    )
+    run_psql(f"""
+BEGIN;
+
+CALL test.set_user_from_email('test.admin@statbus.org');
+
+INSERT INTO public.import_job (definition_id, slug, default_valid_from, default_valid_to, description, user_id)
+SELECT d.id, j.slug, j.valid_from, 'infinity'::date, 'Synthetic ' || j.slug,
+       (SELECT id FROM public.user WHERE email = 'test.admin@statbus.org')
+FROM (VALUES {values}) AS j(ord, slug, definition_slug, valid_from)
+JOIN public.import_definition AS d ON d.slug = j.definition_slug
+ORDER BY j.ord
+ON CONFLICT (slug) DO NOTHING;
+
+COMMIT;
+""")
+
+    conn = get_conn()
+    with conn.cursor() as cur:
+        for slug, _, _, columns, rows in jobs:
+            cur.execute("SELECT upload_table_name FROM public.import_job WHERE slug = %s", (slug,))
+            table = cur.fetchone()[0]
+            start = time.time()
+            count = synthetic_data.copy_rows(cur, table, columns, rows())
+            conn.commit()
+            seconds = time.time() - start
+            log_print(f"  Loaded {slug}: {count} rows in {seconds:.1f}s ({count / max(seconds, 1e-9):,.0f} rows/s)")
+    conn.close()
+
+    show_loaded_state()
+
+
+def show_loaded_state():
+    """Show task states and import jobs after loading test data."""
     log_print(f"\n{BLUE}Test data loaded. Task states:{NC}")
     conn = get_conn()
     with conn.cursor() as cur:
@@ -390,6 +504,7 @@ COMMIT;
             FROM public.import_job
             WHERE slug LIKE 'import_%_concurrent'
                OR slug LIKE 'import_%_2025'
+               OR slug LIKE 'import_%_synthetic%'
             ORDER BY slug
         """)
         log_print(f"\n{BLUE}Import jobs:{NC}")
@@ -402,7 +517,7 @@ COMMIT;
 # Worker Execution
 # ============================================================================
 
-def run_worker(test_db, timeout_seconds=300, debug=True):
+def run_worker(test_db, timeout_seconds=300, debug=True, env_overrides=None):
     """Start the real Crystal worker binary against the test database.
 
     The worker runs with --stop-when-idle which makes it exit after
@@ -410,6 +525,7 @@ def run_worker(test_db, timeout_seconds=300, debug=True):
 
     Timeout: sends SIGTERM after timeout_seconds, then SIGKILL after 10s grace.
     Output is streamed in a background thread so the timeout is not blocked.
+    env_overrides (e.g. WORKER_QUEUE_CONCURRENCY) are added to the worker's environment.
     """
     binary = WORKSPACE / "cli" / "bin" / "statbus"
     if not binary.exists():
@@ -421,6 +537,7 @@ def run_worker(test_db, timeout_seconds=300, debug=True):
     env = os.environ.copy()
     if debug:
         env["DEBUG"] = "1"
+    env.update(env_overrides or {})
 
     log_print(f"\n{BLUE}Starting worker: {' '.join(cmd)}{NC}")
     start = time.time()
@@ -472,8 +589,117 @@ def run_worker(test_db, timeout_seconds=300, debug=True):
     return proc.returncode, output_lines, elapsed
 
 
-def run_concurrent_test(timeout_seconds=300, debug=True):
-    """Run the real Crystal worker and verify results."""
+def clone_database(source, target):
+    """CREATE DATABASE target as a copy of source (which must have no other connections)."""
+    conn = get_conn(dbname="postgres")
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f'DROP DATABASE IF EXISTS "{target}"')
+        cur.execute(f'CREATE DATABASE "{target}" WITH TEMPLATE "{source}"')
+    conn.close()
+
+
+def drop_database(dbname):
+    """Terminate connections to dbname and drop it."""
+    conn = get_conn(dbname="postgres")
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT pg_terminate_backend(pid)
+            FROM pg_stat_activity
+            WHERE datname = %s AND pid != pg_backend_pid()
+        """, (dbname,))
+        cur.execute(f'DROP DATABASE IF EXISTS "{dbname}"')
+    conn.close()
+
+
+def run_concurrency_sweep(settings, queue="analytics", timeout_seconds=600, debug=False,
+                          dataset=None, keep_clones=False):
+    """Run the worker once per concurrency setting on a fresh clone of the loaded test DB.
+
+    TEST_DB holds the loaded but unprocessed data and is never run itself; each
+    setting gets its own clone so every run starts from identical state. The
+    queue's concurrency is set with WORKER_QUEUE_CONCURRENCY, which overrides
+    worker.queue_registry.default_concurrency. Returns True if every run succeeded.
+    """
+    log_print(f"\n{'='*60}")
+    log_print(f"  Concurrency sweep: queue '{queue}' at {', '.join(map(str, settings))}")
+    log_print(f"  Source database: {TEST_DB}")
+    log_print(f"{'='*60}")
+
+    results = []
+    for concurrency in settings:
+        clone = f"{TEST_DB}_c{concurrency}"
+        log_print(f"\n{BLUE}Cloning {TEST_DB} -> {clone}{NC}")
+        clone_database(TEST_DB, clone)
+        worker_env = {"WORKER_QUEUE_CONCURRENCY": f"{queue}:{concurrency}"}
+        elapsed, completed, failed, units, success = 0.0, 0, 0, 0, False
+        try:
+            returncode, _, elapsed = run_worker(clone, timeout_seconds, debug, env_overrides=worker_env)
+            conn = get_conn(dbname=clone)
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT count(*) FILTER (WHERE state = 'completed')
+                         , count(*) FILTER (WHERE state = 'failed')
+                    FROM public.worker_task
+                """)
+                completed, failed = cur.fetchone()
+                cur.execute("SELECT count(*) FROM public.statistical_unit")
+                units = cur.fetchone()[0]
+                success = returncode == 0 and failed == 0
+                worker_bench.record_run(
+                    cur, dataset or "unknown", clone, elapsed, success,
+                    extra={"sweep": {"queue": queue, "concurrency": concurrency}},
+                    env={**os.environ, **worker_env},
+                )
+            conn.close()
+        except Exception as e:
+            log_print(f"  {RED}Concurrency {concurrency} failed: {e}{NC}", "error")
+        finally:
+            if not keep_clones:
+                drop_database(clone)
+        results.append((concurrency, elapsed, completed, failed, units, success))
+
+    base_elapsed = results[0][1]
+    log_print(f"\n  {BLUE}Scaling ({queue} queue):{NC}")
+    log_print(f"    {'Conc':>4} {'Wall':>9} {'Tasks':>7} {'Tasks/s':>8} {'Units/s':>9} {'Speedup':>8} {'Effic.':>7}")
+    log_print(f"    {'----':>4} {'-'*9:>9} {'-'*7:>7} {'-'*8:>8} {'-'*9:>9} {'-'*8:>8} {'-'*7:>7}")
+    for concurrency, elapsed, completed, failed, units, success in results:
+        speedup = base_elapsed / elapsed if elapsed else 0.0
+        efficiency = speedup / (concurrency / settings[0])
+        colour = NC if success else RED
+        tasks_per_s = completed / elapsed if elapsed else 0.0
+        units_per_s = units / elapsed if elapsed else 0.0
+        log_print(f"    {colour}{concurrency:>4} {elapsed:>8.1f}s {completed:>7} {tasks_per_s:>8.1f}"
+                  f" {units_per_s:>9.1f} {speedup:>7.2f}x {efficiency:>7.0%}{NC}")
+
+    worker_bench.BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    curve_file = worker_bench.BENCH_DIR / f"sweep-{TEST_DB}-{queue}.csv"
+    with open(curve_file, "w") as f:
+        f.write("concurrency,wall_s,tasks,failed,units,tasks_per_s,units_per_s\n")
+        for concurrency, elapsed, completed, failed, units, _ in results:
+            tasks_per_s = completed / elapsed if elapsed else 0.0
+            units_per_s = units / elapsed if elapsed else 0.0
+            f.write(f"{concurrency},{elapsed:.3f},{completed},{failed},{units},"
+                    f"{tasks_per_s:.3f},{units_per_s:.3f}\n")
+    log_print(f"  Scaling curve written to: {curve_file}")
+    return all(r[5] for r in results)
+
+
+def run_concurrent_test(timeout_seconds=300, debug=True, dataset=None, bench=None, sample_interval=0.2,
+                        capture_statements=True, consistency_mode="set", update_baseline=False):
+    """Run the real Crystal worker and verify results.
+
+    bench: optional dict(record=bool, compare=bool, baseline=str|None, threshold=float)
+    controlling the benchmark history in tmp/bench/ (see worker_bench.py).
+    sample_interval: seconds between wait-event/lock samples while the worker
+    runs (see worker_contention.py); 0 disables sampling.
+    capture_statements: reset pg_stat_statements before the run and report
+    the top statements per procedure afterwards (see worker_statements.py).
+    consistency_mode: "set" or "correlated", see check_consistency().
+    update_baseline: also rewrite the tracked hierarchy plan baseline, see
+    run_hierarchy_benchmarks().
+    """
     log_print(f"\n{'='*60}")
     log_print(f"  Concurrent Worker Test (real Crystal worker)")
     log_print(f"  Database: {TEST_DB}")
@@ -481,14 +707,33 @@ def run_concurrent_test(timeout_seconds=300, debug=True):
     log_print(f"  Log: {LOG_FILE}")
     log_print(f"{'='*60}")
 
-    returncode, output, elapsed = run_worker(TEST_DB, timeout_seconds, debug)
+    statements_enabled = False
+    if capture_statements:
+        conn = get_conn()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            reason = worker_statements.prepare(cur)
+        conn.close()
+        statements_enabled = reason is None
+        if reason:
+            log_print(f"  {YELLOW}Statement capture disabled: {reason}{NC}", "warning")
+
+    sampler = None
+    if sample_interval > 0:
+        sampler = worker_contention.ContentionSampler(lambda: get_conn(dbname=TEST_DB), sample_interval)
+        sampler.start()
+    try:
+        returncode, output, elapsed = run_worker(TEST_DB, timeout_seconds, debug)
+    finally:
+        if sampler:
+            sampler.stop()
 
     # Query final task states
     conn = get_conn()
     with conn.cursor() as cur:
         cur.execute("""
             SELECT state, count(*)
-            FROM worker.tasks
+            FROM public.worker_task
             GROUP BY state ORDER BY state
         """)
         log_print(f"\n  Final task states:")
@@ -498,7 +743,7 @@ def run_concurrent_test(timeout_seconds=300, debug=True):
         # Check for failed tasks
         cur.execute("""
             SELECT id, command, error
-            FROM worker.tasks
+            FROM public.worker_task
             WHERE state = 'failed'
             ORDER BY id
             LIMIT 10
@@ -517,7 +762,7 @@ def run_concurrent_test(timeout_seconds=300, debug=True):
                  , min(process_duration_ms)::numeric(10,0) AS min_ms
                  , max(process_duration_ms)::numeric(10,0) AS max_ms
                  , avg(process_duration_ms)::numeric(10,1) AS avg_ms
-            FROM worker.tasks
+            FROM public.worker_task
             WHERE state = 'completed' AND process_duration_ms IS NOT NULL
             GROUP BY command
             ORDER BY total_ms DESC
@@ -537,14 +782,41 @@ def run_concurrent_test(timeout_seconds=300, debug=True):
             log_print(f"    {'TOTAL':<50} {grand_tasks:>4} {grand_total:>7}ms")
     conn.close()
 
+    if sampler:
+        log_print(f"\n  {BLUE}Wait events and lock contention per command:{NC}")
+        for line in sampler.report_lines():
+            log_print(f"    {line}")
+        worker_bench.BENCH_DIR.mkdir(parents=True, exist_ok=True)
+        contention_file = worker_bench.BENCH_DIR / f"contention-{TEST_DB}.json"
+        sampler.write_report(contention_file)
+        log_print(f"    Contention report written to: {contention_file}")
+
+    if statements_enabled:
+        show_statements(TEST_DB)
+
+    show_critical_path(TEST_DB)
+
     # Concurrency-corruption gate — three layers
-    consistent, consistency_summary = check_consistency()
+    consistent, consistency_summary = check_consistency(consistency_mode)
 
     # Run hierarchy function benchmarks (after analytics pipeline is complete)
     if not failed:
-        run_hierarchy_benchmarks()
+        run_hierarchy_benchmarks(dataset or "unknown", update_baseline=update_baseline)
 
     success = returncode == 0 and not failed and consistent
+
+    # Benchmark history: record this run and optionally compare against a baseline
+    bench = bench or {}
+    if bench.get("record", True):
+        conn = get_conn()
+        with conn.cursor() as cur:
+            record = worker_bench.record_run(cur, dataset or "unknown", TEST_DB, elapsed, success)
+        conn.close()
+        log_print(f"\n  Benchmark run {record['run_id']} recorded in {worker_bench.BENCH_FILE}")
+        if bench.get("compare"):
+            if not compare_benchmark(record, bench.get("baseline"), bench.get("threshold", 0.20)):
+                success = False
+
     if success:
         log_print(f"\n{GREEN}{'='*60}")
         log_print(f"  SUCCESS: Worker processed all tasks in {elapsed:.1f}s; counts consistent")
@@ -558,7 +830,85 @@ def run_concurrent_test(timeout_seconds=300, debug=True):
     return success
 
 
-def check_consistency():
+# Layer B truth predicate matches statistical_history_def's stock_at_end_of_curr CTE:
+#   slice covers year-end AND birth_date <= year-end AND (death_date IS NULL OR death_date > year-end).
+# The slice-only naive form (valid_from/valid_until) overcounts units whose
+# temporal slice happens to cover the year-end but whose birth_date is later —
+# statistical_history excludes those, correctly.
+#
+# Correlated form: two COUNT(DISTINCT) subqueries per statistical_history row.
+TRUTH_CORRELATED_SQL = """
+    WITH years AS (
+        SELECT DISTINCT year FROM public.statistical_history
+        WHERE resolution = 'year' AND hash_partition IS NULL
+    )
+    SELECT y.year, sh.unit_type, sh.exists_count, sh.countable_count,
+        (SELECT COUNT(DISTINCT su.unit_id)
+           FROM public.statistical_unit AS su
+           WHERE su.unit_type = sh.unit_type
+             AND su.valid_from <= make_date(y.year, 12, 31)
+             AND su.valid_until > make_date(y.year, 12, 31)
+             AND COALESCE(su.birth_date, su.valid_from) <= make_date(y.year, 12, 31)
+             AND (su.death_date IS NULL OR su.death_date > make_date(y.year, 12, 31))) AS truth_exists,
+        (SELECT COUNT(DISTINCT su.unit_id)
+           FROM public.statistical_unit AS su
+           WHERE su.unit_type = sh.unit_type
+             AND su.valid_from <= make_date(y.year, 12, 31)
+             AND su.valid_until > make_date(y.year, 12, 31)
+             AND COALESCE(su.birth_date, su.valid_from) <= make_date(y.year, 12, 31)
+             AND (su.death_date IS NULL OR su.death_date > make_date(y.year, 12, 31))
+             AND su.used_for_counting) AS truth_countable
+    FROM years AS y
+    JOIN public.statistical_history AS sh
+      ON sh.resolution = 'year' AND sh.year = y.year AND sh.hash_partition IS NULL
+    ORDER BY y.year, sh.unit_type
+"""
+
+# Set-based form: one scan of statistical_unit. Each slice expands to the
+# history years whose year-end it counts towards — from the later of its
+# valid_from/birth year up to the year before its valid_until/death year —
+# then the grouped counts are diffed against statistical_history in SQL and
+# only mismatching (year, unit_type) cells come back, including cells missing
+# from statistical_history.
+TRUTH_SET_SQL = """
+    WITH sh AS (
+        SELECT year, unit_type, exists_count, countable_count
+        FROM public.statistical_history
+        WHERE resolution = 'year' AND hash_partition IS NULL
+    ), bounds AS (
+        SELECT min(year) AS first_year, max(year) AS last_year FROM sh
+    ), truth AS (
+        SELECT y.year, su.unit_type,
+               COUNT(DISTINCT su.unit_id) AS exists_count,
+               COUNT(DISTINCT su.unit_id) FILTER (WHERE su.used_for_counting) AS countable_count
+        FROM public.statistical_unit AS su
+        CROSS JOIN bounds AS b
+        CROSS JOIN LATERAL generate_series(
+            greatest(
+                CASE WHEN isfinite(su.valid_from) THEN extract(year FROM su.valid_from)::int ELSE b.first_year END,
+                CASE WHEN isfinite(su.birth_date) THEN extract(year FROM su.birth_date)::int ELSE b.first_year END,
+                b.first_year),
+            least(
+                CASE WHEN isfinite(su.valid_until) THEN extract(year FROM su.valid_until)::int - 1 ELSE b.last_year END,
+                CASE WHEN isfinite(su.death_date) THEN extract(year FROM su.death_date)::int - 1 ELSE b.last_year END,
+                b.last_year)
+        ) AS y(year)
+        WHERE su.unit_type IN (SELECT unit_type FROM sh)
+          AND y.year IN (SELECT year FROM sh)
+        GROUP BY y.year, su.unit_type
+    )
+    SELECT COALESCE(sh.year, t.year), COALESCE(sh.unit_type, t.unit_type),
+           sh.exists_count, sh.countable_count,
+           COALESCE(t.exists_count, 0), COALESCE(t.countable_count, 0)
+    FROM sh
+    FULL JOIN truth AS t ON t.year = sh.year AND t.unit_type = sh.unit_type
+    WHERE sh.exists_count IS DISTINCT FROM COALESCE(t.exists_count, 0)
+       OR sh.countable_count IS DISTINCT FROM COALESCE(t.countable_count, 0)
+    ORDER BY 1, 2
+"""
+
+
+def check_consistency(mode="set"):
     """Verify post-run statistical_history is internally and externally consistent.
 
     Three layers of check:
@@ -570,9 +920,14 @@ def check_consistency():
       C. Orphan partitions: any hash_partition outside [0, 16384) is a leftover
          from prior incompatible runs.
 
+    mode selects the layer B query: "set" (one grouped scan of
+    statistical_unit, usable as a post-upgrade check on production-sized
+    databases) or "correlated" (per-row COUNT(DISTINCT) subqueries).
+
     Returns (consistent: bool, summary: str). Logs detail per layer.
     """
-    log_print(f"\n  {BLUE}Consistency checks:{NC}")
+    log_print(f"\n  {BLUE}Consistency checks ({mode}):{NC}")
+    started = time.time()
 
     conn = get_conn()
     try:
@@ -616,37 +971,7 @@ def check_consistency():
             internal_divergent = cur.fetchall()
 
             # --- Layer B: ground-truth via statistical_unit at year-end ---
-            # Truth predicate matches statistical_history_def's stock_at_end_of_curr CTE:
-            #   slice covers year-end AND birth_date <= year-end AND (death_date IS NULL OR death_date > year-end).
-            # The slice-only naive form (valid_from/valid_until) overcounts units whose
-            # temporal slice happens to cover the year-end but whose birth_date is later —
-            # statistical_history excludes those, correctly.
-            cur.execute("""
-                WITH years AS (
-                    SELECT DISTINCT year FROM public.statistical_history
-                    WHERE resolution = 'year' AND hash_partition IS NULL
-                )
-                SELECT y.year, sh.unit_type, sh.exists_count, sh.countable_count,
-                    (SELECT COUNT(DISTINCT su.unit_id)
-                       FROM public.statistical_unit AS su
-                       WHERE su.unit_type = sh.unit_type
-                         AND su.valid_from <= make_date(y.year, 12, 31)
-                         AND su.valid_until > make_date(y.year, 12, 31)
-                         AND COALESCE(su.birth_date, su.valid_from) <= make_date(y.year, 12, 31)
-                         AND (su.death_date IS NULL OR su.death_date > make_date(y.year, 12, 31))) AS truth_exists,
-                    (SELECT COUNT(DISTINCT su.unit_id)
-                       FROM public.statistical_unit AS su
-                       WHERE su.unit_type = sh.unit_type
-                         AND su.valid_from <= make_date(y.year, 12, 31)
-                         AND su.valid_until > make_date(y.year, 12, 31)
-                         AND COALESCE(su.birth_date, su.valid_from) <= make_date(y.year, 12, 31)
-                         AND (su.death_date IS NULL OR su.death_date > make_date(y.year, 12, 31))
-                         AND su.used_for_counting) AS truth_countable
-                FROM years AS y
-                JOIN public.statistical_history AS sh
-                  ON sh.resolution = 'year' AND sh.year = y.year AND sh.hash_partition IS NULL
-                ORDER BY y.year, sh.unit_type
-            """)
+            cur.execute(TRUTH_SET_SQL if mode == "set" else TRUTH_CORRELATED_SQL)
             truth_rows = cur.fetchall()
             truth_divergent = [r for r in truth_rows if r[2] != r[4] or r[3] != r[5]]
     finally:
@@ -678,7 +1003,8 @@ def check_consistency():
         log_print(f"    {RED}B SH vs ground-truth: {len(truth_divergent)} divergent — FAIL{NC}", "error")
         log_print(f"      {'year':>4} {'unit_type':<12} {'sh_exists':>10} {'truth':>6} {'sh_countable':>13} {'truth':>6}")
         for r in truth_divergent[:10]:
-            log_print(f"      {r[0]:>4} {r[1]:<12} {r[2]:>10} {r[4]:>6} {r[3]:>13} {r[5]:>6}")
+            log_print(f"      {r[0]:>4} {r[1]:<12} {str(r[2]):>10} {r[4]:>6} {str(r[3]):>13} {r[5]:>6}")
+    log_print(f"    Checked in {time.time() - started:.1f}s")
 
     summary = (f"orphans={orphan_count} "
                f"internal_divergent={len(internal_divergent)} "
@@ -686,11 +1012,94 @@ def check_consistency():
     return consistent, summary
 
 
-def run_hierarchy_benchmarks():
-    """Run EXPLAIN ANALYZE benchmarks for hierarchy functions and write to perf file."""
+# Plan attributes that define a plan's shape; costs, row counts, timings and
+# aliases are left out so the fingerprint only changes when the plan does.
+PLAN_SHAPE_KEYS = ("Node Type", "Parent Relationship", "Join Type", "Strategy", "Relation Name",
+                   "Index Name", "CTE Name", "Function Name", "Scan Direction")
+PLAN_BUFFER_KEYS = ("Shared Hit Blocks", "Shared Read Blocks", "Shared Dirtied Blocks",
+                    "Shared Written Blocks", "Temp Read Blocks", "Temp Written Blocks")
+PLAN_TIME_THRESHOLD = 0.50     # Relative execution-time growth that counts as a regression
+PLAN_TIME_MIN_DELTA_MS = 5.0   # ... but only when it is at least this many ms
+PLAN_BUFFER_THRESHOLD = 0.25   # Relative growth in shared hit+read blocks
+
+
+def plan_shape(node):
+    """Normalized plan tree: shape attributes only, recursively."""
+    shape = {k: node[k] for k in PLAN_SHAPE_KEYS if k in node}
+    children = node.get("Plans")
+    if children:
+        shape["Plans"] = [plan_shape(child) for child in children]
+    return shape
+
+
+def plan_fingerprint(node):
+    return hashlib.sha1(json.dumps(plan_shape(node), sort_keys=True).encode()).hexdigest()[:12]
+
+
+def plan_summary(node):
+    """One-line plan shape, e.g. Sort(Nested Loop(Append(...), Index Scan[statistical_unit_temporal_pk]))"""
+    label = node["Node Type"]
+    target = node.get("Index Name") or node.get("Relation Name") or node.get("CTE Name") or node.get("Function Name")
+    if target:
+        label += f"[{target}]"
+    children = node.get("Plans")
+    if children:
+        label += "(" + ", ".join(plan_summary(child) for child in children) + ")"
+    return label
+
+
+def render_plan(node, depth=0):
+    """Readable lines for the perf file: node, target, actual time/rows and buffers per node."""
+    indent = "  " * depth + ("->  " if depth else "")
+    target = node.get("Relation Name") or node.get("CTE Name") or node.get("Function Name")
+    if node.get("Index Name"):
+        target = f"{node['Index Name']}" + (f" on {target}" if target else "")
+    buffers = " ".join(f"{k.replace(' Blocks', '').lower().replace(' ', '_')}={node[k]}"
+                       for k in PLAN_BUFFER_KEYS if node.get(k))
+    line = (f"{indent}{node['Node Type']}{(' using ' if node.get('Index Name') else ' on ') + target if target else ''}"
+            f"  (actual time={node.get('Actual Startup Time', 0):.3f}..{node.get('Actual Total Time', 0):.3f}"
+            f" rows={node.get('Actual Rows', 0)} loops={node.get('Actual Loops', 0)})")
+    lines = [line] + ([f"{'  ' * depth}      Buffers: {buffers}"] if buffers else [])
+    for child in node.get("Plans", []):
+        lines.extend(render_plan(child, depth + 1))
+    return lines
+
+
+def compare_plan(label, current, baseline):
+    """Warnings for a plan flip or time/buffer regression of current vs baseline."""
+    warnings = []
+    if current["fingerprint"] != baseline["fingerprint"]:
+        warnings.append(f"{label}: plan changed {baseline['fingerprint']} -> {current['fingerprint']}\n"
+                        f"      was: {baseline['shape']}\n"
+                        f"      now: {current['shape']}")
+    before, after = baseline["execution_ms"], current["execution_ms"]
+    if after - before > PLAN_TIME_MIN_DELTA_MS and after > before * (1 + PLAN_TIME_THRESHOLD):
+        warnings.append(f"{label}: execution time {before:.1f}ms -> {after:.1f}ms")
+    before_buffers = baseline["buffers"]["Shared Hit Blocks"] + baseline["buffers"]["Shared Read Blocks"]
+    after_buffers = current["buffers"]["Shared Hit Blocks"] + current["buffers"]["Shared Read Blocks"]
+    if after_buffers > before_buffers * (1 + PLAN_BUFFER_THRESHOLD) and after_buffers - before_buffers > 10:
+        warnings.append(f"{label}: shared buffers {before_buffers} -> {after_buffers}")
+    return warnings
+
+
+def run_hierarchy_benchmarks(dataset="selection", update_baseline=False):
+    """Run EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) benchmarks for hierarchy functions.
+
+    Writes the rendered plans to tmp/test_concurrent_worker_hierarchy.perf and
+    the per-query fingerprint, execution time and buffer counts (keyed by
+    dataset) to tmp/test_concurrent_worker_hierarchy.plans.json. Warns when a
+    fingerprint changed or time/buffers regressed against the tracked baseline
+    in test/expected/performance/. The tracked .perf and .plans.json are only
+    rewritten with update_baseline.
+    Returns the list of warnings.
+    """
     perf_dir = WORKSPACE / "test" / "expected" / "performance"
-    perf_dir.mkdir(parents=True, exist_ok=True)
-    perf_file = perf_dir / "test_concurrent_worker_hierarchy.perf"
+    baseline_perf_file = perf_dir / "test_concurrent_worker_hierarchy.perf"
+    baseline_file = perf_dir / "test_concurrent_worker_hierarchy.plans.json"
+    run_dir = WORKSPACE / "tmp"
+    run_dir.mkdir(parents=True, exist_ok=True)
+    perf_file = run_dir / "test_concurrent_worker_hierarchy.perf"
+    plans_file = run_dir / "test_concurrent_worker_hierarchy.plans.json"
 
     log_print(f"\n{BLUE}Running hierarchy function benchmarks...{NC}")
 
@@ -710,7 +1119,7 @@ def run_hierarchy_benchmarks():
         if not row:
             log_print(f"{YELLOW}No enterprise found for benchmarks, skipping.{NC}", "warning")
             conn.close()
-            return
+            return []
         ent_id = row[0]
 
         # Pick a legal_unit with the most establishments
@@ -726,54 +1135,102 @@ def run_hierarchy_benchmarks():
         if not row:
             log_print(f"{YELLOW}No legal_unit found for benchmarks, skipping.{NC}", "warning")
             conn.close()
-            return
+            return []
         lu_id = row[0]
 
         log_print(f"  Enterprise unit_id={ent_id}, Legal unit unit_id={lu_id}")
 
         # Run 4 EXPLAIN ANALYZE queries
+        explain = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) "
         benchmarks = [
             ("statistical_unit_stats (legal_unit)",
-             "EXPLAIN ANALYZE SELECT * FROM public.statistical_unit_stats('legal_unit', %s, '2025-01-01'::DATE)",
+             explain + "SELECT * FROM public.statistical_unit_stats('legal_unit', %s, '2025-01-01'::DATE)",
              lu_id),
             ("statistical_unit_stats (enterprise)",
-             "EXPLAIN ANALYZE SELECT * FROM public.statistical_unit_stats('enterprise', %s, '2025-01-01'::DATE)",
+             explain + "SELECT * FROM public.statistical_unit_stats('enterprise', %s, '2025-01-01'::DATE)",
              ent_id),
             ("relevant_statistical_units (legal_unit)",
-             "EXPLAIN ANALYZE SELECT * FROM public.relevant_statistical_units('legal_unit', %s, '2025-01-01'::DATE)",
+             explain + "SELECT * FROM public.relevant_statistical_units('legal_unit', %s, '2025-01-01'::DATE)",
              lu_id),
             ("relevant_statistical_units (enterprise)",
-             "EXPLAIN ANALYZE SELECT * FROM public.relevant_statistical_units('enterprise', %s, '2025-01-01'::DATE)",
+             explain + "SELECT * FROM public.relevant_statistical_units('enterprise', %s, '2025-01-01'::DATE)",
              ent_id),
         ]
 
         lines = []
-        lines.append("# Benchmark: statistical_unit_stats and relevant_statistical_units (~29K rows)")
+        lines.append(f"# Benchmark: statistical_unit_stats and relevant_statistical_units (dataset: {dataset})")
         cur.execute("SELECT now()::text")
         lines.append(f"# Date: {cur.fetchone()[0]}")
         lines.append("")
 
+        results = {}
         for label, query, unit_id in benchmarks:
-            lines.append(f"## EXPLAIN ANALYZE: {label}")
             cur.execute(query, (unit_id,))
-            rows = cur.fetchall()
-            for r in rows:
-                lines.append(r[0])
-
-            # Extract execution time from last line
-            plan_text = rows[-1][0] if rows else ""
-            if "Execution Time:" in plan_text:
-                log_print(f"  {label}: {plan_text.strip()}")
-
+            explained = cur.fetchone()[0]
+            if isinstance(explained, str):
+                explained = json.loads(explained)
+            top = explained[0]
+            plan = top["Plan"]
+            result = {
+                "unit_id": unit_id,
+                "fingerprint": plan_fingerprint(plan),
+                "shape": plan_summary(plan),
+                "execution_ms": top.get("Execution Time", 0.0),
+                "planning_ms": top.get("Planning Time", 0.0),
+                "buffers": {k: plan.get(k, 0) for k in PLAN_BUFFER_KEYS},
+            }
+            results[label] = result
+
+            lines.append(f"## EXPLAIN (ANALYZE, BUFFERS): {label}")
+            lines.append(f"# Fingerprint: {result['fingerprint']}")
+            lines.extend(render_plan(plan))
+            lines.append(f"Planning Time: {result['planning_ms']:.3f} ms")
+            lines.append(f"Execution Time: {result['execution_ms']:.3f} ms")
             lines.append("")
 
+            buffers = result["buffers"]
+            log_print(f"  {label}: Execution Time: {result['execution_ms']:.3f} ms, "
+                      f"shared hit={buffers['Shared Hit Blocks']} read={buffers['Shared Read Blocks']}, "
+                      f"plan {result['fingerprint']}")
+
     conn.close()
 
-    # Write perf file
+    # Compare against the tracked baseline for this dataset
+    baselines = {}
+    if baseline_file.exists():
+        with open(baseline_file) as f:
+            baselines = json.load(f)
+    warnings = []
+    for label, result in results.items():
+        baseline = baselines.get(dataset, {}).get(label)
+        if baseline:
+            warnings.extend(compare_plan(label, result, baseline))
+    if warnings:
+        log_print(f"  {YELLOW}Hierarchy plan regressions against {baseline_file.relative_to(WORKSPACE)}:{NC}", "warning")
+        for warning in warnings:
+            log_print(f"    {YELLOW}{warning}{NC}", "warning")
+    elif dataset in baselines:
+        log_print(f"  {GREEN}Hierarchy plans unchanged against baseline{NC}")
+    with open(plans_file, "w") as f:
+        json.dump({dataset: results}, f, indent=2, sort_keys=True)
+        f.write("\n")
     with open(perf_file, "w") as f:
         f.write("\n".join(lines))
+    if update_baseline:
+        baselines[dataset] = results
+        perf_dir.mkdir(parents=True, exist_ok=True)
+        with open(baseline_file, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        with open(baseline_perf_file, "w") as f:
+            f.write("\n".join(lines))
 
     log_print(f"  Benchmark results written to: {perf_file.relative_to(WORKSPACE)}")
+    log_print(f"  Plan fingerprints written to: {plans_file.relative_to(WORKSPACE)}")
+    if update_baseline:
+        log_print(f"  Plan baseline updated: {baseline_file.relative_to(WORKSPACE)}, "
+                  f"{baseline_perf_file.relative_to(WORKSPACE)}")
+    return warnings
 
 
 def list_test_databases():
@@ -802,7 +1259,7 @@ def show_timing(dbname):
     with conn.cursor() as cur:
         cur.execute("""
             SELECT state, count(*)
-            FROM worker.tasks
+            FROM public.worker_task
             GROUP BY state ORDER BY state
         """)
         log_print(f"\n  Task states in {dbname}:")
@@ -816,7 +1273,7 @@ def show_timing(dbname):
                  , min(process_duration_ms)::numeric(10,0) AS min_ms
                  , max(process_duration_ms)::numeric(10,0) AS max_ms
                  , avg(process_duration_ms)::numeric(10,1) AS avg_ms
-            FROM worker.tasks
+            FROM public.worker_task
             WHERE state = 'completed' AND process_duration_ms IS NOT NULL
             GROUP BY command
             ORDER BY total_ms DESC
@@ -838,6 +1295,77 @@ def show_timing(dbname):
     conn.close()
 
 
+def show_statements(dbname):
+    """Report pg_stat_statements captured during the run, grouped by issuing procedure."""
+    conn = get_conn(dbname=dbname)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        statements = worker_statements.attribute(cur, worker_statements.snapshot(cur))
+        worker_statements.finish(cur)
+    conn.close()
+
+    log_print(f"\n  {BLUE}SQL statements per procedure (pg_stat_statements):{NC}")
+    for line in worker_statements.report_lines(statements):
+        log_print(f"    {line}")
+    worker_bench.BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    statements_file = worker_bench.BENCH_DIR / f"statements-{dbname}.json"
+    with open(statements_file, "w") as f:
+        json.dump(statements, f, indent=2, default=str)
+    log_print(f"    Statement statistics written to: {statements_file}")
+
+
+def show_critical_path(dbname, trace_path=None):
+    """Critical path, subtree wall times and queue parallelism of a finished run, plus a Chrome trace."""
+    conn = get_conn(dbname=dbname)
+    with conn.cursor() as cur:
+        roots, tasks = worker_task_tree.load_tree(cur)
+        concurrency = worker_bench.effective_concurrency(cur)
+    conn.close()
+
+    log_print(f"\n  {BLUE}Critical path analysis:{NC}")
+    for line in worker_task_tree.report_lines(roots, tasks, concurrency):
+        log_print(f"    {line}")
+
+    if tasks:
+        if trace_path is None:
+            worker_bench.BENCH_DIR.mkdir(parents=True, exist_ok=True)
+            trace_path = worker_bench.BENCH_DIR / f"trace-{dbname}.json"
+        worker_task_tree.export_chrome_trace(tasks, trace_path, worker_task_tree.critical_path(roots))
+        log_print(f"    Chrome trace written to: {trace_path} (open in chrome://tracing or ui.perfetto.dev)")
+
+
+def compare_benchmark(record, baseline_ref=None, threshold=0.20):
+    """Compare a recorded run with a baseline run; return False on p50/p95 regressions."""
+    runs = worker_bench.load_runs()
+    current = next((r for r in runs if r["run_id"] == record["run_id"]), record)
+    if baseline_ref:
+        baseline = worker_bench.find_run(runs[:runs.index(current)] if current in runs else runs, baseline_ref)
+    else:
+        baseline = worker_bench.default_baseline(runs, current) if current in runs else None
+    if baseline is None:
+        log_print(f"\n  {YELLOW}No baseline run found for comparison"
+                  f"{f' (ref {baseline_ref})' if baseline_ref else ''}; nothing to compare{NC}")
+        return True
+
+    log_print(f"\n  {BLUE}Benchmark comparison:{NC}")
+    log_print(f"    Baseline: {worker_bench.describe(baseline)}")
+    log_print(f"    Current:  {worker_bench.describe(current)}")
+    if baseline["concurrency"] != current["concurrency"]:
+        log_print(f"    {YELLOW}Concurrency differs: {baseline['concurrency']} -> {current['concurrency']}{NC}")
+    if baseline["dataset"] != current["dataset"]:
+        log_print(f"    {YELLOW}Dataset differs: {baseline['dataset']} -> {current['dataset']}{NC}")
+
+    regressions = worker_bench.compare_runs(current, baseline, threshold)
+    if not regressions:
+        log_print(f"    {GREEN}No p50/p95 regressions above {threshold:.0%}{NC}")
+        return True
+    log_print(f"    {'Command':<50} {'Metric':>6} {'Before':>9} {'After':>9} {'Change':>8}")
+    for command, metric, before, after, change in regressions:
+        log_print(f"    {RED}{command:<50} {metric[:3]:>6} {before:>7.0f}ms {after:>7.0f}ms {change:>+7.0%}{NC}")
+    log_print(f"    {RED}{len(regressions)} regression(s) above {threshold:.0%}{NC}", "error")
+    return False
+
+
 # ============================================================================
 # Main
 # ============================================================================
@@ -863,16 +1391,74 @@ if __name__ == "__main__":
                         help="Drop ALL test_concurrent_* databases and exit")
     parser.add_argument("--timing", metavar="DBNAME",
                         help="Show pipeline timing from an existing test database and exit")
+    parser.add_argument("--critical-path", metavar="DBNAME",
+                        help="Show critical path and queue parallelism from an existing test database and exit")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Chrome trace output for --critical-path (default: tmp/bench/trace-DBNAME.json)")
+    parser.add_argument("--sweep", metavar="N,N,...",
+                        help="Concurrency sweep: run the worker on a fresh clone of the loaded DB "
+                             "once per setting (e.g. 1,2,4,8) and report a scaling table")
+    parser.add_argument("--sweep-queue", default="analytics",
+                        help="Queue whose concurrency --sweep varies (default: analytics)")
+    parser.add_argument("--sweep-keep", action="store_true",
+                        help="Keep the per-setting clone databases after --sweep")
+    parser.add_argument("--pool", type=int, metavar="N", default=0,
+                        help="Claim a pre-cloned database from the pool and refill it to N "
+                             "in the background after the run (see test/db_pool.py)")
+    parser.add_argument("--pool-fill", type=int, metavar="N",
+                        help="Top up the database pool to N ready databases and exit")
+    parser.add_argument("--sample-interval", type=float, default=0.2, metavar="SECONDS",
+                        help="Wait-event/lock sampling interval while the worker runs "
+                             "(default: 0.2, 0 disables)")
+    parser.add_argument("--no-statements", action="store_true",
+                        help="Do not reset/capture pg_stat_statements around the worker run")
+    parser.add_argument("--consistency-mode", choices=["set", "correlated"], default="set",
+                        help="Ground-truth query for the consistency check (default: set)")
+    parser.add_argument("--check-consistency", metavar="DBNAME",
+                        help="Run the consistency check against an existing database and exit")
     parser.add_argument("--debug", action="store_true", default=True,
                         help="Enable debug logging in worker (default: true)")
     parser.add_argument("--no-debug", action="store_true",
                         help="Disable debug logging in worker")
+    parser.add_argument("--bench-compare", action="store_true",
+                        help="Compare per-command p50/p95 with a baseline run from tmp/bench/ "
+                             "and fail on regressions")
+    parser.add_argument("--bench-baseline", metavar="REF",
+                        help="Baseline run id or git commit prefix (default: latest earlier "
+                             "successful run with the same dataset and concurrency)")
+    parser.add_argument("--bench-threshold", type=float, default=0.20,
+                        help="Relative p50/p95 growth counted as a regression (default: 0.20)")
+    parser.add_argument("--no-bench-record", action="store_true",
+                        help="Do not append this run to the benchmark history")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Rewrite the tracked hierarchy plan baseline "
+                             "(test/expected/performance/test_concurrent_worker_hierarchy.plans.json and .perf) "
+                             "with this run's plans")
     args = parser.parse_args()
 
+    sweep_settings = None
+    if args.sweep:
+        try:
+            sweep_settings = [int(n) for n in args.sweep.split(",") if n.strip()]
+        except ValueError:
+            parser.error(f"--sweep expects comma-separated integers, got {args.sweep!r}")
+        if not sweep_settings or min(sweep_settings) < 1:
+            parser.error("--sweep settings must be positive integers")
+
     if args.cleanup_all:
         drop_all_test_databases()
         sys.exit(0)
 
+    if args.pool_fill is not None:
+        conn = get_conn(dbname="postgres")
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            created = db_pool.fill(cur, TEMPLATE_DB, args.pool_fill)
+            ready = db_pool.ready_databases(cur, TEMPLATE_DB)
+        conn.close()
+        log_print(f"Database pool: created {len(created)}, {len(ready)} ready")
+        sys.exit(0)
+
     if args.list:
         list_test_databases()
         sys.exit(0)
@@ -882,11 +1468,25 @@ if __name__ == "__main__":
         show_timing(args.timing)
         sys.exit(0)
 
+    if args.check_consistency:
+        TEST_DB = args.check_consistency
+        consistent, _ = check_consistency(args.consistency_mode)
+        sys.exit(0 if consistent else 1)
+
+    if args.critical_path:
+        TEST_DB = args.critical_path
+        show_critical_path(args.critical_path, args.trace)
+        sys.exit(0)
+
     log_print(f"{BLUE}Log file: {LOG_FILE}{NC}")
 
     if not args.skip_setup:
-        create_isolated_db()
-        atexit.register(lambda: drop_isolated_db(force=args.cleanup))
+        create_isolated_db(use_pool=args.pool > 0)
+        atexit.register(lambda: drop_isolated_db(force=args.cleanup, background=args.pool > 0))
+        if args.pool > 0:
+            # Refill after the run so cloning does not compete with the worker being measured.
+            atexit.register(lambda: db_pool.spawn(["--template", TEMPLATE_DB, "fill", str(args.pool)],
+                                                  env=pg_env()))
         setup_test_data(args.dataset)
     else:
         env = pg_env()
@@ -894,5 +1494,20 @@ if __name__ == "__main__":
         log_print(f"Using existing database: {TEST_DB}")
 
     debug = not args.no_debug
-    success = run_concurrent_test(timeout_seconds=args.timeout, debug=debug)
+    if args.sweep:
+        success = run_concurrency_sweep(sweep_settings, args.sweep_queue, args.timeout, debug,
+                                        dataset=args.dataset, keep_clones=args.sweep_keep)
+        sys.exit(0 if success else 1)
+
+    bench = {
+        "record": not args.no_bench_record,
+        "compare": args.bench_compare and not args.no_bench_record,
+        "baseline": args.bench_baseline,
+        "threshold": args.bench_threshold,
+    }
+    success = run_concurrent_test(timeout_seconds=args.timeout, debug=debug,
+                                  dataset=args.dataset, bench=bench, sample_interval=args.sample_interval,
+                                  capture_statements=not args.no_statements,
+                                  consistency_mode=args.consistency_mode,
+                                  update_baseline=args.update_baseline)
     sys.exit(0 if success else 1)
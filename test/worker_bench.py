@@ -0,0 +1,145 @@
+"""
+Benchmark history for test_concurrent_worker.py.
+
+Every worker run appends one JSON line to tmp/bench/worker_runs.jsonl with the
+git commit, dataset, effective queue concurrency, wall time and per-command
+process_duration_ms statistics (count/total/min/max/avg/p50/p95) from
+public.worker_task, which covers worker.tasks and worker.tasks_archive.
+compare_runs() diffs a run against a baseline run and flags commands whose p50
+or p95 grew beyond a relative threshold, so derive-pipeline slowdowns show up
+before an upgrade reaches production.
+
+Used by: ./test/test_concurrent_worker.sh --bench-compare [--bench-baseline REF]
+"""
+
+import json
+import os
+import subprocess
+import time
+from pathlib import Path
+
+WORKSPACE = Path(__file__).parent.parent.absolute()
+BENCH_DIR = WORKSPACE / "tmp" / "bench"
+BENCH_FILE = BENCH_DIR / "worker_runs.jsonl"
+
+COMMAND_TIMING_SQL = """
+    SELECT command
+         , count(*) AS tasks
+         , sum(process_duration_ms)::float8 AS total_ms
+         , min(process_duration_ms)::float8 AS min_ms
+         , max(process_duration_ms)::float8 AS max_ms
+         , avg(process_duration_ms)::float8 AS avg_ms
+         , percentile_cont(0.5) WITHIN GROUP (ORDER BY process_duration_ms)::float8 AS p50_ms
+         , percentile_cont(0.95) WITHIN GROUP (ORDER BY process_duration_ms)::float8 AS p95_ms
+    FROM public.worker_task
+    WHERE state = 'completed' AND process_duration_ms IS NOT NULL
+    GROUP BY command
+    ORDER BY total_ms DESC
+"""
+
+
+def git_commit():
+    """Return (commit sha, dirty) for the workspace, or (None, None) outside git."""
+    try:
+        sha = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                             cwd=WORKSPACE, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True, cwd=WORKSPACE, check=True).stdout.strip() != ""
+        return sha, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def effective_concurrency(cur, env=None):
+    """Queue -> concurrency the worker will use: WORKER_QUEUE_CONCURRENCY overrides queue_registry."""
+    env = os.environ if env is None else env
+    cur.execute("SELECT queue, default_concurrency FROM worker.queue_registry ORDER BY queue")
+    concurrency = {queue: n for queue, n in cur.fetchall()}
+    for pair in env.get("WORKER_QUEUE_CONCURRENCY", "").split(","):
+        queue, _, count = pair.strip().partition(":")
+        if queue and count.strip().isdigit() and int(count) > 0:
+            concurrency[queue.strip()] = int(count)
+    return concurrency
+
+
+def command_timings(cur):
+    """Per-command process_duration_ms statistics for completed tasks."""
+    cur.execute(COMMAND_TIMING_SQL)
+    columns = [d[0] for d in cur.description]
+    return {row[0]: dict(zip(columns[1:], row[1:])) for row in cur.fetchall()}
+
+
+def record_run(cur, dataset, test_db, elapsed_s, success, extra=None, env=None):
+    """Append one run to the benchmark store and return the record.
+
+    env is the environment the worker ran with (default: this process's).
+    """
+    sha, dirty = git_commit()
+    record = {
+        "run_id": f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}",
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": sha,
+        "git_dirty": dirty,
+        "dataset": dataset,
+        "database": test_db,
+        "concurrency": effective_concurrency(cur, env),
+        "elapsed_s": round(elapsed_s, 3),
+        "success": success,
+        "commands": command_timings(cur),
+    }
+    if extra:
+        record.update(extra)
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    with open(BENCH_FILE, "a") as f:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+    return record
+
+
+def load_runs():
+    if not BENCH_FILE.exists():
+        return []
+    with open(BENCH_FILE) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_run(runs, ref):
+    """Latest run whose run_id equals ref or whose git commit starts with ref."""
+    for run in reversed(runs):
+        if run["run_id"] == ref or (run.get("git_commit") or "").startswith(ref):
+            return run
+    return None
+
+
+def default_baseline(runs, current):
+    """Latest successful earlier run with the same dataset and concurrency."""
+    earlier = runs[:runs.index(current)]
+    for run in reversed(earlier):
+        if (run["success"] and run["dataset"] == current["dataset"]
+                and run["concurrency"] == current["concurrency"]):
+            return run
+    return None
+
+
+def compare_runs(current, baseline, threshold=0.20, min_delta_ms=10.0):
+    """Return rows (command, metric, baseline_ms, current_ms, change) for p50/p95 regressions.
+
+    A metric regresses when it grew by more than `threshold` (relative) and by
+    more than `min_delta_ms` (absolute, to ignore jitter on millisecond tasks).
+    """
+    regressions = []
+    for command, now in sorted(current["commands"].items()):
+        before = baseline["commands"].get(command)
+        if before is None:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            b, c = before.get(metric), now.get(metric)
+            if b is None or c is None:
+                continue
+            if c - b > min_delta_ms and c > b * (1 + threshold):
+                regressions.append((command, metric, b, c, (c - b) / b if b else float("inf")))
+    return regressions
+
+
+def describe(run):
+    commit = (run.get("git_commit") or "unknown")[:10] + ("+dirty" if run.get("git_dirty") else "")
+    return f"{run['run_id']} ({commit}, {run['dataset']}, {run['elapsed_s']:.1f}s)"
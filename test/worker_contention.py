@@ -0,0 +1,182 @@
+"""
+Wait-event and lock-contention sampling during a worker run.
+
+ContentionSampler is a background thread that polls pg_stat_activity and
+pg_locks in the test database at a fixed interval. Each backend that is
+running a task (worker.tasks.worker_pid = pid, state = 'processing') is
+attributed to that task's command, so the report says, per command, what
+fraction of samples it spent on CPU, waiting on heavyweight locks (and on
+which command's backend), on I/O, on LWLocks and so on.
+
+pg_stat_io (PostgreSQL 16+) is cluster-wide and cannot be split per backend,
+so the report includes its client-backend delta over the whole run instead.
+
+Sample fractions approximate time shares; with the default 200ms interval,
+tasks shorter than a few hundred ms may not be seen at all.
+"""
+
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+
+SAMPLE_SQL = """
+    SELECT a.pid
+         , t.command
+         , a.state
+         , a.wait_event_type
+         , a.wait_event
+         , pg_blocking_pids(a.pid)
+         , (SELECT l.locktype || coalesce(' ' || l.relation::regclass::text, '')
+            FROM pg_locks AS l
+            WHERE l.pid = a.pid AND NOT l.granted
+            LIMIT 1)
+    FROM pg_stat_activity AS a
+    LEFT JOIN worker.tasks AS t ON t.worker_pid = a.pid AND t.state = 'processing'
+    WHERE a.datname = current_database()
+      AND a.pid <> pg_backend_pid()
+      AND a.backend_type = 'client backend'
+      AND a.state <> 'idle'
+"""
+
+IO_SQL = """
+    SELECT object, context
+         , sum(coalesce(reads, 0))::bigint, sum(coalesce(writes, 0))::bigint
+         , sum(coalesce(extends, 0))::bigint, sum(coalesce(hits, 0))::bigint
+         , sum(coalesce(evictions, 0))::bigint, sum(coalesce(fsyncs, 0))::bigint
+    FROM pg_stat_io
+    WHERE backend_type = 'client backend'
+    GROUP BY object, context
+"""
+IO_COLUMNS = ("reads", "writes", "extends", "hits", "evictions", "fsyncs")
+
+# Wait categories in report order; None (active, no wait event) is CPU.
+CATEGORIES = ("CPU", "Lock", "LWLock", "IO", "BufferPin", "IPC", "Other")
+
+
+def _category(state, wait_event_type):
+    if wait_event_type is None:
+        return "CPU" if state == "active" else "Other"
+    return wait_event_type if wait_event_type in CATEGORIES else "Other"
+
+
+def _io_snapshot(cur):
+    try:
+        cur.execute(IO_SQL)
+    except Exception:
+        return None  # pg_stat_io needs PostgreSQL 16+
+    return {(obj, ctx): dict(zip(IO_COLUMNS, values)) for obj, ctx, *values in cur.fetchall()}
+
+
+class ContentionSampler(threading.Thread):
+    """Poll pg_stat_activity/pg_locks every `interval` seconds until stop() is called."""
+
+    def __init__(self, connect, interval=0.2):
+        super().__init__(daemon=True)
+        self.connect = connect
+        self.interval = interval
+        self.samples = 0
+        self.by_command = defaultdict(Counter)       # command -> category -> samples
+        self.wait_events = defaultdict(Counter)      # command -> "type:event" -> samples
+        self.blocked_by = defaultdict(Counter)       # command -> blocking command -> samples
+        self.lock_targets = defaultdict(Counter)     # command -> "locktype relation" -> samples
+        self.io_start = self.io_end = None
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            conn = self.connect()
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                self.io_start = _io_snapshot(cur)
+                while not self._stop_event.is_set():
+                    started = time.monotonic()
+                    cur.execute(SAMPLE_SQL)
+                    self._record(cur.fetchall())
+                    self._stop_event.wait(max(0.0, self.interval - (time.monotonic() - started)))
+                self.io_end = _io_snapshot(cur)
+            conn.close()
+        except Exception as e:
+            self.error = e
+
+    def _record(self, rows):
+        self.samples += 1
+        command_by_pid = {pid: command for pid, command, *_ in rows}
+        for pid, command, state, wait_type, wait_event, blockers, lock_target in rows:
+            command = command or "(no task)"
+            self.by_command[command][_category(state, wait_type)] += 1
+            if wait_type is not None:
+                self.wait_events[command][f"{wait_type}:{wait_event}"] += 1
+            if wait_type == "Lock":
+                for blocker in blockers or []:
+                    self.blocked_by[command][command_by_pid.get(blocker) or f"pid {blocker}"] += 1
+                if lock_target:
+                    self.lock_targets[command][lock_target] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join(timeout=10)
+
+    def io_delta(self):
+        if not self.io_start or not self.io_end:
+            return {}
+        delta = {}
+        for key, end in self.io_end.items():
+            start = self.io_start.get(key, {})
+            changed = {c: end[c] - start.get(c, 0) for c in IO_COLUMNS if end[c] - start.get(c, 0)}
+            if changed:
+                delta[f"{key[0]}/{key[1]}"] = changed
+        return delta
+
+    def report(self):
+        """JSON-serialisable summary."""
+        return {
+            "interval_s": self.interval,
+            "samples": self.samples,
+            "commands": {
+                command: {
+                    "samples": sum(categories.values()),
+                    "categories": dict(categories),
+                    "top_wait_events": self.wait_events[command].most_common(5),
+                    "blocked_by": self.blocked_by[command].most_common(5),
+                    "lock_targets": self.lock_targets[command].most_common(5),
+                }
+                for command, categories in self.by_command.items()
+            },
+            "io_delta": self.io_delta(),
+        }
+
+    def report_lines(self):
+        """Per-command contention table (the caller decides how to print it)."""
+        if self.error is not None:
+            return [f"Sampler failed: {self.error}"]
+        if not self.by_command:
+            return [f"No active backends seen in {self.samples} samples."]
+        lines = [f"{self.samples} samples at {self.interval * 1000:.0f}ms; % of each command's samples",
+                 f"{'Command':<45} {'Samples':>7} " + " ".join(f"{c:>7}" for c in CATEGORIES)]
+        ordered = sorted(self.by_command.items(), key=lambda kv: -sum(kv[1].values()))
+        for command, categories in ordered:
+            total = sum(categories.values())
+            lines.append(f"{command:<45} {total:>7} "
+                         + " ".join(f"{categories[c] / total:>7.0%}" for c in CATEGORIES))
+        for command, _ in ordered:
+            details = []
+            if self.wait_events[command]:
+                details.append("waits " + ", ".join(f"{e} x{n}" for e, n in self.wait_events[command].most_common(3)))
+            if self.blocked_by[command]:
+                details.append("blocked by " + ", ".join(f"{c} x{n}" for c, n in self.blocked_by[command].most_common(3)))
+            if self.lock_targets[command]:
+                details.append("on " + ", ".join(f"{t} x{n}" for t, n in self.lock_targets[command].most_common(3)))
+            if details:
+                lines.append(f"  {command}: " + "; ".join(details))
+        io = self.io_delta()
+        if io:
+            lines.append("pg_stat_io delta (client backends, whole run):")
+            for key, counts in sorted(io.items()):
+                lines.append(f"  {key:<30} " + " ".join(f"{c}={n}" for c, n in counts.items()))
+        return lines
+
+    def write_report(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2, sort_keys=True)
@@ -0,0 +1,135 @@
+"""
+pg_stat_statements capture around a worker run.
+
+prepare() turns on nested statement tracking for the test database
+(pg_stat_statements.track = all, picked up by the worker's new sessions) and
+resets the statistics for that database only; snapshot() reads them back
+after the run.
+
+pg_stat_statements does not record which function issued a statement, so
+attribute() maps each statement to an import.analyse_*/import.process_*/
+worker.* procedure by searching the procedures' source for the longest
+literal fragment of the normalized statement text (the parts between $n
+placeholders). Statements built with EXECUTE format(...) usually do not
+appear verbatim in any source and are reported as (dynamic/unattributed).
+"""
+
+import re
+from collections import defaultdict
+
+SNAPSHOT_SQL = """
+    SELECT s.queryid, s.toplevel, s.calls, s.total_exec_time, s.rows
+         , s.shared_blks_hit, s.shared_blks_read, s.temp_blks_read, s.temp_blks_written
+         , s.query
+    FROM pg_stat_statements AS s
+    JOIN pg_database AS d ON d.oid = s.dbid
+    WHERE d.datname = current_database()
+    ORDER BY s.total_exec_time DESC
+    LIMIT %s
+"""
+COLUMNS = ("queryid", "toplevel", "calls", "total_exec_time", "rows", "shared_blks_hit",
+           "shared_blks_read", "temp_blks_read", "temp_blks_written", "query")
+
+PROCEDURES_SQL = """
+    SELECT n.nspname || '.' || p.proname, p.prosrc
+    FROM pg_proc AS p
+    JOIN pg_namespace AS n ON n.oid = p.pronamespace
+    WHERE n.nspname IN ('import', 'worker', 'public', 'admin')
+      AND p.prolang = (SELECT oid FROM pg_language WHERE lanname = 'plpgsql')
+"""
+# Procedures named in reports first; anything else matched is grouped under its own name too.
+PREFERRED_PREFIXES = ("import.analyse_", "import.process_", "worker.derive_")
+UNATTRIBUTED = "(dynamic/unattributed)"
+TOP_LEVEL = "(top level)"
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER = re.compile(r"\$\d+")
+
+
+def _normalize(text):
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+def prepare(cur):
+    """Enable nested tracking and reset statistics for the current database. Returns None or a reason it failed."""
+    cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'")
+    if cur.fetchone() is None:
+        return "pg_stat_statements extension is not installed in this database"
+    try:
+        cur.execute("SELECT current_database()")
+        dbname = cur.fetchone()[0]
+        cur.execute(f'ALTER DATABASE "{dbname}" SET pg_stat_statements.track = \'all\'')
+        cur.execute("SELECT pg_stat_statements_reset(0, (SELECT oid FROM pg_database WHERE datname = current_database()), 0)")
+    except Exception as e:
+        return f"could not reset pg_stat_statements: {e}".strip()
+    return None
+
+
+def finish(cur):
+    """Undo prepare()'s database setting (matters when running against a non-throwaway database)."""
+    cur.execute("SELECT current_database()")
+    cur.execute(f'ALTER DATABASE "{cur.fetchone()[0]}" RESET pg_stat_statements.track')
+
+
+def snapshot(cur, limit=1000):
+    cur.execute(SNAPSHOT_SQL, (limit,))
+    return [dict(zip(COLUMNS, row)) for row in cur.fetchall()]
+
+
+def attribute(cur, statements):
+    """Set statement['procedure'] for each statement (see module docstring)."""
+    cur.execute(PROCEDURES_SQL)
+    sources = [(name, _normalize(src)) for name, src in cur.fetchall()]
+    sources.sort(key=lambda ns: not ns[0].startswith(PREFERRED_PREFIXES))
+    for statement in statements:
+        if statement["toplevel"]:
+            statement["procedure"] = TOP_LEVEL
+            continue
+        fragments = [f.strip() for f in _PLACEHOLDER.split(_normalize(statement["query"]))]
+        fragment = max(fragments, key=len)
+        statement["procedure"] = UNATTRIBUTED
+        if len(fragment) < 12:
+            continue
+        for name, source in sources:
+            if fragment in source:
+                statement["procedure"] = name
+                break
+    return statements
+
+
+def by_procedure(statements):
+    """Totals per procedure, ordered by total execution time."""
+    totals = defaultdict(lambda: {"statements": 0, "calls": 0, "total_exec_time": 0.0,
+                                  "shared_blks_read": 0, "temp_blks_written": 0})
+    for s in statements:
+        t = totals[s["procedure"]]
+        t["statements"] += 1
+        for key in ("calls", "total_exec_time", "shared_blks_read", "temp_blks_written"):
+            t[key] += s[key]
+    return sorted(totals.items(), key=lambda kv: -kv[1]["total_exec_time"])
+
+
+def _short(query, width=90):
+    text = _WHITESPACE.sub(" ", query).strip()
+    return text if len(text) <= width else text[:width - 3] + "..."
+
+
+def report_lines(statements, top=5):
+    """Per-procedure totals, then the top statements by time, calls, shared reads and temp usage."""
+    nested = [s for s in statements if not s["toplevel"]]
+    if not nested:
+        return ["No nested statements recorded (is pg_stat_statements.track = all in effect?)."]
+    lines = [f"{'Procedure':<55} {'Stmts':>5} {'Calls':>9} {'Time':>10} {'Shared rd':>10} {'Temp wr':>9}"]
+    for name, t in by_procedure(nested):
+        lines.append(f"{name:<55} {t['statements']:>5} {t['calls']:>9} {t['total_exec_time']:>8.0f}ms"
+                     f" {t['shared_blks_read']:>10} {t['temp_blks_written']:>9}")
+    for title, key in (("total time", "total_exec_time"), ("calls", "calls"),
+                       ("shared blocks read", "shared_blks_read"), ("temp blocks written", "temp_blks_written")):
+        ranked = [s for s in sorted(nested, key=lambda s: -s[key]) if s[key]][:top]
+        if not ranked:
+            continue
+        lines.append(f"Top statements by {title}:")
+        for s in ranked:
+            value = f"{s[key]:.0f}ms" if key == "total_exec_time" else f"{s[key]}"
+            lines.append(f"  {value:>10}  {s['procedure']:<40} {_short(s['query'])}")
+    return lines
@@ -0,0 +1,258 @@
+"""
+Critical-path analysis of a finished worker run.
+
+Rebuilds the structured-concurrency task tree from public.worker_task (parent_id,
+process_start_at, process_stop_at, completed_at) and computes:
+
+  - the critical path: the chain of handler segments and queue waits that
+    determined when the run finished. Among siblings (and among top-level
+    tasks) the path walks back from the last one to finish to the sibling that
+    finished latest before it started; the first sibling hangs off its
+    parent's handler. Time between two steps is wait (queue latency or a
+    serial dependency that has not started yet).
+  - per-subtree wall time: first handler start to last completion in a subtree.
+  - achieved parallelism per queue (handler time / busy time, and the peak
+    number of concurrently running handlers) versus the queue's concurrency.
+
+export_chrome_trace() writes Chrome trace-event JSON (chrome://tracing,
+https://ui.perfetto.dev) with one process per queue and one lane per
+concurrently running handler; parent tasks additionally get a span covering
+the time they waited for their children.
+
+Used by: ./test/test_concurrent_worker.sh --critical-path DBNAME [--trace FILE]
+"""
+
+import json
+from bisect import bisect_right
+from collections import defaultdict
+
+TASKS_SQL = """
+    SELECT t.id, t.parent_id, t.command, t.queue, t.state::text
+         , extract(epoch FROM t.process_start_at)::float8
+         , extract(epoch FROM coalesce(t.process_stop_at, t.completed_at))::float8
+         , extract(epoch FROM coalesce(t.completed_at, t.process_stop_at))::float8
+    FROM public.worker_task AS t
+    WHERE t.process_start_at IS NOT NULL
+      AND coalesce(t.process_stop_at, t.completed_at) IS NOT NULL
+    ORDER BY t.process_start_at, t.id
+"""
+
+
+class Task:
+    __slots__ = ("id", "parent_id", "command", "queue", "state", "start", "stop", "end", "children")
+
+    def __init__(self, id, parent_id, command, queue, state, start, stop, end):
+        self.id = id
+        self.parent_id = parent_id
+        self.command = command
+        self.queue = queue
+        self.state = state
+        self.start = start
+        self.stop = stop
+        self.end = max(end, stop)
+        self.children = []
+
+    @property
+    def handler_s(self):
+        return self.stop - self.start
+
+    def subtree_end(self):
+        return max([self.end] + [c.subtree_end() for c in self.children])
+
+
+def load_tree(cur):
+    """Return (roots, tasks by id) for all tasks that ran to completion or failure."""
+    cur.execute(TASKS_SQL)
+    tasks = {row[0]: Task(*row) for row in cur.fetchall()}
+    roots = []
+    for task in tasks.values():
+        parent = tasks.get(task.parent_id)
+        (parent.children if parent else roots).append(task)
+    return roots, tasks
+
+
+def _chain(siblings, floor):
+    """Walk back from the last sibling to finish, stepping to the sibling that finished latest before it started."""
+    if not siblings:
+        return []
+    by_end = sorted(siblings, key=lambda t: t.end)
+    ends = [t.end for t in by_end]
+    i = len(by_end) - 1
+    chain = [by_end[i]]
+    while True:
+        # Latest-finishing sibling before the current one started (strictly earlier in by_end).
+        i = min(bisect_right(ends, chain[-1].start), i) - 1
+        if i < 0 or ends[i] <= floor:
+            break
+        chain.append(by_end[i])
+    chain.reverse()
+    return chain
+
+
+def _path(task):
+    """Critical path segments inside one task: its handler, then its children's chain."""
+    segments = [("handler", task, task.start, task.stop)]
+    cursor = task.stop
+    for child in _chain(task.children, task.start):
+        if child.start > cursor:
+            segments.append(("wait", child, cursor, child.start))
+        segments.extend(_path(child))
+        cursor = max(cursor, child.end)
+    if task.end > cursor:
+        segments.append(("finalize", task, cursor, task.end))
+    return segments
+
+
+def critical_path(roots):
+    """Ordered list of (kind, task, start, end) segments; kind is handler, wait or finalize."""
+    segments = []
+    cursor = None
+    for root in _chain(roots, float("-inf")):
+        if cursor is not None and root.start > cursor:
+            segments.append(("wait", root, cursor, root.start))
+        segments.extend(_path(root))
+        cursor = root.end if cursor is None else max(cursor, root.end)
+    return segments
+
+
+def _assign_lanes(tasks):
+    """Greedy interval partitioning of handler spans: {task id: lane}, and the lane count (= peak overlap)."""
+    lane_free_at = []
+    lanes = {}
+    for task in sorted(tasks, key=lambda t: (t.start, t.id)):
+        for lane, free_at in enumerate(lane_free_at):
+            if free_at <= task.start:
+                break
+        else:
+            lane = len(lane_free_at)
+            lane_free_at.append(0.0)
+        lane_free_at[lane] = task.stop
+        lanes[task.id] = lane
+    return lanes, len(lane_free_at)
+
+
+def _busy_time(tasks):
+    """Length of the union of the tasks' handler spans."""
+    busy, current_start, current_end = 0.0, None, None
+    for task in sorted(tasks, key=lambda t: t.start):
+        if current_end is None or task.start > current_end:
+            if current_end is not None:
+                busy += current_end - current_start
+            current_start, current_end = task.start, task.stop
+        else:
+            current_end = max(current_end, task.stop)
+    if current_end is not None:
+        busy += current_end - current_start
+    return busy
+
+
+def queue_parallelism(tasks, concurrency):
+    """Per queue: tasks, handler seconds, busy seconds, average and peak parallelism, configured concurrency."""
+    by_queue = defaultdict(list)
+    for task in tasks.values():
+        by_queue[task.queue].append(task)
+    result = {}
+    for queue, queue_tasks in sorted(by_queue.items()):
+        handler = sum(t.handler_s for t in queue_tasks)
+        busy = _busy_time(queue_tasks)
+        _, peak = _assign_lanes(queue_tasks)
+        result[queue] = {
+            "tasks": len(queue_tasks),
+            "handler_s": handler,
+            "busy_s": busy,
+            "avg_parallelism": handler / busy if busy else 0.0,
+            "peak_parallelism": peak,
+            "concurrency": concurrency.get(queue),
+        }
+    return result
+
+
+def subtree_wall_times(tasks):
+    """Per command of tasks that have children: count, total and max subtree wall seconds."""
+    stats = defaultdict(lambda: {"count": 0, "total_s": 0.0, "max_s": 0.0})
+    for task in tasks.values():
+        if not task.children:
+            continue
+        wall = task.subtree_end() - task.start
+        s = stats[task.command]
+        s["count"] += 1
+        s["total_s"] += wall
+        s["max_s"] = max(s["max_s"], wall)
+    return dict(stats)
+
+
+def report_lines(roots, tasks, concurrency):
+    """Human-readable summary lines (the caller decides how to print them)."""
+    if not tasks:
+        return ["No finished tasks with timing data found."]
+    run_start = min(t.start for t in tasks.values())
+    run_end = max(t.end for t in tasks.values())
+    wall = run_end - run_start
+    segments = critical_path(roots)
+
+    lines = [f"Run wall time: {wall * 1000:.0f}ms over {len(tasks)} tasks"]
+
+    # Collapse the critical path per command so long fan-outs stay readable.
+    per_kind = defaultdict(float)
+    per_command = defaultdict(lambda: [0, 0.0])
+    for kind, task, start, end in segments:
+        per_kind[kind] += end - start
+        if kind == "handler":
+            per_command[task.command][0] += 1
+            per_command[task.command][1] += end - start
+    path_total = sum(per_kind.values())
+    lines.append(f"Critical path: {path_total * 1000:.0f}ms = handlers {per_kind['handler'] * 1000:.0f}ms"
+                 f" + waits {per_kind['wait'] * 1000:.0f}ms"
+                 f" + parent finalize {per_kind['finalize'] * 1000:.0f}ms")
+    lines.append(f"  {'Command on critical path':<50} {'#':>4} {'Time':>9} {'Share':>6}")
+    for command, (count, seconds) in sorted(per_command.items(), key=lambda kv: -kv[1][1]):
+        share = seconds / path_total if path_total else 0.0
+        lines.append(f"  {command:<50} {count:>4} {seconds * 1000:>7.0f}ms {share:>6.0%}")
+
+    subtrees = subtree_wall_times(tasks)
+    if subtrees:
+        lines.append(f"  {'Subtree (parent command)':<50} {'#':>4} {'Total':>9} {'Max':>9}")
+        for command, s in sorted(subtrees.items(), key=lambda kv: -kv[1]["total_s"]):
+            lines.append(f"  {command:<50} {s['count']:>4} {s['total_s'] * 1000:>7.0f}ms {s['max_s'] * 1000:>7.0f}ms")
+
+    lines.append(f"  {'Queue parallelism':<20} {'Tasks':>6} {'Handler':>10} {'Busy':>10} {'Avg':>6} {'Peak':>5} {'Limit':>6}")
+    for queue, q in queue_parallelism(tasks, concurrency).items():
+        limit = q["concurrency"] if q["concurrency"] is not None else "?"
+        lines.append(f"  {queue:<20} {q['tasks']:>6} {q['handler_s'] * 1000:>8.0f}ms {q['busy_s'] * 1000:>8.0f}ms"
+                     f" {q['avg_parallelism']:>6.2f} {q['peak_parallelism']:>5} {limit:>6}")
+    return lines
+
+
+def export_chrome_trace(tasks, path, critical=None):
+    """Write a Chrome trace-event JSON file; critical path handlers are tagged in args."""
+    on_path = {task.id for kind, task, _, _ in (critical or []) if kind == "handler"}
+    if not tasks:
+        origin = 0.0
+    else:
+        origin = min(t.start for t in tasks.values())
+    queues = sorted({t.queue for t in tasks.values()})
+    pids = {queue: i + 1 for i, queue in enumerate(queues)}
+    events = [{"name": "process_name", "ph": "M", "pid": pids[q], "args": {"name": f"queue {q}"}} for q in queues]
+
+    def us(seconds):
+        return round((seconds - origin) * 1e6)
+
+    by_queue = defaultdict(list)
+    for task in tasks.values():
+        by_queue[task.queue].append(task)
+    for queue, queue_tasks in by_queue.items():
+        lanes, _ = _assign_lanes(queue_tasks)
+        for task in queue_tasks:
+            args = {"id": task.id, "parent_id": task.parent_id, "state": task.state,
+                    "critical_path": task.id in on_path}
+            events.append({"name": task.command, "cat": queue, "ph": "X", "pid": pids[queue],
+                           "tid": lanes[task.id], "ts": us(task.start),
+                           "dur": max(1, us(task.stop) - us(task.start)), "args": args})
+            if task.children and task.end > task.stop:
+                # Parent waiting for its children: drawn on a separate lane block to keep handler lanes dense.
+                events.append({"name": f"{task.command} (children)", "cat": queue, "ph": "X",
+                               "pid": pids[queue], "tid": 1000 + lanes[task.id], "ts": us(task.stop),
+                               "dur": max(1, us(task.end) - us(task.stop)), "args": args})
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)